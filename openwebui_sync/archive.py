@@ -0,0 +1,485 @@
+"""
+Monthly archive databases for old chats
+
+Handles:
+- Moving chats whose last activity is older than a cutoff, with their
+  messages, model associations, files and message bodies, into one SQLite
+  file per month (archive_YYYY-MM.db)
+- The archived_chats stub table in the main database, which lets syncs
+  skip archived chats that did not change
+- Moving chats back when they change again
+- TEMP views (all_chats, all_messages, ...) over the main database and
+  attached archives for historical queries
+
+The main database keeps only recent (hot) chats, so its indexes, status
+counts, search and exports stay small. Daily usage rollups are not
+touched by archiving: they keep the history of archived chats, and reports
+read the rollups, so report figures do not change.
+
+Archives are attached on demand with ATTACH DATABASE, which SQLite does
+not allow inside a transaction; the functions here expect the connection
+to have none open. DatabaseManager wraps them (see archive_chats(),
+restore_archived_chats() and attach_archives()).
+"""
+
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from . import rollups
+
+
+# Tables moved to the archives, in copy order
+ARCHIVE_TABLES = ('chats', 'chat_models', 'messages', 'message_contents', 'files')
+
+ARCHIVE_FILE_PATTERN = re.compile(r'^archive_(\d{4}-\d{2})\.db$')
+
+# Month a chat is filed under: its last activity (c = chats row)
+CHAT_MONTH = "strftime('%Y-%m', COALESCE(c.updated_at, c.created_at, c.sync_datetime))"
+
+ARCHIVED_CHATS_TABLE_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS archived_chats (
+        id VARCHAR(36) NOT NULL,
+        instance_id INTEGER NOT NULL,
+        user_id VARCHAR(36) NOT NULL,
+        updated_at DATETIME,
+        messages_hash VARCHAR(64),
+        message_count INTEGER NOT NULL DEFAULT 0,
+        month CHAR(7) NOT NULL,
+        archived_at DATETIME NOT NULL,
+        PRIMARY KEY (id, instance_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_archived_chats_user ON archived_chats(instance_id, user_id)",
+)
+
+
+def create_archive_tables(conn: sqlite3.Connection):
+    """
+    Create the archived_chats stub table in the main database.
+
+    Args:
+        conn: Database connection
+    """
+    for sql in ARCHIVED_CHATS_TABLE_SQL:
+        conn.execute(sql)
+
+
+def archive_path(archive_dir: Path, month: str) -> Path:
+    """Path of the archive file for a month (YYYY-MM)."""
+    return Path(archive_dir) / f"archive_{month}.db"
+
+
+def list_archive_months(archive_dir: Path) -> List[str]:
+    """
+    List the months that have an archive file, oldest first.
+
+    Args:
+        archive_dir: Archive directory
+
+    Returns:
+        list: Months as YYYY-MM
+    """
+    archive_dir = Path(archive_dir)
+    if not archive_dir.is_dir():
+        return []
+    return sorted(
+        match.group(1)
+        for match in (ARCHIVE_FILE_PATTERN.match(p.name) for p in archive_dir.iterdir())
+        if match
+    )
+
+
+@contextmanager
+def attached(conn: sqlite3.Connection, path: Path, schema: str = 'archive'):
+    """
+    Attach a database file for the duration of the block.
+
+    Args:
+        conn: Connection without an open transaction
+        path: Database file (created if missing)
+        schema: Schema name to attach it as
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+    try:
+        yield
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(f"DETACH DATABASE {schema}")
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    """Column names of schema.table, in table order."""
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _common_columns(conn: sqlite3.Connection, source: str, target: str, table: str) -> str:
+    """
+    Column list shared by the table in both schemas.
+
+    Archives keep the schema of the month they were created in, so columns
+    added to the main database later are left out of copies.
+    """
+    target_columns = set(_columns(conn, target, table))
+    return ', '.join(c for c in _columns(conn, source, table) if c in target_columns)
+
+
+def create_archive_schema(conn: sqlite3.Connection, schema: str = 'archive'):
+    """
+    Create the archived tables and their indexes in an attached archive.
+
+    The CREATE statements are taken from the main database's schema, so
+    archives match it at the time they are created.
+
+    Args:
+        conn: Connection with the archive attached
+        schema: Schema name of the archive
+    """
+    rows = conn.execute(f"""
+        SELECT sql FROM main.sqlite_master
+        WHERE tbl_name IN ({','.join('?' * len(ARCHIVE_TABLES))})
+          AND type IN ('table', 'index') AND sql IS NOT NULL
+        ORDER BY type = 'index'
+    """, ARCHIVE_TABLES).fetchall()
+
+    for (sql,) in rows:
+        conn.execute(re.sub(
+            r'^CREATE (TABLE|INDEX)\s+(?:IF NOT EXISTS\s+)?',
+            rf'CREATE \1 IF NOT EXISTS {schema}.',
+            sql,
+            flags=re.IGNORECASE
+        ))
+
+
+def find_archivable_chats(conn: sqlite3.Connection, cutoff: datetime,
+                          instance_id: int = None) -> Dict[str, Dict[str, int]]:
+    """
+    Count the chats (and their messages) older than cutoff, per month.
+
+    Only chats that are not deleted are archived: reports subtract the
+    activity of deleted chats, so those stay in the main database.
+
+    Args:
+        conn: Database connection
+        cutoff: Chats whose last activity is before this are archivable
+        instance_id: Only this instance (all instances if None)
+
+    Returns:
+        dict: Month -> {'chats': n, 'messages': n}, oldest month first
+    """
+    instance_filter = "AND c.instance_id = ?" if instance_id is not None else ""
+    params = [cutoff] + ([instance_id] if instance_id is not None else [])
+    rows = conn.execute(f"""
+        SELECT {CHAT_MONTH} AS month, COUNT(*),
+               SUM((SELECT COUNT(*) FROM messages m
+                    WHERE m.chat_id = c.id AND m.instance_id = c.instance_id))
+        FROM chats c
+        WHERE c.is_deleted = 0
+          AND COALESCE(c.updated_at, c.created_at, c.sync_datetime) < ?
+          {instance_filter}
+        GROUP BY month
+        ORDER BY month
+    """, params).fetchall()
+    return {row[0]: {'chats': row[1], 'messages': row[2] or 0} for row in rows}
+
+
+def select_month_batch(conn: sqlite3.Connection, month: str, cutoff: datetime,
+                       instance_id: int = None) -> int:
+    """
+    Snapshot the archivable chats of one month into temp.archive_batch.
+
+    The snapshot keeps each chat's updated_at and messages_hash, so chats a
+    sync changes while they are being copied can be left in place.
+
+    Args:
+        conn: Database connection (the caller commits)
+        month: Month (YYYY-MM)
+        cutoff: Chats whose last activity is before this are archivable
+        instance_id: Only this instance (all instances if None)
+
+    Returns:
+        int: Number of chats selected
+    """
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS archive_batch (
+            id VARCHAR(36) NOT NULL,
+            instance_id INTEGER NOT NULL,
+            updated_at DATETIME,
+            messages_hash VARCHAR(64),
+            PRIMARY KEY (id, instance_id)
+        )
+    """)
+    conn.execute("DELETE FROM temp.archive_batch")
+
+    instance_filter = "AND c.instance_id = ?" if instance_id is not None else ""
+    params = [cutoff, month] + ([instance_id] if instance_id is not None else [])
+    return conn.execute(f"""
+        INSERT INTO temp.archive_batch (id, instance_id, updated_at, messages_hash)
+        SELECT c.id, c.instance_id, c.updated_at, c.messages_hash
+        FROM main.chats c
+        WHERE c.is_deleted = 0
+          AND COALESCE(c.updated_at, c.created_at, c.sync_datetime) < ?
+          AND {CHAT_MONTH} = ?
+          {instance_filter}
+    """, params).rowcount
+
+
+# Rows of the chats in batch_table (b) for each archived table; {s} is the
+# schema the rows are read from
+_BATCH_ROWS = {
+    'chats': """
+        SELECT {columns} FROM {s}.chats
+        WHERE (id, instance_id) IN (SELECT id, instance_id FROM {batch})
+    """,
+    'chat_models': """
+        SELECT {columns} FROM {s}.chat_models
+        WHERE (chat_id, instance_id) IN (SELECT id, instance_id FROM {batch})
+    """,
+    'messages': """
+        SELECT {columns} FROM {s}.messages
+        WHERE (chat_id, instance_id) IN (SELECT id, instance_id FROM {batch})
+    """,
+    'files': """
+        SELECT {columns} FROM {s}.files
+        WHERE (message_id, instance_id) IN (
+            SELECT m.id, m.instance_id FROM {s}.messages m
+            WHERE (m.chat_id, m.instance_id) IN (SELECT id, instance_id FROM {batch})
+        )
+    """,
+    'message_contents': """
+        SELECT {columns} FROM {s}.message_contents
+        WHERE hash IN (
+            SELECT m.content_hash FROM {s}.messages m
+            WHERE (m.chat_id, m.instance_id) IN (SELECT id, instance_id FROM {batch})
+        )
+    """,
+}
+
+
+def _copy_batch(conn: sqlite3.Connection, source: str, target: str, batch: str):
+    """Copy the rows of the chats in batch from one schema to another."""
+    for table in ARCHIVE_TABLES:
+        columns = _common_columns(conn, source, target, table)
+        verb = "INSERT OR IGNORE" if table == 'message_contents' else "INSERT OR REPLACE"
+        conn.execute(f"""
+            {verb} INTO {target}.{table} ({columns})
+            {_BATCH_ROWS[table].format(columns=columns, s=source, batch=batch)}
+        """)
+
+
+def _delete_batch(conn: sqlite3.Connection, schema: str, batch: str):
+    """
+    Delete the chats in batch, with their files, messages and models.
+
+    Chats go first: the rollup triggers on messages and chat_models find
+    their chat's user through chats, so rows deleted after their chat
+    leave the rollups alone. Message bodies no longer referenced are
+    released by the main database's triggers (archives have none, so they
+    keep theirs).
+    """
+    conn.execute(f"""
+        DELETE FROM {schema}.files
+        WHERE (message_id, instance_id) IN (
+            SELECT m.id, m.instance_id FROM {schema}.messages m
+            WHERE (m.chat_id, m.instance_id) IN (SELECT id, instance_id FROM {batch})
+        )
+    """)
+    conn.execute(f"DELETE FROM {schema}.chats WHERE (id, instance_id) IN (SELECT id, instance_id FROM {batch})")
+    conn.execute(f"DELETE FROM {schema}.chat_models WHERE (chat_id, instance_id) IN (SELECT id, instance_id FROM {batch})")
+    conn.execute(f"DELETE FROM {schema}.messages WHERE (chat_id, instance_id) IN (SELECT id, instance_id FROM {batch})")
+
+
+def copy_batch_to_archive(conn: sqlite3.Connection, schema: str = 'archive'):
+    """
+    Copy the chats in temp.archive_batch into an attached archive.
+
+    Args:
+        conn: Connection with the archive attached (the caller commits)
+        schema: Schema name of the archive
+    """
+    _copy_batch(conn, 'main', schema, 'temp.archive_batch')
+
+
+def remove_batch_from_main(conn: sqlite3.Connection, month: str, schema: str = 'archive') -> int:
+    """
+    Replace the copied chats in the main database with archived_chats stubs.
+
+    Runs after the copy is committed, so a crash in between leaves the chats
+    in both places (archiving again overwrites the copy) rather than in
+    neither. Chats changed since they were copied stay in the main database
+    and their copies are removed from the archive.
+
+    Args:
+        conn: Connection with the archive attached (the caller commits)
+        month: Month (YYYY-MM) of the batch
+        schema: Schema name of the archive
+
+    Returns:
+        int: Number of chats archived
+    """
+    changed = conn.execute("""
+        SELECT b.id, b.instance_id FROM temp.archive_batch b
+        WHERE NOT EXISTS (
+            SELECT 1 FROM main.chats c
+            WHERE c.id = b.id AND c.instance_id = b.instance_id AND c.is_deleted = 0
+              AND c.updated_at IS b.updated_at AND c.messages_hash IS b.messages_hash
+        )
+    """).fetchall()
+    if changed:
+        conn.executemany("DELETE FROM temp.archive_batch WHERE id = ? AND instance_id = ?",
+                         [tuple(row) for row in changed])
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_changed (id VARCHAR(36), instance_id INTEGER)")
+        conn.execute("DELETE FROM temp.archive_changed")
+        conn.executemany("INSERT INTO temp.archive_changed (id, instance_id) VALUES (?, ?)",
+                         [tuple(row) for row in changed])
+        _delete_batch(conn, schema, 'temp.archive_changed')
+
+    conn.execute(f"""
+        INSERT OR REPLACE INTO archived_chats (
+            id, instance_id, user_id, updated_at, messages_hash, message_count, month, archived_at
+        )
+        SELECT c.id, c.instance_id, c.user_id, c.updated_at, c.messages_hash,
+               (SELECT COUNT(*) FROM main.messages m
+                WHERE m.chat_id = c.id AND m.instance_id = c.instance_id),
+               ?, ?
+        FROM main.chats c
+        WHERE (c.id, c.instance_id) IN (SELECT id, instance_id FROM temp.archive_batch)
+    """, (month, datetime.now()))
+
+    _delete_batch(conn, 'main', 'temp.archive_batch')
+    return conn.execute("SELECT COUNT(*) FROM temp.archive_batch").fetchone()[0]
+
+
+def get_archived_months(conn: sqlite3.Connection, instance_id: int,
+                        chat_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Group archived chats by the month of their archive.
+
+    Args:
+        conn: Database connection
+        instance_id: Instance ID
+        chat_ids: Chat IDs (IDs without a stub are ignored)
+
+    Returns:
+        dict: Month -> chat IDs
+    """
+    chat_ids = list(chat_ids)
+    months: Dict[str, List[str]] = {}
+    for start in range(0, len(chat_ids), 500):
+        chunk = chat_ids[start:start + 500]
+        for chat_id, month in conn.execute(f"""
+            SELECT id, month FROM archived_chats
+            WHERE instance_id = ? AND id IN ({','.join('?' * len(chunk))})
+        """, [instance_id] + chunk):
+            months.setdefault(month, []).append(chat_id)
+    return months
+
+
+def restore_batch(conn: sqlite3.Connection, instance_id: int, chat_ids: List[str],
+                  schema: str = 'archive') -> List[tuple]:
+    """
+    Copy archived chats back into the main database and drop their stubs.
+
+    The rollups already hold the activity of these chats, so the rollup
+    triggers are suspended while the rows are inserted. The stub delete
+    runs first so the suspension happens inside the transaction.
+
+    Args:
+        conn: Connection with the archive attached (the caller commits)
+        instance_id: Instance ID
+        chat_ids: Chat IDs stored in this archive
+        schema: Schema name of the archive
+
+    Returns:
+        list: (hash, content, content_codec) of the message bodies added to
+              the main database, for the search index
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS restore_batch (id VARCHAR(36), instance_id INTEGER)")
+    conn.execute("DELETE FROM temp.restore_batch")
+    conn.executemany("INSERT INTO temp.restore_batch (id, instance_id) VALUES (?, ?)",
+                     [(chat_id, instance_id) for chat_id in chat_ids])
+
+    conn.execute("""
+        DELETE FROM archived_chats
+        WHERE (id, instance_id) IN (SELECT id, instance_id FROM temp.restore_batch)
+    """)
+
+    new_contents = conn.execute(f"""
+        SELECT a.hash, a.content, a.content_codec
+        FROM ({_BATCH_ROWS['message_contents'].format(
+            columns='hash, content, content_codec', s=schema, batch='temp.restore_batch')}) a
+        WHERE NOT EXISTS (SELECT 1 FROM main.message_contents mc WHERE mc.hash = a.hash)
+    """).fetchall()
+
+    with rollups.triggers_suspended(conn):
+        _copy_batch(conn, schema, 'main', 'temp.restore_batch')
+    return new_contents
+
+
+def remove_restored_from_archive(conn: sqlite3.Connection, schema: str = 'archive'):
+    """
+    Delete the chats in temp.restore_batch from the archive.
+
+    Runs after the restore is committed (see remove_batch_from_main()).
+    Message bodies are left in the archive; other chats may share them.
+
+    Args:
+        conn: Connection with the archive attached (the caller commits)
+        schema: Schema name of the archive
+    """
+    _delete_batch(conn, schema, 'temp.restore_batch')
+
+
+# ============================================================================
+# UNIFIED VIEWS
+# ============================================================================
+
+# TEMP views over the main database and the attached archives
+UNIFIED_VIEWS = {table: f"all_{table}" for table in ARCHIVE_TABLES}
+
+
+def create_unified_views(conn: sqlite3.Connection, schemas: List[str]):
+    """
+    Create TEMP views combining the main database with attached archives.
+
+    all_chats, all_chat_models, all_messages and all_files are UNION ALL of
+    the same table in every schema. all_message_contents uses UNION, since
+    a body can be stored in the main database and in several archives.
+    Columns missing from older archives read as NULL.
+
+    Args:
+        conn: Connection with the archives attached
+        schemas: Schema names of the attached archives
+    """
+    for table, view in UNIFIED_VIEWS.items():
+        columns = _columns(conn, 'main', table)
+        selects = [f"SELECT {', '.join(columns)} FROM main.{table}"]
+        for schema in schemas:
+            present = set(_columns(conn, schema, table))
+            selects.append(
+                f"SELECT {', '.join(c if c in present else f'NULL AS {c}' for c in columns)} "
+                f"FROM {schema}.{table}"
+            )
+        union = "\nUNION\n" if table == 'message_contents' else "\nUNION ALL\n"
+        conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        conn.execute(f"CREATE TEMP VIEW {view} AS {union.join(selects)}")
+
+
+def drop_unified_views(conn: sqlite3.Connection):
+    """Drop the TEMP views created by create_unified_views()."""
+    for view in UNIFIED_VIEWS.values():
+        conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+
+
+def attach_limit(conn: sqlite3.Connection) -> int:
+    """Maximum number of databases that can be attached to conn."""
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except AttributeError:
+        # Python < 3.11; SQLite's compile-time default
+        return 10
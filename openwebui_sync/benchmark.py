@@ -0,0 +1,375 @@
+"""
+Sync Benchmarks against the local OpenWebUI stand-in
+
+Handles:
+- Full and incremental syncs of synthetic datasets from 10k to 1M messages
+- Throughput (chats/sec, messages/sec), DB write time, API wait time and
+  peak RSS per sync, with the run's phase and statement timings (metrics.py)
+- Results saved as JSON (output/benchmarks) and compared between runs
+
+Each dataset is served by a mock server in its own process, and each sync
+runs in a fresh process against a fresh database, so peak RSS belongs to
+that sync alone and the server does not compete with it for the GIL.
+Run it with `sync_cli.py benchmark run` and compare two result files with
+`sync_cli.py benchmark compare`.
+"""
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from .config import (
+    BASE_DIR, BENCHMARK_DIR, MESSAGE_COMPRESSION, STREAM_CHAT_DETAILS, SYNC_MAX_WORKERS
+)
+from .database import DatabaseManager
+from .rate_limiter import AdaptiveRateLimiter
+from .streaming import streaming_available
+from .sync_engine import SyncEngine
+
+
+# Dataset sizes by name: (users, chats, messages)
+BENCHMARK_SIZES = {
+    '10k': (20, 1000, 10000),
+    '100k': (100, 10000, 100000),
+    '1m': (500, 100000, 1000000),
+}
+DEFAULT_SIZES = ('10k', '100k', '1m')
+
+# Instance name the sync processes register for the mock server
+BENCHMARK_INSTANCE = 'benchmark'
+
+# Request rate used unless the adaptive rate limiter is kept (--throttled)
+UNTHROTTLED_RATE = 1e6
+
+# Metrics compared between runs, and whether higher is better
+COMPARED_METRICS = {
+    'seconds': False,
+    'chats_per_sec': True,
+    'messages_per_sec': True,
+    'db_write_seconds': False,
+    'api_wait_seconds': False,
+    'peak_rss_mb': False,
+}
+
+# Minimum change (as a fraction) compare reports as better or worse
+NOISE_THRESHOLD = 0.05
+
+
+# ============================================================================
+# BENCHMARK ENGINE
+# ============================================================================
+
+class BenchmarkSyncEngine(SyncEngine):
+    """Sync engine whose rate limiter can be taken out of the measurement."""
+
+    def __init__(self, db_manager: DatabaseManager, throttled: bool = True):
+        super().__init__(db_manager)
+        self.throttled = throttled
+
+    def _get_rate_limiter(self, instance_name: str) -> AdaptiveRateLimiter:
+        if self.throttled:
+            return super()._get_rate_limiter(instance_name)
+        with self._session_lock:
+            limiter = self._rate_limiters.get(instance_name)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter(UNTHROTTLED_RATE, max_rate=UNTHROTTLED_RATE)
+                self._rate_limiters[instance_name] = limiter
+            return limiter
+
+
+# ============================================================================
+# BENCHMARK PROCESSES
+# ============================================================================
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, None where it is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def _serve_dataset(conn, dataset_options: Dict[str, Any], latency: float):
+    """
+    Server process: serve a synthetic dataset until told to stop.
+
+    Commands received on conn: ('advance', changed_fraction), ('stats',),
+    ('reset_stats',) and ('stop',). The server URL is sent first.
+    """
+    from .mock_server import FaultConfig, MockOpenWebUIServer, SyntheticDataset
+
+    dataset = SyntheticDataset(**dataset_options)
+    with MockOpenWebUIServer(dataset, FaultConfig(latency=latency)) as server:
+        conn.send(server.url)
+        while True:
+            command = conn.recv()
+            if command[0] == 'advance':
+                conn.send(dataset.advance(changed_fraction=command[1]))
+            elif command[0] == 'stats':
+                conn.send(server.stats())
+            elif command[0] == 'reset_stats':
+                server.reset_stats()
+                conn.send(None)
+            else:
+                break
+
+
+def _run_sync(url: str, db_path: str, full: bool, workers: int,
+              throttled: bool, verbose: bool) -> Dict[str, Any]:
+    """
+    Sync process: run one sync against the mock server and measure it.
+
+    Returns:
+        dict: Sync counts, timings and peak RSS
+    """
+    from .mock_server import register_instance
+
+    register_instance(BENCHMARK_INSTANCE, url, max_workers=workers)
+    db = DatabaseManager(db_path)
+    engine = BenchmarkSyncEngine(db, throttled=throttled)
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            started = time.perf_counter()
+            engine.sync_instance(BENCHMARK_INSTANCE, force_full=full)
+            seconds = time.perf_counter() - started
+    finally:
+        engine.close()
+
+    run = db.get_sync_run(instance_name=BENCHMARK_INSTANCE)
+    db.close()
+    if run is None or run['status'] != 'success':
+        raise RuntimeError(f"Benchmark sync did not complete (status {run['status'] if run else None})")
+
+    metrics = engine.get_metrics(BENCHMARK_INSTANCE)
+    return {
+        'seconds': seconds,
+        'users': run['users_synced'],
+        'chats': run['chats_synced'],
+        'messages': run['messages_synced'],
+        'bytes_received': run['bytes_received'],
+        'waits': dict(metrics.waits),
+        'api_request_seconds': sum(h.sum for h in metrics.requests.values()),
+        'phases': dict(metrics.phases),
+        'db_statements': {name: h.sum for name, h in metrics.db.items()},
+        'peak_rss_bytes': _peak_rss_bytes(),
+    }
+
+
+def _run_in_process(context, func: Callable, *args) -> Any:
+    """Run func in a fresh process and return its result (or raise its error)."""
+    with context.Pool(1) as pool:
+        return pool.apply(func, args)
+
+
+def _database_bytes(db_path: str) -> int:
+    """Size of a database including its WAL file."""
+    return sum(os.path.getsize(path) for path in (db_path, f"{db_path}-wal") if os.path.exists(path))
+
+
+def _phase_result(size: str, phase: str, sync: Dict[str, Any], requests: Dict[str, int],
+                  db_path: str) -> Dict[str, Any]:
+    """Turn a sync process's measurements into one result row."""
+    seconds = sync['seconds']
+    waits = sync['waits']
+    peak_rss = sync['peak_rss_bytes']
+    return {
+        'size': size,
+        'phase': phase,
+        'seconds': round(seconds, 3),
+        'users': sync['users'],
+        'chats': sync['chats'],
+        'messages': sync['messages'],
+        'chats_per_sec': round(sync['chats'] / max(seconds, 1e-6), 1),
+        'messages_per_sec': round(sync['messages'] / max(seconds, 1e-6), 1),
+        'db_write_seconds': round(waits.get('db_write', 0.0), 3),
+        'db_read_seconds': round(waits.get('db_read', 0.0), 3),
+        'api_wait_seconds': round(waits.get('api', 0.0), 3),
+        'api_request_seconds': round(sync['api_request_seconds'], 3),
+        'peak_rss_mb': round(peak_rss / 1024**2, 1) if peak_rss is not None else None,
+        'requests': requests,
+        'bytes_received': sync['bytes_received'],
+        'db_bytes': _database_bytes(db_path),
+        'phases': {name: round(value, 3) for name, value in sync['phases'].items()},
+        'db_statements': {name: round(value, 3) for name, value in sorted(sync['db_statements'].items())},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    """Current commit of the working tree, with '-dirty' if it has changes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+# ============================================================================
+# RUNNING AND COMPARING
+# ============================================================================
+
+def run_benchmarks(sizes: List[str] = DEFAULT_SIZES, workers: int = SYNC_MAX_WORKERS,
+                   throttled: bool = False, latency: float = 0.0,
+                   changed_fraction: float = 0.01, seed: int = 0, verbose: bool = False,
+                   on_result: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """
+    Benchmark a full and an incremental sync for each dataset size.
+
+    The incremental sync follows one SyntheticDataset.advance() step, in
+    which changed_fraction of the chats get new messages.
+
+    Args:
+        sizes: Names from BENCHMARK_SIZES
+        workers: Chat-detail workers per sync
+        throttled: Keep the adaptive rate limiter (off by default, so results
+                   measure the sync rather than the limiter's ramp-up)
+        latency: Seconds the mock server adds to every response
+        changed_fraction: Fraction of chats changed before the incremental sync
+        seed: Dataset seed
+        verbose: Show the sync output
+        on_result: Called with each result row as it completes
+
+    Returns:
+        dict: Run metadata, settings and one result row per size and phase
+
+    Raises:
+        ValueError: If a size is not in BENCHMARK_SIZES
+    """
+    unknown = [size for size in sizes if size not in BENCHMARK_SIZES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark size(s): {', '.join(unknown)} "
+                         f"(choose from {', '.join(BENCHMARK_SIZES)})")
+
+    # A fixed end time keeps datasets identical between runs
+    end_time = 1767225600  # 2026-01-01 00:00 UTC
+    context = multiprocessing.get_context('spawn')
+    run = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': {
+            'workers': workers,
+            'rate_limiter': 'adaptive' if throttled else 'off',
+            'latency': latency,
+            'changed_fraction': changed_fraction,
+            'seed': seed,
+            'compression': MESSAGE_COMPRESSION,
+            'streaming': STREAM_CHAT_DETAILS and streaming_available(),
+        },
+        'results': [],
+    }
+
+    for size in sizes:
+        users, chats, messages = BENCHMARK_SIZES[size]
+        dataset_options = {'users': users, 'chats': chats, 'messages': messages,
+                           'seed': seed, 'end_time': end_time}
+        parent_conn, child_conn = context.Pipe()
+        server = context.Process(target=_serve_dataset, args=(child_conn, dataset_options, latency),
+                                 daemon=True)
+        server.start()
+
+        def command(*message):
+            parent_conn.send(message)
+            return parent_conn.recv()
+
+        try:
+            url = parent_conn.recv()
+            with tempfile.TemporaryDirectory(prefix='openwebui_sync_bench_') as temp_dir:
+                db_path = str(Path(temp_dir) / 'benchmark.db')
+                for phase in ('full', 'incremental'):
+                    if phase == 'incremental':
+                        command('advance', changed_fraction)
+                    command('reset_stats')
+                    sync = _run_in_process(context, _run_sync, url, db_path, phase == 'full',
+                                           workers, throttled, verbose)
+                    result = _phase_result(size, phase, sync, command('stats'), db_path)
+                    run['results'].append(result)
+                    if on_result:
+                        on_result(result)
+        finally:
+            parent_conn.send(('stop',))
+            server.join(timeout=10)
+            if server.is_alive():
+                server.terminate()
+
+    run['completed_at'] = datetime.now().isoformat(timespec='seconds')
+    return run
+
+
+def save_results(run: Dict[str, Any], output_dir: Path = None) -> Path:
+    """
+    Write a benchmark run to output_dir (BENCHMARK_DIR by default).
+
+    Returns:
+        Path: The JSON file written (sync_YYYYMMDD_HHMMSS.json)
+    """
+    output_dir = Path(output_dir or BENCHMARK_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = datetime.fromisoformat(run['started_at'])
+    path = output_dir / f"sync_{started.strftime('%Y%m%d_%H%M%S')}.json"
+    path.write_text(json.dumps(run, indent=2))
+    return path
+
+
+def list_results(output_dir: Path = None) -> List[Path]:
+    """Saved benchmark runs in output_dir, oldest first."""
+    output_dir = Path(output_dir or BENCHMARK_DIR)
+    return sorted(output_dir.glob('sync_*.json')) if output_dir.exists() else []
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    """Read a saved benchmark run."""
+    return json.loads(Path(path).read_text())
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compare the metrics of two benchmark runs for every size and phase in both.
+
+    Args:
+        baseline: Earlier run (load_results())
+        current: Later run
+
+    Returns:
+        list: One dict per size, phase and metric with before, after,
+              change (fraction, None if before is 0) and verdict
+              ('better', 'worse' or '' within NOISE_THRESHOLD)
+    """
+    before_rows = {(r['size'], r['phase']): r for r in baseline['results']}
+    comparison = []
+    for row in current['results']:
+        before_row = before_rows.get((row['size'], row['phase']))
+        if before_row is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = before_row.get(metric), row.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else None
+            verdict = ''
+            if change is not None and abs(change) >= NOISE_THRESHOLD:
+                verdict = 'better' if (change > 0) == higher_is_better else 'worse'
+            comparison.append({
+                'size': row['size'], 'phase': row['phase'], 'metric': metric,
+                'before': before, 'after': after, 'change': change, 'verdict': verdict,
+            })
+    return comparison
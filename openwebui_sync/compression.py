@@ -0,0 +1,245 @@
+"""
+Message Content Compression for the sync database
+
+Handles:
+- Encoding message bodies on write (zlib, or zstd when installed)
+- zstd dictionaries trained on the database's own messages
+- Decoding on demand, from Python or SQL (decompress(content, content_codec))
+- Thread-safe use from sync threads and the single writer
+- Size and read-speed comparison against uncompressed storage
+
+Each row records how its content was stored in message_contents.content_codec:
+NULL for plain text, 'zlib', 'zstd', or 'zstd:<dictionary id>'. Rows written
+with different settings can therefore live side by side.
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from .config import MESSAGE_COMPRESSION, MESSAGE_COMPRESSION_LEVEL, MESSAGE_COMPRESSION_MIN_BYTES
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+CODECS = (CODEC_ZLIB, CODEC_ZSTD)
+
+
+def zstd_available() -> bool:
+    """Check whether zstd compression is supported (zstandard installed)."""
+    return zstandard is not None
+
+
+def train_dictionary(samples: List[str], dict_size: int = 64 * 1024) -> bytes:
+    """
+    Train a zstd dictionary on sample message contents.
+
+    Args:
+        samples: Message contents representative of the database
+        dict_size: Target dictionary size in bytes
+
+    Returns:
+        bytes: Dictionary to store with DatabaseManager.save_compression_dictionary()
+
+    Raises:
+        RuntimeError: If zstandard is not installed
+    """
+    if zstandard is None:
+        raise RuntimeError("zstd dictionaries require the zstandard package")
+    return zstandard.train_dictionary(dict_size, [s.encode('utf-8') for s in samples]).as_bytes()
+
+
+class ContentCodec:
+    """
+    Encodes and decodes message content.
+
+    Provides:
+    - encode() to turn text into a (value, content_codec) pair for storage
+    - decode() to turn any stored pair back into text
+    """
+
+    def __init__(self, codec: Optional[str] = MESSAGE_COMPRESSION,
+                 level: Optional[int] = MESSAGE_COMPRESSION_LEVEL,
+                 min_bytes: int = MESSAGE_COMPRESSION_MIN_BYTES,
+                 dictionaries: Dict[int, bytes] = None, dict_id: Optional[int] = None):
+        """
+        Initialize content codec.
+
+        Args:
+            codec: Codec for new content ('zlib', 'zstd') or None to store plain text
+            level: Compression level (None for the codec's default)
+            min_bytes: Content shorter than this (UTF-8 bytes) is stored as plain text
+            dictionaries: zstd dictionaries by ID, for decoding existing rows
+            dict_id: Dictionary to encode new zstd content with
+
+        Raises:
+            ValueError: If the codec is unknown
+            RuntimeError: If zstd is requested but zstandard is not installed
+        """
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        if codec == CODEC_ZSTD and zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package")
+
+        self.codec = codec
+        self.level = level
+        self.min_bytes = min_bytes
+        self.dictionaries = dict(dictionaries or {})
+        self.dict_id = dict_id if codec == CODEC_ZSTD else None
+
+        # zstd (de)compressor objects are not thread-safe; keep one set per thread
+        self._local = threading.local()
+
+    @property
+    def name(self) -> Optional[str]:
+        """content_codec value written for compressed content."""
+        if self.dict_id is not None:
+            return f"{CODEC_ZSTD}:{self.dict_id}"
+        return self.codec
+
+    def encode(self, content: Optional[str]) -> Tuple[Any, Optional[str]]:
+        """
+        Encode content for storage.
+
+        Args:
+            content: Message content
+
+        Returns:
+            tuple: (value for message_contents.content, value for
+                    message_contents.content_codec)
+        """
+        if content is None or self.codec is None:
+            return content, None
+
+        data = content.encode('utf-8')
+        if len(data) < self.min_bytes:
+            return content, None
+
+        if self.codec == CODEC_ZLIB:
+            compressed = zlib.compress(data, self.level if self.level is not None else 6)
+        else:
+            compressed = self._zstd_compressor().compress(data)
+
+        # Keep incompressible content as text
+        if len(compressed) >= len(data):
+            return content, None
+        return compressed, self.name
+
+    def decode(self, value: Any, codec: Optional[str]) -> Optional[str]:
+        """
+        Decode a stored value back to text.
+
+        Args:
+            value: message_contents.content
+            codec: message_contents.content_codec
+
+        Returns:
+            str: Message content (None if value is None)
+        """
+        if value is None or codec is None:
+            return value
+
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(value).decode('utf-8')
+
+        if codec.startswith(CODEC_ZSTD):
+            return self._zstd_decompressor(codec).decompress(value).decode('utf-8')
+
+        raise ValueError(f"Unknown compression codec: {codec}")
+
+    def _zstd_dict(self, dict_id: Optional[int]):
+        """Get the zstd dictionary with the given ID (None for no dictionary)."""
+        if dict_id is None:
+            return None
+        if dict_id not in self.dictionaries:
+            raise ValueError(f"Unknown compression dictionary: {dict_id}")
+        return zstandard.ZstdCompressionDict(self.dictionaries[dict_id])
+
+    def _zstd_compressor(self):
+        """Get this thread's zstd compressor."""
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(
+                level=self.level if self.level is not None else 3,
+                dict_data=self._zstd_dict(self.dict_id)
+            )
+            self._local.compressor = compressor
+        return compressor
+
+    def _zstd_decompressor(self, codec: str):
+        """Get this thread's decompressor for a 'zstd' or 'zstd:<id>' codec."""
+        if zstandard is None:
+            raise RuntimeError("Reading zstd content requires the zstandard package")
+
+        decompressors = getattr(self._local, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+
+        _, _, dict_id = codec.partition(':')
+        key = int(dict_id) if dict_id else None
+        decompressor = decompressors.get(key)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict(key))
+            decompressors[key] = decompressor
+        return decompressor
+
+
+def benchmark_compression(samples: List[str], codecs: List[ContentCodec],
+                          repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Compare storage size and read speed of message content per codec.
+
+    Each codec's encoded samples are loaded into an in-memory SQLite table
+    shaped like messages, then read back and decoded in full.
+
+    Args:
+        samples: Message contents to store
+        codecs: Codecs to compare (ContentCodec(None) is plain text)
+        repeat: Read passes per codec (best time is reported)
+
+    Returns:
+        list: One dict per codec with codec, content_bytes, db_bytes,
+              encode_seconds and read_seconds
+    """
+    results = []
+
+    for codec in codecs:
+        started = time.perf_counter()
+        rows = [codec.encode(content) for content in samples]
+        encode_seconds = time.perf_counter() - started
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT, content_codec VARCHAR(32))")
+        conn.executemany("INSERT INTO messages (content, content_codec) VALUES (?, ?)", rows)
+        conn.commit()
+
+        content_bytes = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM messages"
+        ).fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+
+        read_seconds = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for value, content_codec in conn.execute("SELECT content, content_codec FROM messages"):
+                codec.decode(value, content_codec)
+            elapsed = time.perf_counter() - started
+            read_seconds = elapsed if read_seconds is None else min(read_seconds, elapsed)
+        conn.close()
+
+        results.append({
+            'codec': codec.name or 'none',
+            'content_bytes': content_bytes,
+            'db_bytes': page_size * page_count,
+            'encode_seconds': encode_seconds,
+            'read_seconds': read_seconds,
+        })
+
+    return results
@@ -22,6 +22,24 @@ DB_PATH = BASE_DIR / "data" / "openwebui_sync.db"
 # Ensure data directory exists
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# SQLite tuning applied to every connection (WAL mode is always enabled)
+DB_CACHE_SIZE_KB = 64 * 1024           # Page cache per connection
+DB_MMAP_SIZE = 256 * 1024 * 1024       # Memory-mapped I/O window
+DB_BUSY_TIMEOUT = 30                   # Seconds to wait on a locked database
+
+# Compression of message content: 'zlib', 'zstd' (needs the zstandard
+# package) or None to store plain text. Existing rows keep the codec they
+# were written with; convert them with: python sync_cli.py db compress
+MESSAGE_COMPRESSION = 'zlib'
+MESSAGE_COMPRESSION_LEVEL = None       # None = codec default (zlib 6, zstd 3)
+MESSAGE_COMPRESSION_MIN_BYTES = 256    # Shorter messages are stored as plain text
+
+# Chats with no activity for this many days can be moved to monthly archive
+# databases (python sync_cli.py archive run). Archives live in ARCHIVE_DIR;
+# None keeps them in a folder next to the database (openwebui_sync_archive).
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_DIR = None
+
 # ============================================================================
 # OPENWEBUI INSTANCES
 # ============================================================================
@@ -60,12 +78,47 @@ AZURE_SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID", "")
 # API request timeout in seconds
 API_TIMEOUT = 30
 
-# Delay between API requests to avoid rate limiting (seconds)
-API_DELAY = 0.05
-
 # Maximum retries for failed API requests
 MAX_RETRIES = 3
 
+# Number of concurrent chat-detail fetches per instance.
+# Override per instance with a "max_workers" key in INSTANCES.
+SYNC_MAX_WORKERS = 4
+
+# Adaptive rate limiting (requests/sec per instance). The limiter starts at
+# RATE_LIMIT_INITIAL, ramps up while responses are healthy and backs off on
+# 429s or when latency rises above RATE_LIMIT_LATENCY_FACTOR x its baseline.
+RATE_LIMIT_INITIAL = 10.0
+RATE_LIMIT_MIN = 1.0
+RATE_LIMIT_MAX = 200.0
+RATE_LIMIT_LATENCY_FACTOR = 3.0
+
+# Pause (seconds) after a 429 response without a Retry-After header
+RATE_LIMIT_DEFAULT_RETRY_AFTER = 5
+
+# Parse chat-detail responses incrementally, one message at a time, so peak
+# memory per chat stays bounded. Requires the optional ijson package; falls
+# back to loading whole responses if it is not installed.
+STREAM_CHAT_DETAILS = True
+
+# Order in which incremental syncs check users. False keeps the API order;
+# True checks users with activity since their last check first (most recent
+# first, from last_active_at/updated_at in /users/all), then the rest by how
+# often their chats changed in earlier syncs.
+SYNC_PRIORITY = False
+
+# Seconds after which an incremental sync stops cleanly, leaving the users it
+# did not get to for the next run (which checks them first). Keep it below
+# the schedule interval, e.g. 50 * 60 for hourly syncs. None for no limit.
+SYNC_TIME_BUDGET = None
+
+# Skip the chat-list request of users whose activity timestamp in /users/all
+# (last_active_at/updated_at) has not moved since their last check. Every
+# user is still checked at least every SYNC_RECONCILE_HOURS, which catches
+# chats changed or deleted without their owner's activity moving.
+SYNC_SKIP_INACTIVE_USERS = True
+SYNC_RECONCILE_HOURS = 24
+
 # Batch size for database inserts
 DB_BATCH_SIZE = 100
 
@@ -83,6 +136,37 @@ TOP_USERS_LIMIT = 10
 # Number of days of trend data to include
 TREND_DAYS = 30
 
+# ============================================================================
+# EXPORT SETTINGS
+# ============================================================================
+
+# Output directory for Parquet/Arrow exports (python sync_cli.py export)
+EXPORT_DIR = BASE_DIR / "output" / "export"
+
+# Rows fetched from SQLite, and buffered per partition, before writing
+EXPORT_CHUNK_ROWS = 20000
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Every sync run's request latencies, retries, DB time and phase timings are
+# stored in the sync_run_metrics table. Set this to the node exporter's
+# --collector.textfile.directory to also write them as Prometheus metrics
+# (openwebui_sync_<instance>.prom, replaced after each run), e.g.
+# "/var/lib/node_exporter/textfile_collector". None disables the textfile.
+METRICS_TEXTFILE_DIR = None
+
+# ============================================================================
+# MOCK SERVER
+# ============================================================================
+
+# Port of the local OpenWebUI stand-in (python sync_cli.py mock-server)
+MOCK_SERVER_PORT = 8765
+
+# Saved sync benchmark results (python sync_cli.py benchmark run)
+BENCHMARK_DIR = BASE_DIR / "output" / "benchmarks"
+
 # ============================================================================
 # LOGGING
 # ============================================================================
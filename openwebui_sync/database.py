@@ -6,14 +6,507 @@ Handles:
 - Connection management
 - CRUD operations for all entities
 - Efficient querying for reports
+- Transparent compression of message content (see compression.py)
+- Content-addressed storage of message bodies (one copy per distinct text)
+- FTS5 full-text search over message bodies and chat titles
+- Daily usage rollups maintained by triggers (see rollups.py)
+- Moving old chats to monthly archive databases (see archive.py)
 """
 
 import sqlite3
+import functools
+import hashlib
 import json
-from datetime import datetime
-from typing import Optional, List, Dict, Any
-from contextlib import contextmanager
-from .config import DB_PATH
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable, Iterable
+from contextlib import contextmanager, nullcontext
+from .config import (
+    DB_PATH, DB_BATCH_SIZE, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_BUSY_TIMEOUT,
+    MESSAGE_COMPRESSION, ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+)
+from .compression import ContentCodec, CODEC_ZSTD, CODEC_ZLIB, zstd_available
+from .metrics import SyncMetrics
+from . import archive, rollups
+
+
+# ============================================================================
+# WRITE STATEMENTS
+# ============================================================================
+# Shared by the single-row methods on DatabaseManager and by BatchWriter.
+
+CHECKPOINT_CHAT_SQL = """
+    INSERT OR REPLACE INTO sync_checkpoint_chats (sync_run_id, chat_id, messages_synced)
+    VALUES (?, ?, ?)
+"""
+
+CHECKPOINT_USER_SQL = """
+    INSERT OR REPLACE INTO sync_checkpoint_users (sync_run_id, user_id, completed_at)
+    VALUES (?, ?, ?)
+"""
+
+# Weight of the latest run in a user's smoothed chat change rate
+CHANGE_RATE_WEIGHT = 0.3
+
+# A NULL change count (full syncs, where every chat is new) keeps the old rate
+UPSERT_USER_SYNC_STATE_SQL = f"""
+    INSERT INTO user_sync_state (user_id, instance_id, checked_at, activity_at, change_rate, deferred_at)
+    VALUES (?, ?, ?, ?, ?, NULL)
+    ON CONFLICT(user_id, instance_id) DO UPDATE SET
+        checked_at=excluded.checked_at,
+        activity_at=excluded.activity_at,
+        change_rate=COALESCE(
+            user_sync_state.change_rate * {1 - CHANGE_RATE_WEIGHT} + excluded.change_rate * {CHANGE_RATE_WEIGHT},
+            user_sync_state.change_rate,
+            excluded.change_rate
+        ),
+        deferred_at=NULL
+"""
+
+UPSERT_USER_SQL = """
+    INSERT INTO users (
+        id, instance_id, name, email, role, profile_image_url,
+        created_at, updated_at, sync_datetime, is_deleted
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+    ON CONFLICT(id, instance_id) DO UPDATE SET
+        name=excluded.name,
+        email=excluded.email,
+        role=excluded.role,
+        profile_image_url=excluded.profile_image_url,
+        updated_at=excluded.updated_at,
+        sync_datetime=excluded.sync_datetime,
+        is_deleted=0
+"""
+
+MARK_USER_DELETED_SQL = "UPDATE users SET is_deleted = 1 WHERE id = ? AND instance_id = ?"
+
+UPSERT_CHAT_SQL = """
+    INSERT INTO chats (
+        id, instance_id, user_id, title, created_at, updated_at,
+        sync_datetime, archived, pinned, folder_id, share_id, messages_hash, is_deleted
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+    ON CONFLICT(id, instance_id) DO UPDATE SET
+        title=excluded.title,
+        updated_at=excluded.updated_at,
+        sync_datetime=excluded.sync_datetime,
+        archived=excluded.archived,
+        pinned=excluded.pinned,
+        folder_id=excluded.folder_id,
+        share_id=excluded.share_id,
+        messages_hash=COALESCE(excluded.messages_hash, chats.messages_hash),
+        is_deleted=0
+"""
+
+TOUCH_CHAT_SQL = "UPDATE chats SET sync_datetime = ? WHERE id = ? AND instance_id = ?"
+
+UPSERT_CHAT_MODEL_SQL = """
+    INSERT INTO chat_models (chat_id, instance_id, model_id, sync_datetime)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(chat_id, instance_id, model_id) DO UPDATE SET
+        sync_datetime=excluded.sync_datetime
+"""
+
+DELETE_CHAT_MODELS_SQL = "DELETE FROM chat_models WHERE chat_id = ? AND instance_id = ?"
+
+UPSERT_MESSAGE_SQL = """
+    INSERT INTO messages (
+        id, chat_id, instance_id, parent_id, role,
+        content_length, content_hash, created_at, sync_datetime, has_files, model
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id, instance_id) DO UPDATE SET
+        content_length=excluded.content_length,
+        content_hash=excluded.content_hash,
+        created_at=COALESCE(excluded.created_at, messages.created_at),
+        sync_datetime=excluded.sync_datetime,
+        has_files=excluded.has_files,
+        model=excluded.model
+"""
+
+INSERT_MESSAGE_CONTENT_SQL = """
+    INSERT INTO message_contents (hash, content, content_codec, content_length)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(hash) DO NOTHING
+"""
+
+DELETE_MESSAGES_SQL = "DELETE FROM messages WHERE chat_id = ? AND instance_id = ?"
+
+DELETE_MESSAGE_SQL = "DELETE FROM messages WHERE id = ? AND instance_id = ?"
+
+DELETE_CHAT_MODEL_SQL = "DELETE FROM chat_models WHERE chat_id = ? AND instance_id = ? AND model_id = ?"
+
+UPSERT_MODEL_SQL = """
+    INSERT INTO models (id, instance_id, name, info, sync_datetime, is_deleted)
+    VALUES (?, ?, ?, ?, ?, 0)
+    ON CONFLICT(id, instance_id) DO UPDATE SET
+        name=excluded.name,
+        info=excluded.info,
+        sync_datetime=excluded.sync_datetime,
+        is_deleted=0
+"""
+
+UPSERT_KB_SQL = """
+    INSERT INTO knowledge_bases (
+        id, instance_id, name, description, data, created_at,
+        updated_at, sync_datetime, is_deleted
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+    ON CONFLICT(id, instance_id) DO UPDATE SET
+        name=excluded.name,
+        description=excluded.description,
+        data=excluded.data,
+        updated_at=excluded.updated_at,
+        sync_datetime=excluded.sync_datetime,
+        is_deleted=0
+"""
+
+UPSERT_FILE_SQL = """
+    INSERT INTO files (
+        id, message_id, instance_id, filename, file_type,
+        size_bytes, hash, sync_datetime
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id, instance_id) DO UPDATE SET
+        filename=excluded.filename,
+        file_type=excluded.file_type,
+        sync_datetime=excluded.sync_datetime
+"""
+
+
+# ============================================================================
+# INDEXES
+# ============================================================================
+# Dropped on open: replaced by composite indexes that serve the same lookups
+# and also the instance + not deleted + date range filters used by reports.
+# Check query plans with `sync_cli.py db check-plans` (see query_plans.py).
+
+SUPERSEDED_INDEXES = (
+    'idx_users_instance',
+    'idx_users_deleted',
+    'idx_chats_instance',
+    'idx_chats_deleted',
+    'idx_chats_updated',
+    'idx_messages_chat',
+    'idx_messages_role',
+)
+
+
+def _user_params(user_data: Dict[str, Any], instance_id: int, sync_time: datetime) -> tuple:
+    """Build UPSERT_USER_SQL parameters from API user data."""
+    return (
+        user_data['id'],
+        instance_id,
+        user_data.get('name'),
+        user_data.get('email'),
+        user_data.get('role'),
+        user_data.get('profile_image_url'),
+        user_data.get('created_at'),
+        user_data.get('updated_at'),
+        sync_time
+    )
+
+
+def user_activity_at(user_data: Dict[str, Any]) -> Optional[int]:
+    """
+    Latest activity timestamp of an API user (Unix seconds).
+
+    OpenWebUI bumps last_active_at on every request the user makes and
+    updated_at when their profile changes.
+
+    Args:
+        user_data: User from /api/v1/users/all
+
+    Returns:
+        int or None: The later of the two timestamps, None if neither is set
+    """
+    timestamps = [user_data.get(key) for key in ('last_active_at', 'updated_at')]
+    timestamps = [int(value) for value in timestamps if value is not None]
+    return max(timestamps) if timestamps else None
+
+
+def _chat_params(chat_data: Dict[str, Any], instance_id: int, user_id: str,
+                 sync_time: datetime, messages_hash: Optional[str] = None) -> tuple:
+    """Build UPSERT_CHAT_SQL parameters from API chat data."""
+    # Convert timestamp to datetime if needed
+    created_at = chat_data.get('created_at')
+    updated_at = chat_data.get('updated_at')
+
+    if isinstance(created_at, (int, float)):
+        created_at = datetime.fromtimestamp(created_at)
+    if isinstance(updated_at, (int, float)):
+        updated_at = datetime.fromtimestamp(updated_at)
+
+    return (
+        chat_data['id'],
+        instance_id,
+        user_id,
+        chat_data.get('title'),
+        created_at,
+        updated_at,
+        sync_time,
+        chat_data.get('archived', False),
+        chat_data.get('pinned', False),
+        chat_data.get('folder_id'),
+        chat_data.get('share_id'),
+        messages_hash
+    )
+
+
+def content_hash(content: Optional[str]) -> str:
+    """
+    Hash message content for change detection.
+
+    Args:
+        content: Message content (None is treated as empty)
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def message_fingerprint(message_data: Dict[str, Any]) -> tuple:
+    """
+    Get the (content_hash, has_files) pair used to detect edited messages.
+
+    Args:
+        message_data: Message data from API
+
+    Returns:
+        tuple: Comparable with DatabaseManager.get_message_fingerprints() values
+    """
+    return (content_hash(message_data.get('content')), len(message_data.get('files', [])) > 0)
+
+
+def messages_hash(fingerprints: Iterable[tuple]) -> str:
+    """
+    Hash a chat's message list from its message fingerprints, in order.
+
+    Stored on the chat so a refetched chat whose messages did not change can
+    skip message diffing entirely.
+
+    Args:
+        fingerprints: (message_id, message_fingerprint(message)) pairs
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    for message_id, (fingerprint_hash, has_files) in fingerprints:
+        digest.update(f"{message_id}:{fingerprint_hash}:{int(has_files)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _message_params(message_data: Dict[str, Any], chat_id: str,
+                    instance_id: int, sync_time: datetime) -> tuple:
+    """Build UPSERT_MESSAGE_SQL parameters from API message data (body goes to message_contents)."""
+    content = message_data.get('content', '')
+    content_length = len(content) if content else 0
+    has_files = len(message_data.get('files', [])) > 0
+
+    # OpenWebUI messages carry a Unix 'timestamp' rather than created_at
+    created_at = message_data.get('created_at') or message_data.get('timestamp')
+    if isinstance(created_at, (int, float)):
+        created_at = datetime.fromtimestamp(created_at)
+
+    return (
+        message_data['id'],
+        chat_id,
+        instance_id,
+        message_data.get('parentId'),
+        message_data.get('role'),
+        content_length,
+        content_hash(content),
+        created_at,
+        sync_time,
+        has_files,
+        message_data.get('model')
+    )
+
+
+def _stored_size(value: Any) -> int:
+    """Size in bytes of a stored content value (text or compressed blob)."""
+    if value is None:
+        return 0
+    return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+
+_FTS_OPERATORS = re.compile(r'"|\b(AND|OR|NOT|NEAR)\b')
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn user search input into an FTS5 query.
+
+    Plain words are quoted (so punctuation cannot break the query) and all
+    must match; a trailing * keeps prefix matching. Input that already uses
+    quotes or FTS5 operators is passed through unchanged.
+
+    Args:
+        text: Search input
+
+    Returns:
+        str: FTS5 MATCH expression
+    """
+    if _FTS_OPERATORS.search(text):
+        return text
+
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms) or '""'
+
+
+def make_snippet(content: Optional[str], query: str, width: int = 160) -> str:
+    """
+    Cut a single-line excerpt of content around the first query match.
+
+    Args:
+        content: Message content
+        query: Search input (see fts_query())
+        width: Approximate excerpt length in characters
+
+    Returns:
+        str: Excerpt, with '...' where text was cut
+    """
+    text = ' '.join((content or '').split())
+    words = [w.strip('*"').lower() for w in query.split() if w.upper() not in ('AND', 'OR', 'NOT', 'NEAR')]
+    lowered = text.lower()
+
+    # Match on a shortened stem so 'depositions' also finds 'deposition'
+    positions = [lowered.find(w[:max(4, len(w) - 3)]) for w in words if w]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+
+    excerpt = text[start:start + width]
+    if start > 0:
+        excerpt = '...' + excerpt
+    if start + width < len(text):
+        excerpt += '...'
+    return excerpt
+
+
+def _model_params(model_data: Dict[str, Any], instance_id: int, sync_time: datetime) -> tuple:
+    """Build UPSERT_MODEL_SQL parameters from API model data."""
+    return (
+        model_data['id'],
+        instance_id,
+        model_data.get('name', model_data['id']),
+        json.dumps(model_data),
+        sync_time
+    )
+
+
+def _kb_params(kb_data: Dict[str, Any], instance_id: int, sync_time: datetime) -> tuple:
+    """Build UPSERT_KB_SQL parameters from API knowledge base data."""
+    return (
+        kb_data['id'],
+        instance_id,
+        kb_data.get('name'),
+        kb_data.get('description'),
+        json.dumps(kb_data),
+        kb_data.get('created_at'),
+        kb_data.get('updated_at'),
+        sync_time
+    )
+
+
+def _file_params(file_data: Dict[str, Any], message_id: str,
+                 instance_id: int, sync_time: datetime) -> tuple:
+    """Build UPSERT_FILE_SQL parameters from API file attachment data."""
+    file_info = file_data.get('file', {})
+
+    return (
+        file_info.get('id'),
+        message_id,
+        instance_id,
+        file_info.get('filename'),
+        file_data.get('type'),
+        file_info.get('size'),
+        file_info.get('hash'),
+        sync_time
+    )
+
+
+# Statement type names used for database timings (see metrics.py)
+STATEMENT_NAMES = {
+    CHECKPOINT_CHAT_SQL: 'checkpoint_chat',
+    CHECKPOINT_USER_SQL: 'checkpoint_user',
+    UPSERT_USER_SYNC_STATE_SQL: 'upsert_user_sync_state',
+    UPSERT_USER_SQL: 'upsert_user',
+    MARK_USER_DELETED_SQL: 'mark_user_deleted',
+    UPSERT_CHAT_SQL: 'upsert_chat',
+    TOUCH_CHAT_SQL: 'touch_chat',
+    UPSERT_CHAT_MODEL_SQL: 'upsert_chat_model',
+    DELETE_CHAT_MODELS_SQL: 'delete_chat_models',
+    DELETE_CHAT_MODEL_SQL: 'delete_chat_model',
+    UPSERT_MESSAGE_SQL: 'upsert_message',
+    DELETE_MESSAGES_SQL: 'delete_messages',
+    DELETE_MESSAGE_SQL: 'delete_message',
+    UPSERT_MODEL_SQL: 'upsert_model',
+    UPSERT_KB_SQL: 'upsert_knowledge_base',
+    UPSERT_FILE_SQL: 'upsert_file',
+}
+
+
+def _not_timed(statement: str):
+    """Stand-in for SyncMetrics.time_db when a write is not measured."""
+    return nullcontext()
+
+
+def _writes(method: Callable) -> Callable:
+    """Route a DatabaseManager write method through the single writer, if active."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._run_write(method, self, *args, **kwargs)
+    return wrapper
+
+
+class _WriterThread(threading.Thread):
+    """
+    Dedicated thread that executes all database writes in submission order.
+
+    Used by DatabaseManager.single_writer() so concurrent syncs funnel their
+    writes through one connection and SQLite never sees lock contention.
+    """
+
+    def __init__(self):
+        super().__init__(name="openwebui-sync-writer", daemon=True)
+        self.jobs: "queue.Queue[Optional[tuple]]" = queue.Queue()
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue a write and return a future for its result."""
+        future = Future()
+        self.jobs.put((future, func, args, kwargs))
+        return future
+
+    def stop(self):
+        """Finish queued writes and stop the thread."""
+        self.jobs.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            future, func, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
 
 
 class DatabaseManager:
@@ -22,31 +515,91 @@ class DatabaseManager:
 
     Provides methods for:
     - Database initialization and schema creation
-    - Connection management with context managers
+    - Long-lived, tuned WAL connections (one per thread)
+    - Optional single writer thread for concurrent syncs (see single_writer())
     - CRUD operations for all entities
-    - Efficient batch inserts and updates
+    - Efficient batch inserts and updates (see batch())
+    - Compressed message content, decoded on demand (see compression.py)
+    - Full-text search over messages and chat titles (see search_messages())
+    - Daily usage rollups kept current by triggers (see rollups.py)
+    - Per-instance row counters for status (instance_stats, also by trigger)
+    - Monthly archive databases for old chats (see archive_chats())
     """
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, archive_dir: str = None):
         """
         Initialize database manager.
 
         Args:
             db_path: Path to SQLite database file. Uses config default if not specified.
+            archive_dir: Directory of the monthly archive databases. Uses
+                         ARCHIVE_DIR, or a folder next to the database file.
         """
         self.db_path = db_path or str(DB_PATH)
+        db_file = Path(self.db_path)
+        self.archive_dir = Path(archive_dir or ARCHIVE_DIR or db_file.with_name(f"{db_file.stem}_archive"))
+        self._local = threading.local()
+        self._connections_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._writer: Optional[_WriterThread] = None
+        self.codec = ContentCodec(None)
+        self.search_available = False
+        self._search_index_created = False
+        self._rollups_created = False
+        self._instance_stats_created = False
         self._ensure_database()
+        self.codec = self.load_codec()
+
+        if self._search_index_created:
+            self.rebuild_search_index()
+        if self._rollups_created:
+            self.rebuild_rollups()
+        if self._instance_stats_created:
+            self.rebuild_instance_stats()
 
     def _ensure_database(self):
         """Create database and tables if they don't exist."""
         with self.get_connection() as conn:
             self._create_tables(conn)
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Get this thread's connection, opening and tuning it on first use.
+
+        Connections stay open for the lifetime of the manager. WAL mode lets
+        reports and status queries read while a sync is writing.
+
+        Returns:
+            sqlite3.Connection: Database connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+            conn.row_factory = sqlite3.Row  # Access columns by name
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+            conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+
+            # SELECT decompress(content, content_codec) FROM messages
+            conn.create_function("decompress", 2, self._decompress_sql, deterministic=True)
+
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
     @contextmanager
     def get_connection(self):
         """
         Get database connection with context manager.
 
+        Reuses the calling thread's long-lived connection. The outermost
+        context commits on success and rolls back on error; nested contexts
+        join the enclosing transaction.
+
         Yields:
             sqlite3.Connection: Database connection
 
@@ -54,16 +607,60 @@ class DatabaseManager:
             with db.get_connection() as conn:
                 cursor = conn.execute("SELECT * FROM users")
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Access columns by name
+        conn = self._connect()
+        self._local.depth += 1
         try:
             yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
+            if self._local.depth == 1:
+                conn.commit()
+        except BaseException:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+
+    @contextmanager
+    def single_writer(self):
+        """
+        Funnel all writes through one dedicated writer thread.
+
+        While active, every write method and batch flush called from any
+        thread is executed by the writer thread in submission order, and the
+        caller waits for it to finish. Reads still use the calling thread's
+        own connection. Nested calls reuse the running writer.
+
+        Example:
+            with db.single_writer():
+                # run syncs in several threads
+        """
+        if self._writer is not None:
+            yield
+            return
+
+        writer = _WriterThread()
+        writer.start()
+        self._writer = writer
+        try:
+            yield
         finally:
-            conn.close()
+            self._writer = None
+            writer.stop()
+
+    def _run_write(self, func: Callable, *args, **kwargs):
+        """Execute a write on the single writer thread if active, else inline."""
+        writer = self._writer
+        if writer is None or threading.current_thread() is writer:
+            return func(*args, **kwargs)
+        return writer.submit(func, *args, **kwargs).result()
+
+    def close(self):
+        """Close all connections opened by this manager."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
 
     def _create_tables(self, conn: sqlite3.Connection):
         """
@@ -85,6 +682,7 @@ class DatabaseManager:
                 users_synced INTEGER DEFAULT 0,
                 chats_synced INTEGER DEFAULT 0,
                 messages_synced INTEGER DEFAULT 0,
+                bytes_received INTEGER DEFAULT 0,
                 status VARCHAR(20) NOT NULL,
                 error_message TEXT
             )
@@ -122,9 +720,9 @@ class DatabaseManager:
                 FOREIGN KEY (instance_id) REFERENCES instances(id)
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_instance ON users(instance_id)")
+        # Active users of an instance, in report order
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_instance_active ON users(instance_id, is_deleted, name)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_deleted ON users(is_deleted)")
 
         # Chats table
         cursor.execute("""
@@ -141,15 +739,15 @@ class DatabaseManager:
                 pinned BOOLEAN DEFAULT 0,
                 folder_id VARCHAR(36),
                 share_id VARCHAR(36),
+                messages_hash VARCHAR(64),
                 PRIMARY KEY (id, instance_id),
                 FOREIGN KEY (instance_id) REFERENCES instances(id),
                 FOREIGN KEY (user_id, instance_id) REFERENCES users(id, instance_id)
             )
         """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_user ON chats(user_id, instance_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_updated ON chats(updated_at)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_instance ON chats(instance_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_deleted ON chats(is_deleted)")
+        # Instance + deleted flag + updated_at range (status, reports, sync deletion checks)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_instance_active ON chats(instance_id, is_deleted, updated_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_sync ON chats(sync_datetime)")
 
         # Chat models (many-to-many)
@@ -164,6 +762,7 @@ class DatabaseManager:
             )
         """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_models_model ON chat_models(model_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_models_sync ON chat_models(sync_datetime)")
 
         # Messages table
         cursor.execute("""
@@ -173,17 +772,31 @@ class DatabaseManager:
                 instance_id INTEGER NOT NULL,
                 parent_id VARCHAR(36),
                 role VARCHAR(20) NOT NULL,
-                content TEXT,
                 content_length INTEGER,
+                content_hash VARCHAR(64),
                 created_at DATETIME,
                 sync_datetime DATETIME NOT NULL,
                 has_files BOOLEAN DEFAULT 0,
+                model VARCHAR(255),
                 PRIMARY KEY (id, instance_id),
                 FOREIGN KEY (chat_id, instance_id) REFERENCES chats(id, instance_id)
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages(chat_id, instance_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_role ON messages(role)")
+        # A chat's messages in order (also keeps chat lookups off idx_messages_instance_created)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_chat_created ON messages(chat_id, instance_id, created_at)")
+        # Covers per-instance counts and date/role breakdowns without touching the table
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_instance_created ON messages(instance_id, created_at, role)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_sync ON messages(sync_datetime)")
+
+        # Message bodies, stored once per distinct content (messages.content_hash -> hash)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS message_contents (
+                hash VARCHAR(64) PRIMARY KEY,
+                content TEXT,
+                content_codec VARCHAR(32),
+                content_length INTEGER
+            )
+        """)
 
         # Models table
         cursor.execute("""
@@ -235,12 +848,256 @@ class DatabaseManager:
         """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_message ON files(message_id, instance_id)")
 
+        # Full sync checkpoints (progress of a run, used by --resume)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_checkpoint_users (
+                sync_run_id INTEGER NOT NULL,
+                user_id VARCHAR(36) NOT NULL,
+                completed_at DATETIME NOT NULL,
+                PRIMARY KEY (sync_run_id, user_id),
+                FOREIGN KEY (sync_run_id) REFERENCES sync_runs(id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_checkpoint_chats (
+                sync_run_id INTEGER NOT NULL,
+                chat_id VARCHAR(36) NOT NULL,
+                messages_synced INTEGER DEFAULT 0,
+                PRIMARY KEY (sync_run_id, chat_id),
+                FOREIGN KEY (sync_run_id) REFERENCES sync_runs(id)
+            )
+        """)
+
+        # Per-user incremental sync state: the user's activity timestamp and a
+        # smoothed count of changed chats as of the last check (used to order
+        # users), and when a time-budgeted run left the user for the next one
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_sync_state (
+                user_id VARCHAR(36) NOT NULL,
+                instance_id INTEGER NOT NULL,
+                checked_at DATETIME,
+                activity_at INTEGER,
+                change_rate REAL,
+                deferred_at DATETIME,
+                PRIMARY KEY (user_id, instance_id),
+                FOREIGN KEY (instance_id) REFERENCES instances(id)
+            )
+        """)
+
+        # Timings and counters of each sync run (see metrics.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_run_metrics (
+                sync_run_id INTEGER NOT NULL,
+                metric VARCHAR(32) NOT NULL,
+                label VARCHAR(64) NOT NULL DEFAULT '',
+                count INTEGER NOT NULL DEFAULT 1,
+                total REAL NOT NULL,
+                buckets TEXT,
+                PRIMARY KEY (sync_run_id, metric, label),
+                FOREIGN KEY (sync_run_id) REFERENCES sync_runs(id)
+            )
+        """)
+
+        # Trained zstd dictionaries for message content (see compression.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                codec VARCHAR(16) NOT NULL,
+                data BLOB NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        self._migrate_schema(conn)
+        self._create_search_index(conn)
+        archive.create_archive_tables(conn)
+        self._rollups_created = rollups.create_rollups(conn)
+        self._instance_stats_created = rollups.create_instance_stats(conn)
+
         conn.commit()
 
+    def _create_search_index(self, conn: sqlite3.Connection):
+        """
+        Create the FTS5 search tables and the triggers that maintain them.
+
+        - message_contents_fts is contentless (bodies are compressed, so the
+          index cannot read them back); rowid = message_contents.rowid, so
+          each distinct body is indexed once. New bodies are indexed by
+          _store_message_contents(); deleted bodies are queued in
+          search_index_deletes by trigger and removed by _apply_search_deletes().
+        - chats_fts is an external-content index over chats.title, kept in
+          sync entirely by triggers.
+
+        Sets search_available, and _search_index_created if the index has
+        to be built from existing data.
+
+        Args:
+            conn: Database connection
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'message_contents_fts'"
+        ).fetchone()
+
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS message_contents_fts
+                USING fts5(content, content='', tokenize='porter unicode61')
+            """)
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts
+                USING fts5(title, content='chats', content_rowid='rowid', tokenize='porter unicode61')
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"  [WARN] Full-text search unavailable (SQLite built without FTS5): {e}")
+            return
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_index_deletes (
+                content_rowid INTEGER PRIMARY KEY,
+                content TEXT,
+                content_codec VARCHAR(32)
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_message_contents_fts_delete
+            AFTER DELETE ON message_contents
+            BEGIN
+                INSERT OR REPLACE INTO search_index_deletes (content_rowid, content, content_codec)
+                VALUES (OLD.rowid, OLD.content, OLD.content_codec);
+            END
+        """)
+
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_chats_fts_insert
+            AFTER INSERT ON chats
+            BEGIN
+                INSERT INTO chats_fts (rowid, title) VALUES (NEW.rowid, NEW.title);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_chats_fts_delete
+            AFTER DELETE ON chats
+            BEGIN
+                INSERT INTO chats_fts (chats_fts, rowid, title) VALUES ('delete', OLD.rowid, OLD.title);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_chats_fts_update
+            AFTER UPDATE OF title ON chats
+            WHEN OLD.title IS NOT NEW.title
+            BEGIN
+                INSERT INTO chats_fts (chats_fts, rowid, title) VALUES ('delete', OLD.rowid, OLD.title);
+                INSERT INTO chats_fts (rowid, title) VALUES (NEW.rowid, NEW.title);
+            END
+        """)
+
+        self.search_available = True
+        self._search_index_created = not exists and conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM message_contents) OR EXISTS (SELECT 1 FROM chats)"
+        ).fetchone()[0]
+
+    def _migrate_schema(self, conn: sqlite3.Connection):
+        """
+        Add columns introduced after a database was first created.
+
+        Args:
+            conn: Database connection
+        """
+        new_columns = {
+            'sync_runs': [
+                ('bytes_received', 'INTEGER DEFAULT 0'),
+            ],
+            'messages': [
+                ('content_hash', 'VARCHAR(64)'),
+                ('model', 'VARCHAR(255)'),
+            ],
+            'chats': [
+                ('messages_hash', 'VARCHAR(64)'),
+            ],
+        }
+
+        for table, columns in new_columns.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+        self._migrate_message_contents(conn)
+
+        # Single-column indexes superseded by the composite ones in _create_tables
+        for index in SUPERSEDED_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_content_hash ON messages(content_hash)")
+
+        # Drop a body once no message references it any more
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_messages_release_content_delete
+            AFTER DELETE ON messages
+            BEGIN
+                DELETE FROM message_contents
+                WHERE hash = OLD.content_hash
+                  AND NOT EXISTS (SELECT 1 FROM messages WHERE content_hash = OLD.content_hash);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_messages_release_content_update
+            AFTER UPDATE OF content_hash ON messages
+            WHEN OLD.content_hash IS NOT NEW.content_hash
+            BEGIN
+                DELETE FROM message_contents
+                WHERE hash = OLD.content_hash
+                  AND NOT EXISTS (SELECT 1 FROM messages WHERE content_hash = OLD.content_hash);
+            END
+        """)
+
+    def _migrate_message_contents(self, conn: sqlite3.Connection):
+        """
+        Move bodies stored inline in messages.content into message_contents.
+
+        Databases created before content deduplication keep content in the
+        messages table. Bodies are moved as stored (compressed or not), and
+        the inline columns are left NULL. Run VACUUM afterwards to reclaim
+        the space.
+
+        Args:
+            conn: Database connection
+        """
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if 'content' not in columns:
+            return
+        if not conn.execute("SELECT 1 FROM messages WHERE content IS NOT NULL LIMIT 1").fetchone():
+            return
+
+        print("  [INFO] Moving message bodies into message_contents (one-time migration)...")
+        codec_column = 'content_codec' if 'content_codec' in columns else 'NULL'
+
+        # Rows synced before content_hash existed (always plain text)
+        rows = conn.execute(
+            "SELECT rowid, content FROM messages WHERE content_hash IS NULL AND content IS NOT NULL"
+        ).fetchall()
+        conn.executemany(
+            "UPDATE messages SET content_hash = ? WHERE rowid = ?",
+            [(content_hash(row[1]), row[0]) for row in rows]
+        )
+
+        conn.execute(f"""
+            INSERT INTO message_contents (hash, content, content_codec, content_length)
+            SELECT content_hash, content, {codec_column}, content_length
+            FROM messages
+            WHERE content IS NOT NULL
+            ON CONFLICT(hash) DO NOTHING
+        """)
+        conn.execute(f"""
+            UPDATE messages SET content = NULL{", content_codec = NULL" if codec_column != 'NULL' else ""}
+            WHERE content IS NOT NULL
+        """)
+
     # ========================================================================
     # INSTANCE OPERATIONS
     # ========================================================================
 
+    @_writes
     def upsert_instance(self, name: str, url: str, api_key: str, is_active: bool = True) -> int:
         """
         Insert or update an instance.
@@ -281,6 +1138,7 @@ class DatabaseManager:
             row = cursor.fetchone()
             return row[0] if row else None
 
+    @_writes
     def update_instance_last_sync(self, instance_id: int, sync_time: datetime):
         """
         Update last sync timestamp for an instance.
@@ -315,10 +1173,44 @@ class DatabaseManager:
                 return datetime.fromisoformat(row[0])
             return None
 
+    def get_instance_summary(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get an instance's last sync time and row counts (for status).
+
+        Counts come from instance_stats, which triggers keep current, so
+        this is one row lookup regardless of database size.
+
+        Args:
+            name: Instance name
+
+        Returns:
+            dict or None: last_sync_at, user_count, chat_count and message_count
+                          (active users and chats in the main database), and
+                          archived_chat_count and archived_message_count (see
+                          archive_chats()), None if the instance is unknown
+        """
+        with self.get_connection() as conn:
+            row = conn.execute("""
+                SELECT
+                    i.last_sync_at,
+                    COALESCE(s.users, 0) as user_count,
+                    COALESCE(s.chats, 0) as chat_count,
+                    COALESCE(s.messages, 0) as message_count,
+                    (SELECT COUNT(*) FROM archived_chats
+                     WHERE instance_id = i.id) as archived_chat_count,
+                    (SELECT COALESCE(SUM(message_count), 0) FROM archived_chats
+                     WHERE instance_id = i.id) as archived_message_count
+                FROM instances i
+                LEFT JOIN instance_stats s ON s.instance_id = i.id
+                WHERE i.name = ?
+            """, (name,)).fetchone()
+            return dict(row) if row else None
+
     # ========================================================================
     # SYNC RUN OPERATIONS
     # ========================================================================
 
+    @_writes
     def start_sync_run(self, instance_name: str, sync_type: str) -> int:
         """
         Create a new sync run record.
@@ -338,8 +1230,10 @@ class DatabaseManager:
             """, (instance_name, sync_type, datetime.now()))
             return cursor.fetchone()[0]
 
+    @_writes
     def complete_sync_run(self, sync_run_id: int, users_synced: int = 0,
-                          chats_synced: int = 0, messages_synced: int = 0):
+                          chats_synced: int = 0, messages_synced: int = 0,
+                          bytes_received: int = 0, status: str = 'success'):
         """
         Mark sync run as completed successfully.
 
@@ -348,18 +1242,24 @@ class DatabaseManager:
             users_synced: Number of users synced
             chats_synced: Number of chats synced
             messages_synced: Number of messages synced
+            bytes_received: Response bytes received on the wire
+            status: 'success', or 'partial' if a time budget stopped the run
+                    before every user was checked
         """
         with self.get_connection() as conn:
             conn.execute("""
                 UPDATE sync_runs
-                SET status = 'success',
+                SET status = ?,
                     completed_at = ?,
                     users_synced = ?,
                     chats_synced = ?,
-                    messages_synced = ?
+                    messages_synced = ?,
+                    bytes_received = ?
                 WHERE id = ?
-            """, (datetime.now(), users_synced, chats_synced, messages_synced, sync_run_id))
+            """, (status, datetime.now(), users_synced, chats_synced, messages_synced,
+                  bytes_received, sync_run_id))
 
+    @_writes
     def fail_sync_run(self, sync_run_id: int, error_message: str):
         """
         Mark sync run as failed.
@@ -377,170 +1277,448 @@ class DatabaseManager:
                 WHERE id = ?
             """, (datetime.now(), error_message, sync_run_id))
 
-    # ========================================================================
-    # USER OPERATIONS
-    # ========================================================================
+    def get_resumable_sync_run(self, instance_name: str) -> Optional[int]:
+        """
+        Find an interrupted full sync that can be resumed.
 
-    def upsert_user(self, user_data: Dict[str, Any], instance_id: int, sync_time: datetime):
+        A full sync run is resumable if it did not succeed and no full sync
+        of the same instance has succeeded since it started.
+
+        Args:
+            instance_name: Instance name
+
+        Returns:
+            int or None: Sync run ID if found
         """
-        Insert or update a user.
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT id FROM sync_runs r
+                WHERE instance_name = ? AND sync_type = 'full' AND status != 'success'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM sync_runs s
+                      WHERE s.instance_name = r.instance_name AND s.sync_type = 'full'
+                        AND s.status = 'success' AND s.started_at > r.started_at
+                  )
+                ORDER BY started_at DESC
+                LIMIT 1
+            """, (instance_name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    @_writes
+    def resume_sync_run(self, sync_run_id: int):
+        """
+        Mark a previously interrupted sync run as in progress again.
 
         Args:
-            user_data: User data from API
-            instance_id: Instance ID
-            sync_time: Current sync timestamp
+            sync_run_id: Sync run ID
         """
         with self.get_connection() as conn:
             conn.execute("""
-                INSERT INTO users (
-                    id, instance_id, name, email, role, profile_image_url,
-                    created_at, updated_at, sync_datetime, is_deleted
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-                ON CONFLICT(id, instance_id) DO UPDATE SET
-                    name=excluded.name,
-                    email=excluded.email,
-                    role=excluded.role,
-                    profile_image_url=excluded.profile_image_url,
-                    updated_at=excluded.updated_at,
-                    sync_datetime=excluded.sync_datetime,
-                    is_deleted=0
-            """, (
-                user_data['id'],
-                instance_id,
-                user_data.get('name'),
-                user_data.get('email'),
-                user_data.get('role'),
-                user_data.get('profile_image_url'),
-                user_data.get('created_at'),
-                user_data.get('updated_at'),
-                sync_time
-            ))
+                UPDATE sync_runs
+                SET status = 'in_progress',
+                    completed_at = NULL,
+                    error_message = NULL
+                WHERE id = ?
+            """, (sync_run_id,))
 
-    def get_user_ids_for_instance(self, instance_id: int) -> set:
+    def get_sync_checkpoint(self, sync_run_id: int) -> Dict[str, Any]:
         """
-        Get all user IDs for an instance.
+        Get the progress recorded for a sync run.
 
         Args:
-            instance_id: Instance ID
+            sync_run_id: Sync run ID
 
         Returns:
-            set: Set of user IDs
+            dict: completed_users (set), completed_chats (set),
+                  chats_synced (int), messages_synced (int)
         """
         with self.get_connection() as conn:
-            cursor = conn.execute(
-                "SELECT id FROM users WHERE instance_id = ? AND is_deleted = 0",
-                (instance_id,)
-            )
-            return {row[0] for row in cursor.fetchall()}
-
-    def mark_users_deleted(self, user_ids: List[str], instance_id: int):
+            completed_users = {
+                row[0] for row in conn.execute(
+                    "SELECT user_id FROM sync_checkpoint_users WHERE sync_run_id = ?",
+                    (sync_run_id,)
+                )
+            }
+            completed_chats = set()
+            messages_synced = 0
+            for row in conn.execute(
+                "SELECT chat_id, messages_synced FROM sync_checkpoint_chats WHERE sync_run_id = ?",
+                (sync_run_id,)
+            ):
+                completed_chats.add(row[0])
+                messages_synced += row[1] or 0
+
+        return {
+            'completed_users': completed_users,
+            'completed_chats': completed_chats,
+            'chats_synced': len(completed_chats),
+            'messages_synced': messages_synced,
+        }
+
+    @_writes
+    def clear_sync_checkpoints(self, instance_name: str):
         """
-        Mark users as deleted.
+        Delete all checkpoints recorded for an instance's sync runs.
 
         Args:
-            user_ids: List of user IDs to mark deleted
-            instance_id: Instance ID
+            instance_name: Instance name
         """
-        if not user_ids:
-            return
-
         with self.get_connection() as conn:
-            placeholders = ','.join('?' * len(user_ids))
-            conn.execute(f"""
-                UPDATE users
-                SET is_deleted = 1
-                WHERE id IN ({placeholders}) AND instance_id = ?
-            """, (*user_ids, instance_id))
-
-    # ========================================================================
-    # CHAT OPERATIONS
-    # ========================================================================
-
-    def upsert_chat(self, chat_data: Dict[str, Any], instance_id: int,
-                    user_id: str, sync_time: datetime):
+            for table in ('sync_checkpoint_chats', 'sync_checkpoint_users'):
+                conn.execute(f"""
+                    DELETE FROM {table}
+                    WHERE sync_run_id IN (SELECT id FROM sync_runs WHERE instance_name = ?)
+                """, (instance_name,))
+
+    @_writes
+    def save_sync_metrics(self, sync_run_id: int, rows: List[tuple]):
         """
-        Insert or update a chat.
+        Store the metrics of a sync run, replacing any from an earlier attempt.
 
         Args:
-            chat_data: Chat data from API
-            instance_id: Instance ID
-            user_id: User ID who owns the chat
-            sync_time: Current sync timestamp
+            sync_run_id: Sync run ID
+            rows: (metric, label, count, total, buckets) tuples from SyncMetrics.rows()
         """
         with self.get_connection() as conn:
-            # Convert timestamp to datetime if needed
-            created_at = chat_data.get('created_at')
-            updated_at = chat_data.get('updated_at')
+            conn.execute("DELETE FROM sync_run_metrics WHERE sync_run_id = ?", (sync_run_id,))
+            conn.executemany("""
+                INSERT INTO sync_run_metrics (sync_run_id, metric, label, count, total, buckets)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(sync_run_id,) + tuple(row) for row in rows])
 
-            if isinstance(created_at, (int, float)):
-                created_at = datetime.fromtimestamp(created_at)
-            if isinstance(updated_at, (int, float)):
-                updated_at = datetime.fromtimestamp(updated_at)
+    def get_sync_metrics(self, sync_run_id: int) -> List[Dict[str, Any]]:
+        """
+        Get the stored metrics of a sync run.
 
-            conn.execute("""
-                INSERT INTO chats (
-                    id, instance_id, user_id, title, created_at, updated_at,
-                    sync_datetime, archived, pinned, folder_id, share_id, is_deleted
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-                ON CONFLICT(id, instance_id) DO UPDATE SET
-                    title=excluded.title,
-                    updated_at=excluded.updated_at,
-                    sync_datetime=excluded.sync_datetime,
-                    archived=excluded.archived,
-                    pinned=excluded.pinned,
-                    folder_id=excluded.folder_id,
-                    share_id=excluded.share_id,
-                    is_deleted=0
-            """, (
-                chat_data['id'],
-                instance_id,
-                user_id,
-                chat_data.get('title'),
-                created_at,
-                updated_at,
-                sync_time,
-                chat_data.get('archived', False),
-                chat_data.get('pinned', False),
-                chat_data.get('folder_id'),
-                chat_data.get('share_id')
-            ))
+        Args:
+            sync_run_id: Sync run ID
 
-    def get_chat(self, chat_id: str, instance_id: int) -> Optional[Dict]:
+        Returns:
+            list: Dicts with metric, label, count, total and buckets, in the
+                  order they were recorded
         """
-        Get chat by ID.
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT metric, label, count, total, buckets
+                FROM sync_run_metrics
+                WHERE sync_run_id = ?
+                ORDER BY rowid
+            """, (sync_run_id,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_sync_run(self, sync_run_id: int = None, instance_name: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a sync run by ID, or the latest run (of an instance, if given).
 
         Args:
-            chat_id: Chat ID
-            instance_id: Instance ID
+            sync_run_id: Sync run ID
+            instance_name: Only consider runs of this instance
 
         Returns:
-            dict or None: Chat data if found
+            dict or None: The sync_runs row
         """
         with self.get_connection() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM chats WHERE id = ? AND instance_id = ?",
-                (chat_id, instance_id)
-            )
+            if sync_run_id is not None:
+                cursor = conn.execute("SELECT * FROM sync_runs WHERE id = ?", (sync_run_id,))
+            elif instance_name is not None:
+                cursor = conn.execute("""
+                    SELECT * FROM sync_runs WHERE instance_name = ?
+                    ORDER BY started_at DESC LIMIT 1
+                """, (instance_name,))
+            else:
+                cursor = conn.execute("SELECT * FROM sync_runs ORDER BY started_at DESC LIMIT 1")
             row = cursor.fetchone()
             return dict(row) if row else None
 
-    def touch_chat(self, chat_id: str, instance_id: int, sync_time: datetime):
-        """
-        Update chat sync_datetime to mark it as still existing.
-
+    # ========================================================================
+    # BATCH OPERATIONS
+    # ========================================================================
+
+    @contextmanager
+    def batch(self, batch_size: int = DB_BATCH_SIZE, metrics: SyncMetrics = None):
+        """
+        Get a batch writer that buffers writes and commits once per batch.
+
+        Queued rows are written with executemany in a single transaction
+        whenever batch_size rows have accumulated, and once more on exit.
+        On error, rows not yet flushed are discarded.
+
         Args:
-            chat_id: Chat ID
+            batch_size: Rows to buffer before each flush and commit
+            metrics: Sync run metrics to record flush and statement timings in
+
+        Yields:
+            BatchWriter: Writer with the same upsert/delete methods as this class
+
+        Example:
+            with db.batch() as batch:
+                for message in messages:
+                    batch.upsert_message(message, chat_id, instance_id, sync_time)
+        """
+        writer = BatchWriter(self, batch_size, metrics)
+        yield writer
+        writer.flush()
+
+    @_writes
+    def write_rows(self, statements: List[tuple], contents: List[tuple] = None,
+                   metrics: SyncMetrics = None):
+        """
+        Execute queued statements in one transaction.
+
+        Args:
+            statements: (sql, list of parameter tuples) pairs, in execution order
+            contents: Message bodies referenced by the statements, as
+                      (hash, content, encoded) tuples (see _store_message_contents)
+            metrics: Sync run metrics to record the time of each statement type in
+        """
+        time_db = metrics.time_db if metrics is not None else _not_timed
+        with self.get_connection() as conn:
+            for sql, rows in statements:
+                with time_db(STATEMENT_NAMES.get(sql, 'other')):
+                    conn.executemany(sql, rows)
+            with time_db('search_deletes'):
+                self._apply_search_deletes(conn)
+            if contents:
+                with time_db('insert_message_contents'):
+                    self._store_message_contents(conn, contents)
+            commit_started = time.perf_counter()
+        if metrics is not None:
+            metrics.observe_db('commit', time.perf_counter() - commit_started)
+
+    def get_stored_content_hashes(self, hashes: Iterable[str]) -> set:
+        """
+        Find which message bodies are already stored.
+
+        Args:
+            hashes: Content hashes to look up
+
+        Returns:
+            set: The hashes present in message_contents
+        """
+        hashes = list(hashes)
+        stored = set()
+        with self.get_connection() as conn:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                cursor = conn.execute(
+                    f"SELECT hash FROM message_contents WHERE hash IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                stored.update(row[0] for row in cursor)
+        return stored
+
+    def _store_message_contents(self, conn: sqlite3.Connection, contents: List[tuple]):
+        """
+        Insert the message bodies that are not stored yet.
+
+        Runs after the message rows of the same transaction, so bodies
+        released by the delete/update triggers are stored again if still
+        referenced. Callers may pre-encode bodies they found missing; any
+        other missing body is encoded here. New bodies are added to the
+        search index from their plain text.
+
+        Args:
+            conn: Connection with the write transaction
+            contents: (hash, content, encoded) tuples, where encoded is the
+                      (value, content_codec) pair from ContentCodec.encode() or None
+        """
+        stored = self.get_stored_content_hashes(c[0] for c in contents)
+        rows = []
+        new_contents = {}
+        for hash_value, content, encoded in contents:
+            if hash_value in stored:
+                continue
+            value, codec = encoded or self.codec.encode(content)
+            rows.append((hash_value, value, codec, len(content) if content else 0))
+            stored.add(hash_value)
+            new_contents[hash_value] = content
+        conn.executemany(INSERT_MESSAGE_CONTENT_SQL, rows)
+
+        if self.search_available and new_contents:
+            self._index_message_contents(conn, new_contents)
+
+    # ========================================================================
+    # USER OPERATIONS
+    # ========================================================================
+
+    @_writes
+    def upsert_user(self, user_data: Dict[str, Any], instance_id: int, sync_time: datetime):
+        """
+        Insert or update a user.
+
+        Args:
+            user_data: User data from API
             instance_id: Instance ID
             sync_time: Current sync timestamp
         """
         with self.get_connection() as conn:
-            conn.execute(
-                "UPDATE chats SET sync_datetime = ? WHERE id = ? AND instance_id = ?",
-                (sync_time, chat_id, instance_id)
+            conn.execute(UPSERT_USER_SQL, _user_params(user_data, instance_id, sync_time))
+
+    def get_user_ids_for_instance(self, instance_id: int) -> set:
+        """
+        Get all user IDs for an instance.
+
+        Args:
+            instance_id: Instance ID
+
+        Returns:
+            set: Set of user IDs
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                "SELECT id FROM users WHERE instance_id = ? AND is_deleted = 0",
+                (instance_id,)
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    @_writes
+    def mark_users_deleted(self, user_ids: List[str], instance_id: int):
+        """
+        Mark users as deleted.
+
+        Args:
+            user_ids: List of user IDs to mark deleted
+            instance_id: Instance ID
+        """
+        if not user_ids:
+            return
+
+        with self.get_connection() as conn:
+            placeholders = ','.join('?' * len(user_ids))
+            conn.execute(f"""
+                UPDATE users
+                SET is_deleted = 1
+                WHERE id IN ({placeholders}) AND instance_id = ?
+            """, (*user_ids, instance_id))
+
+    # ========================================================================
+    # USER SYNC STATE OPERATIONS
+    # ========================================================================
+
+    def get_user_sync_states(self, instance_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the incremental sync state of an instance's users.
+
+        Args:
+            instance_id: Instance ID
+
+        Returns:
+            dict: User ID -> {checked_at, activity_at, change_rate, deferred_at}
+                  (users never checked or deferred are missing)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT user_id, checked_at, activity_at, change_rate, deferred_at
+                FROM user_sync_state
+                WHERE instance_id = ?
+            """, (instance_id,))
+            return {
+                row['user_id']: {
+                    'checked_at': row['checked_at'],
+                    'activity_at': row['activity_at'],
+                    'change_rate': row['change_rate'],
+                    'deferred_at': row['deferred_at']
+                }
+                for row in cursor.fetchall()
+            }
+
+    @_writes
+    def defer_users(self, instance_id: int, user_ids: Iterable[str], deferred_at: datetime):
+        """
+        Record users a time-budgeted sync did not get to, so the next run
+        checks them first. A user already deferred keeps the earlier time.
+
+        Args:
+            instance_id: Instance ID
+            user_ids: Users left unchecked
+            deferred_at: Sync time of the run that left them
+        """
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO user_sync_state (user_id, instance_id, deferred_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(user_id, instance_id) DO UPDATE SET
+                    deferred_at=COALESCE(user_sync_state.deferred_at, excluded.deferred_at)
+            """, ((user_id, instance_id, deferred_at) for user_id in user_ids))
+
+    # ========================================================================
+    # CHAT OPERATIONS
+    # ========================================================================
+
+    @_writes
+    def upsert_chat(self, chat_data: Dict[str, Any], instance_id: int,
+                    user_id: str, sync_time: datetime, messages_hash: str = None):
+        """
+        Insert or update a chat.
+
+        Args:
+            chat_data: Chat data from API
+            instance_id: Instance ID
+            user_id: User ID who owns the chat
+            sync_time: Current sync timestamp
+            messages_hash: Hash of the chat's messages (kept unchanged if None)
+        """
+        with self.get_connection() as conn:
+            conn.execute(UPSERT_CHAT_SQL, _chat_params(chat_data, instance_id, user_id,
+                                                       sync_time, messages_hash))
+
+    def get_chat(self, chat_id: str, instance_id: int) -> Optional[Dict]:
+        """
+        Get chat by ID.
+
+        Args:
+            chat_id: Chat ID
+            instance_id: Instance ID
+
+        Returns:
+            dict or None: Chat data if found
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                "SELECT * FROM chats WHERE id = ? AND instance_id = ?",
+                (chat_id, instance_id)
             )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def get_chat_states(self, instance_id: int, user_id: str = None) -> Dict[str, tuple]:
+        """
+        Load the change-detection state of many chats in one query.
+
+        Args:
+            instance_id: Instance ID
+            user_id: Only load this user's chats (all chats if None)
+
+        Returns:
+            dict: Chat ID -> (updated_at as datetime or None, messages_hash)
+        """
+        query = "SELECT id, updated_at, messages_hash FROM chats WHERE instance_id = ?"
+        params = [instance_id]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+
+        with self.get_connection() as conn:
+            return {
+                row[0]: (datetime.fromisoformat(row[1]) if row[1] else None, row[2])
+                for row in conn.execute(query, params)
+            }
+
+    @_writes
+    def touch_chat(self, chat_id: str, instance_id: int, sync_time: datetime):
+        """
+        Update chat sync_datetime to mark it as still existing.
+
+        Args:
+            chat_id: Chat ID
+            instance_id: Instance ID
+            sync_time: Current sync timestamp
+        """
+        with self.get_connection() as conn:
+            conn.execute(TOUCH_CHAT_SQL, (sync_time, chat_id, instance_id))
 
+    @_writes
     def mark_stale_chats_deleted(self, instance_id: int, cutoff_time: datetime):
         """
         Mark chats that haven't been synced since cutoff time as deleted.
@@ -556,10 +1734,64 @@ class DatabaseManager:
                 WHERE instance_id = ? AND sync_datetime < ? AND is_deleted = 0
             """, (instance_id, cutoff_time))
 
+    @_writes
+    def mark_unseen_chats_deleted(self, instance_id: int, seen_chat_ids: Iterable[str],
+                                  user_ids: Iterable[str] = None) -> int:
+        """
+        Mark chats not seen in the current sync as deleted.
+
+        The seen IDs are loaded into a temp table and deleted chats are found
+        with one set-difference UPDATE, so unchanged chats are never written.
+        Chats previously marked deleted that are seen again are restored.
+
+        Args:
+            instance_id: Instance ID
+            seen_chat_ids: IDs of every chat returned by the API in this sync
+            user_ids: Only consider these users' chats, for runs that did not
+                      list every user's chats (all chats if None)
+
+        Returns:
+            int: Number of chats marked deleted
+        """
+        with self.get_connection() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_chats (id VARCHAR(36) PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.seen_chats")
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.seen_chats (id) VALUES (?)",
+                ((chat_id,) for chat_id in seen_chat_ids)
+            )
+            user_filter = ""
+            if user_ids is not None:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS checked_users (id VARCHAR(36) PRIMARY KEY)")
+                conn.execute("DELETE FROM temp.checked_users")
+                conn.executemany(
+                    "INSERT OR IGNORE INTO temp.checked_users (id) VALUES (?)",
+                    ((user_id,) for user_id in user_ids)
+                )
+                user_filter = "AND user_id IN (SELECT id FROM temp.checked_users)"
+            cursor = conn.execute(f"""
+                UPDATE chats
+                SET is_deleted = 1
+                WHERE instance_id = ? AND is_deleted = 0
+                  AND id NOT IN (SELECT id FROM temp.seen_chats)
+                  {user_filter}
+            """, (instance_id,))
+            conn.execute("""
+                UPDATE chats
+                SET is_deleted = 0
+                WHERE instance_id = ? AND is_deleted = 1
+                  AND id IN (SELECT id FROM temp.seen_chats)
+            """, (instance_id,))
+            conn.execute("DELETE FROM temp.seen_chats")
+            if user_ids is not None:
+                conn.execute("DELETE FROM temp.checked_users")
+            return cursor.rowcount
+
     # ========================================================================
     # CHAT MODELS OPERATIONS
     # ========================================================================
 
+    @_writes
     def upsert_chat_model(self, chat_id: str, instance_id: int,
                           model_id: str, sync_time: datetime):
         """
@@ -572,31 +1804,43 @@ class DatabaseManager:
             sync_time: Current sync timestamp
         """
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO chat_models (chat_id, instance_id, model_id, sync_datetime)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(chat_id, instance_id, model_id) DO UPDATE SET
-                    sync_datetime=excluded.sync_datetime
-            """, (chat_id, instance_id, model_id, sync_time))
+            conn.execute(UPSERT_CHAT_MODEL_SQL, (chat_id, instance_id, model_id, sync_time))
 
-    def delete_chat_models(self, chat_id: str, instance_id: int):
+    def get_chat_model_ids(self, chat_id: str, instance_id: int) -> set:
         """
-        Delete all model associations for a chat.
+        Get the model IDs associated with a chat.
 
         Args:
             chat_id: Chat ID
             instance_id: Instance ID
+
+        Returns:
+            set: Model IDs
         """
         with self.get_connection() as conn:
-            conn.execute(
-                "DELETE FROM chat_models WHERE chat_id = ? AND instance_id = ?",
+            cursor = conn.execute(
+                "SELECT model_id FROM chat_models WHERE chat_id = ? AND instance_id = ?",
                 (chat_id, instance_id)
             )
+            return {row[0] for row in cursor.fetchall()}
+
+    @_writes
+    def delete_chat_models(self, chat_id: str, instance_id: int):
+        """
+        Delete all model associations for a chat.
+
+        Args:
+            chat_id: Chat ID
+            instance_id: Instance ID
+        """
+        with self.get_connection() as conn:
+            conn.execute(DELETE_CHAT_MODELS_SQL, (chat_id, instance_id))
 
     # ========================================================================
     # MESSAGE OPERATIONS
     # ========================================================================
 
+    @_writes
     def upsert_message(self, message_data: Dict[str, Any], chat_id: str,
                        instance_id: int, sync_time: datetime):
         """
@@ -609,34 +1853,30 @@ class DatabaseManager:
             sync_time: Current sync timestamp
         """
         content = message_data.get('content', '')
-        content_length = len(content) if content else 0
-        has_files = len(message_data.get('files', [])) > 0
+        with self.get_connection() as conn:
+            conn.execute(UPSERT_MESSAGE_SQL, _message_params(message_data, chat_id, instance_id, sync_time))
+            self._apply_search_deletes(conn)
+            self._store_message_contents(conn, [(content_hash(content), content, None)])
+
+    def get_message_fingerprints(self, chat_id: str, instance_id: int) -> Dict[str, tuple]:
+        """
+        Get the stored fingerprint of every message in a chat.
+
+        Args:
+            chat_id: Chat ID
+            instance_id: Instance ID
 
+        Returns:
+            dict: Message ID -> (content_hash, has_files), see message_fingerprint()
+        """
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO messages (
-                    id, chat_id, instance_id, parent_id, role, content,
-                    content_length, created_at, sync_datetime, has_files
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id, instance_id) DO UPDATE SET
-                    content=excluded.content,
-                    content_length=excluded.content_length,
-                    sync_datetime=excluded.sync_datetime,
-                    has_files=excluded.has_files
-            """, (
-                message_data['id'],
-                chat_id,
-                instance_id,
-                message_data.get('parentId'),
-                message_data.get('role'),
-                content,
-                content_length,
-                message_data.get('created_at'),
-                sync_time,
-                has_files
-            ))
+            cursor = conn.execute(
+                "SELECT id, content_hash, has_files FROM messages WHERE chat_id = ? AND instance_id = ?",
+                (chat_id, instance_id)
+            )
+            return {row[0]: (row[1], bool(row[2])) for row in cursor.fetchall()}
 
+    @_writes
     def delete_messages_for_chat(self, chat_id: str, instance_id: int):
         """
         Delete all messages for a chat.
@@ -646,15 +1886,685 @@ class DatabaseManager:
             instance_id: Instance ID
         """
         with self.get_connection() as conn:
-            conn.execute(
-                "DELETE FROM messages WHERE chat_id = ? AND instance_id = ?",
-                (chat_id, instance_id)
+            conn.execute(DELETE_MESSAGES_SQL, (chat_id, instance_id))
+            self._apply_search_deletes(conn)
+
+    def get_chat_messages(self, chat_id: str, instance_id: int) -> List[Dict]:
+        """
+        Get a chat's messages with their content decoded.
+
+        Args:
+            chat_id: Chat ID
+            instance_id: Instance ID
+
+        Returns:
+            list: Message dicts in creation order
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT m.*, mc.content AS stored_content, mc.content_codec AS stored_codec
+                FROM messages m
+                LEFT JOIN message_contents mc ON mc.hash = m.content_hash
+                WHERE m.chat_id = ? AND m.instance_id = ?
+                ORDER BY m.created_at, m.rowid
+            """, (chat_id, instance_id))
+
+            messages = []
+            for row in cursor.fetchall():
+                message = dict(row)
+                message.pop('content_codec', None)  # legacy inline columns
+                message['content'] = self.codec.decode(message.pop('stored_content'),
+                                                       message.pop('stored_codec'))
+                messages.append(message)
+            return messages
+
+    def get_message_content(self, message_id: str, instance_id: int) -> Optional[str]:
+        """
+        Get the decoded content of one message.
+
+        Args:
+            message_id: Message ID
+            instance_id: Instance ID
+
+        Returns:
+            str: Message content or None if the message does not exist
+        """
+        with self.get_connection() as conn:
+            row = conn.execute("""
+                SELECT mc.content, mc.content_codec
+                FROM messages m
+                JOIN message_contents mc ON mc.hash = m.content_hash
+                WHERE m.id = ? AND m.instance_id = ?
+            """, (message_id, instance_id)).fetchone()
+            return self.codec.decode(row[0], row[1]) if row else None
+
+    # ========================================================================
+    # CONTENT COMPRESSION
+    # ========================================================================
+
+    def load_codec(self, codec: Optional[str] = MESSAGE_COMPRESSION) -> ContentCodec:
+        """
+        Build the codec for new message content from config and stored dictionaries.
+
+        New zstd content uses the most recently trained dictionary, if any.
+        Falls back to zlib if zstd is configured but zstandard is not installed.
+
+        Args:
+            codec: Codec name ('zlib', 'zstd') or None for plain text
+
+        Returns:
+            ContentCodec: Codec that can also decode every stored row
+        """
+        dictionaries = self.get_compression_dictionaries()
+
+        if codec == CODEC_ZSTD and not zstd_available():
+            print("  [WARN] zstandard not installed - compressing message content with zlib")
+            codec = CODEC_ZLIB
+
+        dict_id = max(dictionaries) if codec == CODEC_ZSTD and dictionaries else None
+        return ContentCodec(codec, dictionaries=dictionaries, dict_id=dict_id)
+
+    def _decompress_sql(self, value: Any, codec: Optional[str]) -> Optional[str]:
+        """SQL function decompress(content, content_codec)."""
+        return self.codec.decode(value, codec)
+
+    def get_compression_dictionaries(self) -> Dict[int, bytes]:
+        """
+        Get all stored compression dictionaries.
+
+        Returns:
+            dict: Dictionary ID -> dictionary data
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute("SELECT id, data FROM compression_dictionaries")
+            return {row[0]: bytes(row[1]) for row in cursor.fetchall()}
+
+    @_writes
+    def save_compression_dictionary(self, data: bytes, codec: str = CODEC_ZSTD) -> int:
+        """
+        Store a trained dictionary and use it for new content.
+
+        Dictionaries are never deleted, since existing rows may reference them.
+
+        Args:
+            data: Dictionary from compression.train_dictionary()
+            codec: Codec the dictionary belongs to
+
+        Returns:
+            int: Dictionary ID
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO compression_dictionaries (codec, data) VALUES (?, ?)",
+                (codec, data)
             )
+            dict_id = cursor.lastrowid
+
+        self.codec = self.load_codec(self.codec.codec)
+        return dict_id
+
+    def sample_message_contents(self, limit: int, min_length: int = 1) -> List[str]:
+        """
+        Get a random sample of distinct decoded message bodies.
+
+        Args:
+            limit: Maximum number of bodies
+            min_length: Skip bodies shorter than this (characters)
+
+        Returns:
+            list: Message contents
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT content, content_codec FROM message_contents
+                WHERE content_length >= ?
+                ORDER BY RANDOM()
+                LIMIT ?
+            """, (min_length, limit))
+            return [self.codec.decode(row[0], row[1]) for row in cursor.fetchall()]
+
+    def get_content_storage_stats(self) -> List[Dict]:
+        """
+        Summarize how message bodies are stored.
+
+        Returns:
+            list: One dict per content_codec with codec, bodies (distinct
+                  contents), content_chars and stored_bytes
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT
+                    COALESCE(content_codec, 'none') as codec,
+                    COUNT(*) as bodies,
+                    COALESCE(SUM(content_length), 0) as content_chars,
+                    COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) as stored_bytes
+                FROM message_contents
+                GROUP BY content_codec
+                ORDER BY bodies DESC
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_dedup_stats(self) -> Dict[str, int]:
+        """
+        Compare message volume with the distinct bodies actually stored.
+
+        Returns:
+            dict: messages, message_chars, bodies and body_chars
+        """
+        with self.get_connection() as conn:
+            messages = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(content_length), 0) FROM messages"
+            ).fetchone()
+            bodies = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(content_length), 0) FROM message_contents"
+            ).fetchone()
+            return {
+                'messages': messages[0],
+                'message_chars': messages[1],
+                'bodies': bodies[0],
+                'body_chars': bodies[1],
+            }
+
+    @_writes
+    def recompress_messages(self, codec: ContentCodec = None,
+                            batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Re-encode stored message bodies, e.g. to compress an existing database.
+
+        Rows are converted in rowid order and committed per batch, so the
+        migration can be interrupted and rerun. Rows already stored with the
+        target codec are skipped.
+
+        Args:
+            codec: Target codec (defaults to the codec used for new content;
+                   ContentCodec(None) decompresses everything)
+            batch_size: Rows per transaction
+
+        Returns:
+            dict: bodies_converted, bytes_before and bytes_after of converted rows
+        """
+        codec = codec or self.codec
+        stats = {'bodies_converted': 0, 'bytes_before': 0, 'bytes_after': 0}
+        last_rowid = 0
+
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute("""
+                    SELECT rowid, content, content_codec FROM message_contents
+                    WHERE rowid > ? AND content IS NOT NULL
+                    ORDER BY rowid
+                    LIMIT ?
+                """, (last_rowid, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+
+                updates = []
+                for rowid, value, content_codec in rows:
+                    if content_codec == codec.name:
+                        continue
+                    new_value, new_codec = codec.encode(self.codec.decode(value, content_codec))
+                    if new_codec == content_codec:
+                        continue
+                    updates.append((new_value, new_codec, rowid))
+                    stats['bytes_before'] += _stored_size(value)
+                    stats['bytes_after'] += _stored_size(new_value)
+
+                conn.executemany(
+                    "UPDATE message_contents SET content = ?, content_codec = ? WHERE rowid = ?", updates
+                )
+                stats['bodies_converted'] += len(updates)
+
+        return stats
+
+    @_writes
+    def vacuum(self):
+        """Rebuild the database file to return space freed by deletes or compression."""
+        conn = self._connect()
+        conn.commit()
+        conn.execute("VACUUM")
+
+    # ========================================================================
+    # FULL-TEXT SEARCH
+    # ========================================================================
+
+    def _index_message_contents(self, conn: sqlite3.Connection, contents: Dict[str, str]):
+        """
+        Add newly stored message bodies to the search index.
+
+        Args:
+            conn: Connection with the write transaction
+            contents: Content hash -> plain text of bodies just inserted
+        """
+        hashes = list(contents)
+        rows = []
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            cursor = conn.execute(
+                f"SELECT rowid, hash FROM message_contents WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            rows.extend((row[0], contents[row[1]] or '') for row in cursor)
+        conn.executemany("INSERT INTO message_contents_fts (rowid, content) VALUES (?, ?)", rows)
+
+    def _apply_search_deletes(self, conn: sqlite3.Connection):
+        """
+        Remove deleted message bodies from the search index.
+
+        The contentless index needs the original text to delete a row, so
+        the delete trigger queues the stored body and it is decoded here.
+
+        Args:
+            conn: Connection with the write transaction
+        """
+        if not self.search_available:
+            return
+
+        rows = conn.execute(
+            "SELECT content_rowid, content, content_codec FROM search_index_deletes"
+        ).fetchall()
+        if not rows:
+            return
+
+        conn.executemany(
+            "INSERT INTO message_contents_fts (message_contents_fts, rowid, content) VALUES ('delete', ?, ?)",
+            [(row[0], self.codec.decode(row[1], row[2]) or '') for row in rows]
+        )
+        conn.execute("DELETE FROM search_index_deletes")
+
+    @_writes
+    def rebuild_search_index(self, batch_size: int = 1000):
+        """
+        Rebuild both search indexes from the stored messages and chats.
+
+        Runs automatically when the index is first created on an existing
+        database. Only needed afterwards if the index was modified outside
+        DatabaseManager.
+
+        Args:
+            batch_size: Message bodies decoded per step
+        """
+        if not self.search_available:
+            return
+
+        print("  [INFO] Building full-text search index...")
+        with self.get_connection() as conn:
+            conn.execute("INSERT INTO message_contents_fts (message_contents_fts) VALUES ('delete-all')")
+            conn.execute("DELETE FROM search_index_deletes")
+            conn.execute("INSERT INTO chats_fts (chats_fts) VALUES ('rebuild')")
+
+            last_rowid = 0
+            while True:
+                rows = conn.execute("""
+                    SELECT rowid, content, content_codec FROM message_contents
+                    WHERE rowid > ?
+                    ORDER BY rowid
+                    LIMIT ?
+                """, (last_rowid, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+                conn.executemany(
+                    "INSERT INTO message_contents_fts (rowid, content) VALUES (?, ?)",
+                    [(row[0], self.codec.decode(row[1], row[2]) or '') for row in rows]
+                )
+
+            conn.execute("INSERT INTO message_contents_fts (message_contents_fts) VALUES ('optimize')")
+            conn.execute("INSERT INTO chats_fts (chats_fts) VALUES ('optimize')")
+
+    def search_messages(self, query: str, instance_name: str = None, since: str = None,
+                        role: str = None, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search over message content, best matches first.
+
+        Each distinct body is matched once and then expanded to every
+        (non-deleted) chat that contains it.
+
+        Args:
+            query: Search words (all must match; 'word*' for prefixes), or a
+                   raw FTS5 expression if it contains quotes or AND/OR/NOT/NEAR
+            instance_name: Only search this instance
+            since: Only chats updated on or after this date (YYYY-MM-DD)
+            role: Only messages with this role ('user' or 'assistant')
+            limit: Maximum number of results
+
+        Returns:
+            list: Result dicts with instance, user_name, user_email, chat_id,
+                  chat_title, chat_updated_at, message_id, role, content and snippet
+        """
+        if not self.search_available:
+            raise RuntimeError("Full-text search requires SQLite with FTS5")
+
+        match = fts_query(query)
+        page_size = max(limit * 5, 100)
+        results = []
+
+        # Rank hits inside the index first and join only one page at a time,
+        # doubling the page until enough hits survive the filters (each page
+        # re-ranks every hit, so fixed-size pages are quadratic when the
+        # filters are selective)
+        with self.get_connection() as conn:
+            total_hits = conn.execute(
+                "SELECT COUNT(*) FROM message_contents_fts WHERE message_contents_fts MATCH ?", (match,)
+            ).fetchone()[0]
+
+            offset = 0
+            while offset < total_hits and len(results) < limit:
+                cursor = conn.execute("""
+                    SELECT
+                        i.name as instance,
+                        u.name as user_name,
+                        u.email as user_email,
+                        c.id as chat_id,
+                        c.title as chat_title,
+                        c.updated_at as chat_updated_at,
+                        m.id as message_id,
+                        m.role,
+                        mc.content,
+                        mc.content_codec
+                    FROM (
+                        SELECT rowid, rank
+                        FROM message_contents_fts
+                        WHERE message_contents_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT ? OFFSET ?
+                    ) hits
+                    JOIN message_contents mc ON mc.rowid = hits.rowid
+                    JOIN messages m ON m.content_hash = mc.hash
+                    JOIN chats c ON c.id = m.chat_id AND c.instance_id = m.instance_id
+                    JOIN instances i ON i.id = m.instance_id
+                    LEFT JOIN users u ON u.id = c.user_id AND u.instance_id = c.instance_id
+                    WHERE c.is_deleted = 0
+                      AND (? IS NULL OR i.name = ?)
+                      AND (? IS NULL OR c.updated_at >= ?)
+                      AND (? IS NULL OR m.role = ?)
+                    ORDER BY hits.rank, c.updated_at DESC
+                """, (match, page_size, offset, instance_name, instance_name,
+                      since, since, role, role))
+
+                for row in cursor.fetchall():
+                    result = dict(row)
+                    result['content'] = self.codec.decode(result['content'], result.pop('content_codec'))
+                    result['snippet'] = make_snippet(result['content'], query)
+                    results.append(result)
+
+                offset += page_size
+                page_size *= 2
+
+        return results[:limit]
+
+    def search_chat_titles(self, query: str, instance_name: str = None,
+                           since: str = None, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search over chat titles, best matches first.
+
+        Args:
+            query: Search words (see search_messages())
+            instance_name: Only search this instance
+            since: Only chats updated on or after this date (YYYY-MM-DD)
+            limit: Maximum number of results
+
+        Returns:
+            list: Result dicts with instance, user_name, user_email, chat_id,
+                  chat_title and chat_updated_at
+        """
+        if not self.search_available:
+            raise RuntimeError("Full-text search requires SQLite with FTS5")
+
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT
+                    i.name as instance,
+                    u.name as user_name,
+                    u.email as user_email,
+                    c.id as chat_id,
+                    c.title as chat_title,
+                    c.updated_at as chat_updated_at
+                FROM chats_fts
+                JOIN chats c ON c.rowid = chats_fts.rowid
+                JOIN instances i ON i.id = c.instance_id
+                LEFT JOIN users u ON u.id = c.user_id AND u.instance_id = c.instance_id
+                WHERE chats_fts MATCH ?
+                  AND c.is_deleted = 0
+                  AND (? IS NULL OR i.name = ?)
+                  AND (? IS NULL OR c.updated_at >= ?)
+                ORDER BY bm25(chats_fts), c.updated_at DESC
+                LIMIT ?
+            """, (fts_query(query), instance_name, instance_name, since, since, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    # ========================================================================
+    # USAGE ROLLUPS
+    # ========================================================================
+
+    @_writes
+    def rebuild_rollups(self):
+        """
+        Recompute the daily usage rollups from the raw tables.
+
+        Runs automatically when the rollups are first created on an existing
+        database; triggers keep them current afterwards. Chats in the
+        monthly archives are added from each archive in turn.
+        """
+        print("  [INFO] Building daily usage rollups...")
+        with self.get_connection() as conn:
+            rollups.rebuild_rollups(conn)
+
+        # Archived chats keep their history; one archive per transaction,
+        # since ATTACH is not allowed inside one
+        conn = self._connect()
+        for month in archive.list_archive_months(self.archive_dir):
+            with archive.attached(conn, archive.archive_path(self.archive_dir, month)):
+                with self.get_connection() as conn:
+                    rollups.add_chat_activity(conn, 'archive')
+
+    @_writes
+    def rebuild_instance_stats(self):
+        """
+        Recount the per-instance totals shown by status.
+
+        Runs automatically when the counters are first created on an existing
+        database; triggers keep them current afterwards.
+        """
+        with self.get_connection() as conn:
+            rollups.rebuild_instance_stats(conn)
+
+    # ========================================================================
+    # ARCHIVE
+    # ========================================================================
+
+    def list_archives(self) -> List[Dict[str, Any]]:
+        """
+        List the monthly archive databases.
+
+        Returns:
+            list: Dicts with month, path, size_bytes, and chats and messages
+                  (from the archived_chats stubs), oldest month first
+        """
+        with self.get_connection() as conn:
+            counts = {row[0]: (row[1], row[2]) for row in conn.execute("""
+                SELECT month, COUNT(*), SUM(message_count)
+                FROM archived_chats
+                GROUP BY month
+            """)}
+
+        archives = []
+        for month in archive.list_archive_months(self.archive_dir):
+            path = archive.archive_path(self.archive_dir, month)
+            chats, messages = counts.get(month, (0, 0))
+            archives.append({
+                'month': month,
+                'path': str(path),
+                'size_bytes': path.stat().st_size,
+                'chats': chats,
+                'messages': messages or 0
+            })
+        return archives
+
+    def get_archived_chat_states(self, instance_id: int, user_id: str = None) -> Dict[str, tuple]:
+        """
+        Load the change-detection state of archived chats (see get_chat_states()).
+
+        Args:
+            instance_id: Instance ID
+            user_id: Only load this user's chats (all archived chats if None)
+
+        Returns:
+            dict: Chat ID -> (updated_at as datetime or None, messages_hash)
+        """
+        query = "SELECT id, updated_at, messages_hash FROM archived_chats WHERE instance_id = ?"
+        params = [instance_id]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+
+        with self.get_connection() as conn:
+            return {
+                row[0]: (datetime.fromisoformat(row[1]) if row[1] else None, row[2])
+                for row in conn.execute(query, params)
+            }
+
+    @_writes
+    def archive_chats(self, older_than_days: int = ARCHIVE_AFTER_DAYS, instance_id: int = None,
+                      dry_run: bool = False) -> List[Dict[str, Any]]:
+        """
+        Move chats with no recent activity to monthly archive databases.
+
+        Chats (not deleted) whose updated_at is older than older_than_days
+        move, with their messages, models, files and message bodies, to
+        archive_YYYY-MM.db for the month of their last activity, leaving a
+        stub in archived_chats. Each month is copied in one transaction and
+        removed from the main database in a second one, after the copy is
+        safely committed. Rollups keep the activity of archived chats.
+
+        Args:
+            older_than_days: Minimum age of the last activity, in days
+            instance_id: Only archive this instance's chats (all if None)
+            dry_run: Only count what would be archived
+
+        Returns:
+            list: Dicts with month, chats and messages, oldest month first
+        """
+        cutoff = datetime.now() - timedelta(days=older_than_days)
+        with self.get_connection() as conn:
+            months = archive.find_archivable_chats(conn, cutoff, instance_id)
+
+        if dry_run or not months:
+            return [{'month': month, **counts} for month, counts in months.items()]
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        conn = self._connect()
+        for month, counts in months.items():
+            with archive.attached(conn, archive.archive_path(self.archive_dir, month)):
+                with self.get_connection() as conn:
+                    archive.create_archive_schema(conn)
+                    archive.select_month_batch(conn, month, cutoff, instance_id)
+                    archive.copy_batch_to_archive(conn)
+
+                with self.get_connection() as conn:
+                    chats = archive.remove_batch_from_main(conn, month)
+                    self._apply_search_deletes(conn)
+
+            print(f"  [INFO] {month}: archived {chats:,} chats")
+            results.append({'month': month, 'chats': chats, 'messages': counts['messages']})
+        return results
+
+    @_writes
+    def restore_archived_chats(self, instance_id: int, chat_ids: Iterable[str]) -> int:
+        """
+        Move archived chats back into the main database.
+
+        Used by syncs before writing to a chat that changed after it was
+        archived, so its messages are diffed against the stored ones.
+        Restored chats are searchable again; rollups are not changed.
+
+        Args:
+            instance_id: Instance ID
+            chat_ids: Chat IDs (IDs that are not archived are ignored)
+
+        Returns:
+            int: Number of chats restored
+        """
+        with self.get_connection() as conn:
+            months = archive.get_archived_months(conn, instance_id, chat_ids)
+
+        restored = 0
+        conn = self._connect()
+        for month, ids in months.items():
+            with archive.attached(conn, archive.archive_path(self.archive_dir, month)):
+                with self.get_connection() as conn:
+                    new_contents = archive.restore_batch(conn, instance_id, ids)
+                    if self.search_available and new_contents:
+                        self._index_message_contents(conn, {
+                            hash_value: self.codec.decode(content, codec)
+                            for hash_value, content, codec in new_contents
+                        })
+
+                with self.get_connection() as conn:
+                    archive.remove_restored_from_archive(conn)
+            restored += len(ids)
+        return restored
+
+    @contextmanager
+    def attach_archives(self, since: str = None, until: str = None):
+        """
+        Attach the monthly archives and create unified TEMP views over them.
+
+        Inside the block, all_chats, all_chat_models, all_messages,
+        all_message_contents and all_files combine the main database with
+        the attached archives, so historical queries see every chat.
+        SQLite limits how many databases can be attached (10 by default),
+        so narrow the month range if there are more archives.
+
+        Args:
+            since: First archive month to attach (YYYY-MM, inclusive)
+            until: Last archive month to attach (YYYY-MM, inclusive)
+
+        Yields:
+            sqlite3.Connection: This thread's connection
+
+        Raises:
+            ValueError: If more archives match than SQLite can attach
+
+        Example:
+            with db.attach_archives(since='2024-01') as conn:
+                conn.execute("SELECT COUNT(*) FROM all_messages")
+        """
+        months = [
+            month for month in archive.list_archive_months(self.archive_dir)
+            if (since is None or month >= since) and (until is None or month <= until)
+        ]
+
+        conn = self._connect()
+        limit = archive.attach_limit(conn)
+        if len(months) > limit:
+            raise ValueError(
+                f"{len(months)} archives match but SQLite can attach at most {limit}; "
+                f"narrow the range with since/until"
+            )
+
+        schemas = []
+        try:
+            for month in months:
+                schema = f"archive_{month.replace('-', '_')}"
+                conn.execute(f"ATTACH DATABASE ? AS {schema}",
+                             (str(archive.archive_path(self.archive_dir, month)),))
+                schemas.append(schema)
+            archive.create_unified_views(conn, schemas)
+
+            with self.get_connection() as conn:
+                yield conn
+        finally:
+            archive.drop_unified_views(conn)
+            for schema in schemas:
+                conn.execute(f"DETACH DATABASE {schema}")
 
     # ========================================================================
     # MODEL OPERATIONS
     # ========================================================================
 
+    @_writes
     def upsert_model(self, model_data: Dict[str, Any], instance_id: int, sync_time: datetime):
         """
         Insert or update a model.
@@ -665,26 +2575,13 @@ class DatabaseManager:
             sync_time: Current sync timestamp
         """
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO models (id, instance_id, name, info, sync_datetime, is_deleted)
-                VALUES (?, ?, ?, ?, ?, 0)
-                ON CONFLICT(id, instance_id) DO UPDATE SET
-                    name=excluded.name,
-                    info=excluded.info,
-                    sync_datetime=excluded.sync_datetime,
-                    is_deleted=0
-            """, (
-                model_data['id'],
-                instance_id,
-                model_data.get('name', model_data['id']),
-                json.dumps(model_data),
-                sync_time
-            ))
+            conn.execute(UPSERT_MODEL_SQL, _model_params(model_data, instance_id, sync_time))
 
     # ========================================================================
     # KNOWLEDGE BASE OPERATIONS
     # ========================================================================
 
+    @_writes
     def upsert_knowledge_base(self, kb_data: Dict[str, Any], instance_id: int, sync_time: datetime):
         """
         Insert or update a knowledge base.
@@ -695,34 +2592,13 @@ class DatabaseManager:
             sync_time: Current sync timestamp
         """
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO knowledge_bases (
-                    id, instance_id, name, description, data, created_at,
-                    updated_at, sync_datetime, is_deleted
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
-                ON CONFLICT(id, instance_id) DO UPDATE SET
-                    name=excluded.name,
-                    description=excluded.description,
-                    data=excluded.data,
-                    updated_at=excluded.updated_at,
-                    sync_datetime=excluded.sync_datetime,
-                    is_deleted=0
-            """, (
-                kb_data['id'],
-                instance_id,
-                kb_data.get('name'),
-                kb_data.get('description'),
-                json.dumps(kb_data),
-                kb_data.get('created_at'),
-                kb_data.get('updated_at'),
-                sync_time
-            ))
+            conn.execute(UPSERT_KB_SQL, _kb_params(kb_data, instance_id, sync_time))
 
     # ========================================================================
     # FILE OPERATIONS
     # ========================================================================
 
+    @_writes
     def upsert_file(self, file_data: Dict[str, Any], message_id: str,
                     instance_id: int, sync_time: datetime):
         """
@@ -734,26 +2610,154 @@ class DatabaseManager:
             instance_id: Instance ID
             sync_time: Current sync timestamp
         """
-        file_info = file_data.get('file', {})
-
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO files (
-                    id, message_id, instance_id, filename, file_type,
-                    size_bytes, hash, sync_datetime
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id, instance_id) DO UPDATE SET
-                    filename=excluded.filename,
-                    file_type=excluded.file_type,
-                    sync_datetime=excluded.sync_datetime
-            """, (
-                file_info.get('id'),
-                message_id,
-                instance_id,
-                file_info.get('filename'),
-                file_data.get('type'),
-                file_info.get('size'),
-                file_info.get('hash'),
-                sync_time
-            ))
+            conn.execute(UPSERT_FILE_SQL, _file_params(file_data, message_id, instance_id, sync_time))
+
+
+class BatchWriter:
+    """
+    Buffered writer for bulk sync ingest.
+
+    Mirrors the upsert/delete methods of DatabaseManager, but queues rows and
+    writes them with executemany, committing once per batch instead of once
+    per row. Obtain one with DatabaseManager.batch().
+
+    Within a batch, statements run grouped by type in _FLUSH_ORDER (deletes
+    before the matching inserts), so each chat should be written at most once
+    per batch. Message bodies are deduplicated by content hash and only
+    bodies not yet in message_contents are compressed and written.
+    """
+
+    # Flush order keeps parents ahead of children within a batch
+    _FLUSH_ORDER = (
+        UPSERT_USER_SQL, MARK_USER_DELETED_SQL, UPSERT_MODEL_SQL, UPSERT_KB_SQL,
+        UPSERT_CHAT_SQL, TOUCH_CHAT_SQL, DELETE_CHAT_MODELS_SQL, DELETE_CHAT_MODEL_SQL,
+        UPSERT_CHAT_MODEL_SQL, DELETE_MESSAGES_SQL, DELETE_MESSAGE_SQL, UPSERT_MESSAGE_SQL,
+        UPSERT_FILE_SQL,
+        CHECKPOINT_CHAT_SQL, CHECKPOINT_USER_SQL, UPSERT_USER_SYNC_STATE_SQL,
+    )
+
+    def __init__(self, db: 'DatabaseManager', batch_size: int = DB_BATCH_SIZE,
+                 metrics: SyncMetrics = None):
+        """
+        Initialize batch writer.
+
+        Args:
+            db: Database manager that executes the flushed batches
+            batch_size: Rows to buffer before each flush and commit
+            metrics: Sync run metrics to record flush and statement timings in
+        """
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.metrics = metrics
+        self._pending: Dict[str, List[tuple]] = {sql: [] for sql in self._FLUSH_ORDER}
+        self._pending_count = 0
+        self._contents: Dict[str, str] = {}
+
+    def _add(self, sql: str, params: tuple):
+        """Queue a row and flush if the batch is full."""
+        self._pending[sql].append(params)
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows in one transaction."""
+        if not self._pending_count:
+            return
+
+        statements = [(sql, self._pending[sql]) for sql in self._FLUSH_ORDER if self._pending[sql]]
+        self._pending = {sql: [] for sql in self._FLUSH_ORDER}
+        self._pending_count = 0
+
+        metrics = self.metrics
+        with metrics.waiting('db_write') if metrics is not None else nullcontext():
+            # Compress only bodies that are new to the database, outside the writer
+            contents = self._contents
+            self._contents = {}
+            time_db = metrics.time_db if metrics is not None else _not_timed
+            with time_db('content_lookup'):
+                stored = self.db.get_stored_content_hashes(contents) if contents else set()
+            with time_db('compress'):
+                content_rows = [
+                    (hash_value, content, None if hash_value in stored else self.db.codec.encode(content))
+                    for hash_value, content in contents.items()
+                ]
+
+            self.db.write_rows(statements, content_rows, metrics)
+
+    def upsert_user(self, user_data: Dict[str, Any], instance_id: int, sync_time: datetime):
+        """Queue a user upsert."""
+        self._add(UPSERT_USER_SQL, _user_params(user_data, instance_id, sync_time))
+
+    def mark_users_deleted(self, user_ids: List[str], instance_id: int):
+        """Queue marking users as deleted."""
+        for user_id in user_ids:
+            self._add(MARK_USER_DELETED_SQL, (user_id, instance_id))
+
+    def upsert_chat(self, chat_data: Dict[str, Any], instance_id: int,
+                    user_id: str, sync_time: datetime, messages_hash: str = None):
+        """Queue a chat upsert."""
+        self._add(UPSERT_CHAT_SQL, _chat_params(chat_data, instance_id, user_id,
+                                                sync_time, messages_hash))
+
+    def touch_chat(self, chat_id: str, instance_id: int, sync_time: datetime):
+        """Queue a chat sync_datetime update."""
+        self._add(TOUCH_CHAT_SQL, (sync_time, chat_id, instance_id))
+
+    def upsert_chat_model(self, chat_id: str, instance_id: int,
+                          model_id: str, sync_time: datetime):
+        """Queue a chat-model association upsert."""
+        self._add(UPSERT_CHAT_MODEL_SQL, (chat_id, instance_id, model_id, sync_time))
+
+    def delete_chat_models(self, chat_id: str, instance_id: int):
+        """Queue deleting a chat's model associations."""
+        self._add(DELETE_CHAT_MODELS_SQL, (chat_id, instance_id))
+
+    def delete_chat_model(self, chat_id: str, instance_id: int, model_id: str):
+        """Queue deleting one chat-model association."""
+        self._add(DELETE_CHAT_MODEL_SQL, (chat_id, instance_id, model_id))
+
+    def upsert_message(self, message_data: Dict[str, Any], chat_id: str,
+                       instance_id: int, sync_time: datetime):
+        """Queue a message upsert."""
+        params = _message_params(message_data, chat_id, instance_id, sync_time)
+        self._contents[params[6]] = message_data.get('content', '')  # keyed by content_hash
+        self._add(UPSERT_MESSAGE_SQL, params)
+
+    def delete_messages_for_chat(self, chat_id: str, instance_id: int):
+        """Queue deleting a chat's messages."""
+        self._add(DELETE_MESSAGES_SQL, (chat_id, instance_id))
+
+    def delete_messages(self, message_ids: List[str], instance_id: int):
+        """Queue deleting individual messages."""
+        for message_id in message_ids:
+            self._add(DELETE_MESSAGE_SQL, (message_id, instance_id))
+
+    def upsert_model(self, model_data: Dict[str, Any], instance_id: int, sync_time: datetime):
+        """Queue a model upsert."""
+        self._add(UPSERT_MODEL_SQL, _model_params(model_data, instance_id, sync_time))
+
+    def upsert_knowledge_base(self, kb_data: Dict[str, Any], instance_id: int, sync_time: datetime):
+        """Queue a knowledge base upsert."""
+        self._add(UPSERT_KB_SQL, _kb_params(kb_data, instance_id, sync_time))
+
+    def upsert_file(self, file_data: Dict[str, Any], message_id: str,
+                    instance_id: int, sync_time: datetime):
+        """Queue a file attachment upsert."""
+        self._add(UPSERT_FILE_SQL, _file_params(file_data, message_id, instance_id, sync_time))
+
+    def checkpoint_chat(self, sync_run_id: int, chat_id: str, messages_synced: int):
+        """Queue a record that a chat is fully stored for a sync run."""
+        self._add(CHECKPOINT_CHAT_SQL, (sync_run_id, chat_id, messages_synced))
+
+    def checkpoint_user(self, sync_run_id: int, user_id: str):
+        """Queue a record that all of a user's chats are stored for a sync run."""
+        self._add(CHECKPOINT_USER_SQL, (sync_run_id, user_id, datetime.now()))
+
+    def update_user_sync_state(self, user_data: Dict[str, Any], instance_id: int,
+                               sync_time: datetime, changed_chats: Optional[int] = None):
+        """Queue a record that a user's chats were checked (clears any deferral)."""
+        self._add(UPSERT_USER_SYNC_STATE_SQL, (
+            user_data['id'], instance_id, sync_time, user_activity_at(user_data), changed_chats
+        ))
@@ -0,0 +1,505 @@
+"""
+Columnar Export of the sync database
+
+Handles:
+- Streaming each table out of SQLite in chunks (bounded memory)
+- Writing Parquet or Arrow IPC files partitioned by instance and month
+- Incremental exports of rows changed since the last export (a
+  sync_datetime watermark per table and instance)
+- Decompressing message bodies into a plain content column
+
+Layout (hive-style, readable with pandas.read_parquet or pyarrow.dataset):
+
+    <export dir>/<table>/instance=<name>/month=<YYYY-MM>/part-<export id>.parquet
+
+Chats and messages are partitioned by the month they were created, other
+tables by the month they were last synced. Every export adds new part files,
+so a row updated between exports appears in more than one part: keep the
+newest sync_datetime per key.
+
+Rows are stamped with the start time of the sync run that wrote them, and
+instances sync in parallel, so each instance has its own watermark, and it
+never moves past the start of a sync of that instance still in progress.
+Incremental exports do not see rows deleted
+from the database or soft-delete flags changed without a resync; run a full
+export (which replaces the table's files) to pick those up.
+
+Requires the optional pyarrow package.
+"""
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from .config import EXPORT_DIR, EXPORT_CHUNK_ROWS
+from .database import DatabaseManager
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+
+FORMAT_PARQUET = 'parquet'
+FORMAT_ARROW = 'arrow'
+FORMATS = (FORMAT_PARQUET, FORMAT_ARROW)
+
+# Export progress, kept next to the exported files
+STATE_FILE = '_export_state.json'
+
+
+def export_available() -> bool:
+    """Check whether columnar export is supported (pyarrow installed)."""
+    return pyarrow is not None
+
+
+# ============================================================================
+# TABLE DEFINITIONS
+# ============================================================================
+# Column kinds: 'str', 'int', 'bool', 'datetime' (stored as text by the
+# sqlite3 adapter), 'epoch' (raw API timestamps, integers) and 'content'
+# (message bodies, decoded from message_contents). Each table is read as
+# alias t; 'month' is the SQL expression for its month partition.
+
+EXPORT_TABLES: Dict[str, Dict[str, Any]] = {
+    'users': {
+        'columns': [
+            ('id', 'str'), ('instance_id', 'int'), ('name', 'str'), ('email', 'str'),
+            ('role', 'str'), ('created_at', 'epoch'), ('updated_at', 'epoch'),
+            ('sync_datetime', 'datetime'), ('is_deleted', 'bool'),
+        ],
+        'month': "t.sync_datetime",
+    },
+    'chats': {
+        'columns': [
+            ('id', 'str'), ('instance_id', 'int'), ('user_id', 'str'), ('title', 'str'),
+            ('created_at', 'datetime'), ('updated_at', 'datetime'), ('sync_datetime', 'datetime'),
+            ('is_deleted', 'bool'), ('archived', 'bool'), ('pinned', 'bool'),
+            ('folder_id', 'str'), ('share_id', 'str'),
+        ],
+        'month': "COALESCE(t.created_at, t.sync_datetime)",
+    },
+    'chat_models': {
+        'columns': [
+            ('chat_id', 'str'), ('instance_id', 'int'), ('model_id', 'str'), ('sync_datetime', 'datetime'),
+        ],
+        'month': "t.sync_datetime",
+    },
+    'messages': {
+        'columns': [
+            ('id', 'str'), ('chat_id', 'str'), ('instance_id', 'int'), ('parent_id', 'str'),
+            ('role', 'str'), ('model', 'str'), ('content_length', 'int'), ('content_hash', 'str'),
+            ('content', 'content'), ('has_files', 'bool'), ('created_at', 'datetime'),
+            ('sync_datetime', 'datetime'),
+        ],
+        'month': "COALESCE(t.created_at, t.sync_datetime)",
+    },
+    'files': {
+        'columns': [
+            ('id', 'str'), ('message_id', 'str'), ('instance_id', 'int'), ('filename', 'str'),
+            ('file_type', 'str'), ('size_bytes', 'int'), ('hash', 'str'), ('sync_datetime', 'datetime'),
+        ],
+        'month': "t.sync_datetime",
+    },
+    'models': {
+        'columns': [
+            ('id', 'str'), ('instance_id', 'int'), ('name', 'str'), ('info', 'str'),
+            ('sync_datetime', 'datetime'), ('is_deleted', 'bool'),
+        ],
+        'month': "t.sync_datetime",
+    },
+    'knowledge_bases': {
+        'columns': [
+            ('id', 'str'), ('instance_id', 'int'), ('name', 'str'), ('description', 'str'),
+            ('data', 'str'), ('created_at', 'epoch'), ('updated_at', 'epoch'),
+            ('sync_datetime', 'datetime'), ('is_deleted', 'bool'),
+        ],
+        'month': "t.sync_datetime",
+    },
+}
+
+
+def _arrow_type(kind: str):
+    """Arrow type for a column kind (datetime text is cast after loading)."""
+    return {
+        'str': pyarrow.string(),
+        'content': pyarrow.string(),
+        'int': pyarrow.int64(),
+        'epoch': pyarrow.int64(),
+        'bool': pyarrow.bool_(),
+        'datetime': pyarrow.timestamp('us'),
+    }[kind]
+
+
+def _select_sql(table: str, columns: List[Tuple[str, str]], month: str) -> str:
+    """Build the streaming SELECT for a table (parameter: sync_datetime lower bound)."""
+    select = []
+    joins = ""
+    for name, kind in columns:
+        if kind == 'content':
+            select += ["mc.content", "mc.content_codec"]
+            joins = "LEFT JOIN message_contents mc ON mc.hash = t.content_hash"
+        elif kind == 'epoch':
+            select.append(f"CASE WHEN typeof(t.{name}) = 'integer' THEN t.{name} END")
+        else:
+            select.append(f"t.{name}")
+
+    return f"""
+        SELECT i.name, strftime('%Y-%m', {month}), {', '.join(select)}
+        FROM {table} t
+        JOIN instances i ON i.id = t.instance_id
+        {joins}
+        WHERE t.sync_datetime {{op}} ?
+    """
+
+
+class _PartitionWriter:
+    """Appends record batches to one partition's file."""
+
+    def __init__(self, path: Path, schema, file_format: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._sink = None
+        if file_format == FORMAT_PARQUET:
+            self._writer = pyarrow.parquet.ParquetWriter(str(path), schema, compression='zstd')
+        else:
+            self._sink = pyarrow.OSFile(str(path), 'wb')
+            self._writer = pyarrow.ipc.new_file(self._sink, schema)
+        self.rows = 0
+
+    def write(self, table):
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+class DataExporter:
+    """
+    Export the sync database to columnar files for analysis.
+
+    Provides:
+    - export() to write all (or selected) tables, incrementally by default
+    - get_state() with the watermarks of each table's last export
+    """
+
+    def __init__(self, db_manager: DatabaseManager = None, output_dir: str = None,
+                 file_format: str = FORMAT_PARQUET, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                 include_content: bool = True):
+        """
+        Initialize exporter.
+
+        Args:
+            db_manager: Database manager instance
+            output_dir: Export directory (default: EXPORT_DIR)
+            file_format: 'parquet' or 'arrow' (Arrow IPC file)
+            chunk_rows: Rows fetched and buffered per partition before writing
+            include_content: Export message bodies (content column)
+
+        Raises:
+            ValueError: If the format is unknown
+            RuntimeError: If pyarrow is not installed
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown export format: {file_format}")
+        if pyarrow is None:
+            raise RuntimeError("Export requires the pyarrow package")
+
+        self.db = db_manager or DatabaseManager()
+        self.output_dir = Path(output_dir or EXPORT_DIR)
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.include_content = include_content
+
+    # ========================================================================
+    # STATE
+    # ========================================================================
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Load the export state (format and per-table watermarks).
+
+        Returns:
+            dict: {'format', 'content', 'tables': {table: {'instances':
+                  {instance: {'watermark', 'rows_at_watermark'}},
+                  'exported_at'}}}; empty tables dict if nothing was
+                  exported yet
+        """
+        path = self.output_dir / STATE_FILE
+        if not path.exists():
+            return self._new_state()
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _new_state(self) -> Dict[str, Any]:
+        """Export state before the first export."""
+        return {'format': self.file_format, 'content': self.include_content, 'tables': {}}
+
+    def _save_state(self, state: Dict[str, Any]):
+        """Write the export state atomically."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / STATE_FILE
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, path)
+
+    # ========================================================================
+    # EXPORT
+    # ========================================================================
+
+    def export(self, tables: List[str] = None, full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Export tables, writing only rows changed since the last export.
+
+        A table is exported in full (replacing its existing files) on its
+        first export, when full is set, when the format or the choice of
+        exporting message content changed (so all parts share one schema), or
+        when its state predates per-instance watermarks.
+
+        Args:
+            tables: Tables to export (default: all of EXPORT_TABLES)
+            full: Re-export everything
+
+        Returns:
+            list: One dict per table with table, mode ('full' or 'incremental'),
+                  rows, files and seconds
+        """
+        state = self.get_state()
+        if (state.get('format'), state.get('content', True)) != (self.file_format, self.include_content):
+            if state['tables']:
+                print("  [INFO] Export settings changed, exporting in full")
+            state = self._new_state()
+            self._save_state(state)
+
+        export_id = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        results = []
+
+        for table in tables or list(EXPORT_TABLES):
+            if table not in EXPORT_TABLES:
+                raise ValueError(f"Unknown table: {table}")
+
+            table_state = None if full else state['tables'].get(table)
+            if table_state is None and table in state['tables']:
+                # Forget the old watermark before its files are replaced
+                del state['tables'][table]
+                self._save_state(state)
+
+            started = time.perf_counter()
+            rows, files, table_state = self._export_table(table, table_state, export_id)
+
+            state['tables'][table] = table_state
+            self._save_state(state)
+
+            results.append({
+                'table': table,
+                'mode': 'incremental' if table_state.get('incremental') else 'full',
+                'rows': rows,
+                'files': files,
+                'seconds': time.perf_counter() - started,
+            })
+
+        return results
+
+    def _export_table(self, table: str, table_state: Optional[Dict[str, Any]],
+                      export_id: str) -> Tuple[int, int, Dict[str, Any]]:
+        """
+        Stream one table into partition files.
+
+        Each instance's rows are exported from that instance's watermark.
+        Rows synced at exactly the previous watermark are exported again if
+        more of them exist now than were exported: a sync still running at
+        that time wrote them after the export.
+
+        Args:
+            table: Table name
+            table_state: State from the previous export (None for a full export)
+            export_id: Part file name suffix for this export
+
+        Returns:
+            tuple: (rows written, files written, new table state)
+        """
+        spec = EXPORT_TABLES[table]
+        columns = [(name, kind) for name, kind in spec['columns']
+                   if kind != 'content' or self.include_content]
+        schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in columns])
+        table_dir = self.output_dir / table
+
+        with self.db.get_connection() as conn:
+            instance_names = [row[0] for row in conn.execute("SELECT name FROM instances")]
+
+        incremental = table_state is not None and 'instances' in table_state
+        # Instance name -> (watermark, include rows at the watermark)
+        bounds: Dict[str, Tuple[str, bool]] = {}
+        if incremental:
+            with self.db.get_connection() as conn:
+                for instance, mark in table_state['instances'].items():
+                    at_watermark = conn.execute(f"""
+                        SELECT COUNT(*) FROM {table}
+                        WHERE instance_id = (SELECT id FROM instances WHERE name = ?)
+                          AND sync_datetime = ?
+                    """, (instance, mark['watermark'])).fetchone()[0]
+                    bounds[instance] = (mark['watermark'], at_watermark > mark['rows_at_watermark'])
+            # Read from the lowest watermark; instances never exported start at ''
+            if all(name in bounds for name in instance_names):
+                lower = min((mark for mark, _ in bounds.values()), default='')
+            else:
+                lower = ''
+        else:
+            lower = ''
+            if table_dir.exists():
+                shutil.rmtree(table_dir)
+
+        sql = _select_sql(table, columns, spec['month']).format(op='>=')
+        suffix = 'parquet' if self.file_format == FORMAT_PARQUET else 'arrow'
+
+        writers: Dict[Tuple[str, str], _PartitionWriter] = {}
+        buffers: Dict[Tuple[str, str], List[tuple]] = {}
+        buffered = 0
+        rows = 0
+        # Instance name -> [newest sync_datetime exported, rows at it]
+        newest: Dict[str, list] = {}
+        names = [name for name, _ in columns]
+        sync_index = names.index('sync_datetime')
+        content_at = names.index('content') if 'content' in names else None
+
+        def flush(key):
+            nonlocal buffered
+            batch = buffers.pop(key)
+            buffered -= len(batch)
+            if key not in writers:
+                instance, month = key
+                path = table_dir / f"instance={instance}" / f"month={month}" / f"part-{export_id}.{suffix}"
+                writers[key] = _PartitionWriter(path, schema, self.file_format)
+            writers[key].write(self._to_arrow(batch, columns, schema))
+
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.execute(sql, (lower,))
+                while True:
+                    chunk = cursor.fetchmany(self.chunk_rows)
+                    if not chunk:
+                        break
+
+                    for row in chunk:
+                        instance = row[0]
+                        values = self._row_values(row, content_at)
+                        sync_value = values[sync_index]
+
+                        bound = bounds.get(instance)
+                        if bound is not None:
+                            mark, include_mark = bound
+                            if sync_value < mark or (sync_value == mark and not include_mark):
+                                continue
+
+                        key = (instance, row[1] or 'unknown')
+                        buffers.setdefault(key, []).append(values)
+                        buffered += 1
+                        rows += 1
+
+                        top = newest.setdefault(instance, [sync_value, 0])
+                        if sync_value > top[0]:
+                            top[0], top[1] = sync_value, 1
+                        elif sync_value == top[0]:
+                            top[1] += 1
+
+                        if len(buffers[key]) >= self.chunk_rows:
+                            flush(key)
+
+                    # Keep total buffered rows bounded across partitions
+                    while buffered > self.chunk_rows * 2:
+                        flush(max(buffers, key=lambda k: len(buffers[k])))
+
+            for key in list(buffers):
+                flush(key)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        marks = dict(table_state['instances']) if incremental else {}
+        for instance, (watermark, rows_at_watermark) in newest.items():
+            marks[instance] = {'watermark': watermark, 'rows_at_watermark': rows_at_watermark}
+
+        # Instances without rows yet start at the newest watermark: their
+        # next sync starts later, so its rows are stamped after it
+        if marks:
+            latest = max(mark['watermark'] for mark in marks.values())
+            for instance in instance_names:
+                marks.setdefault(instance, {'watermark': latest, 'rows_at_watermark': 0})
+
+        # A sync still in progress stamps the rows it has yet to write with
+        # its start time: keep the watermark from passing it
+        for instance, started_at in self._running_syncs().items():
+            mark = marks.get(instance)
+            if mark is not None and mark['watermark'] >= started_at:
+                marks[instance] = {'watermark': started_at, 'rows_at_watermark': 0}
+
+        return rows, len(writers), {
+            'instances': marks,
+            'exported_at': datetime.now().isoformat(),
+            'incremental': incremental,
+        }
+
+    def _running_syncs(self) -> Dict[str, str]:
+        """
+        Start times of sync runs still in progress, by instance.
+
+        Runs left 'in_progress' by a killed process are ignored once a
+        later run of the same instance has started.
+
+        Returns:
+            dict: Instance name -> earliest started_at of its running syncs
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT r.instance_name, MIN(r.started_at)
+                FROM sync_runs r
+                WHERE r.status = 'in_progress'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM sync_runs s
+                      WHERE s.instance_name = r.instance_name AND s.started_at > r.started_at
+                        AND s.status != 'in_progress'
+                  )
+                GROUP BY r.instance_name
+            """)
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def _row_values(self, row, content_at: Optional[int]) -> tuple:
+        """
+        Turn a SELECT row into column values.
+
+        Args:
+            row: Row from _select_sql (instance name and month first)
+            content_at: Index of the content column, or None if not exported
+
+        Returns:
+            tuple: Values in column order, message content decoded
+        """
+        if content_at is None:
+            return tuple(row[2:])
+
+        # mc.content and mc.content_codec stand in for the content column
+        i = content_at + 2
+        return tuple(row[2:i]) + (self.db.codec.decode(row[i], row[i + 1]),) + tuple(row[i + 2:])
+
+    @staticmethod
+    def _to_arrow(batch: List[tuple], columns: List[Tuple[str, str]], schema):
+        """Build an Arrow table from buffered rows."""
+        arrays = []
+        for index, (name, kind) in enumerate(columns):
+            values = [row[index] for row in batch]
+            if kind == 'datetime':
+                arrays.append(pyarrow.array(values, pyarrow.string()).cast(pyarrow.timestamp('us')))
+            elif kind == 'bool':
+                arrays.append(pyarrow.array([None if v is None else bool(v) for v in values], pyarrow.bool_()))
+            else:
+                arrays.append(pyarrow.array(values, _arrow_type(kind)))
+        return pyarrow.Table.from_arrays(arrays, schema=schema)
@@ -0,0 +1,442 @@
+"""
+Sync Run Metrics for OpenWebUI Sync
+
+Handles:
+- Per-endpoint request latency histograms, retries, 429s, HTTP errors and
+  bytes received
+- Database time per statement type (histograms)
+- Time per sync phase (models, knowledge bases, users, chats, finalize)
+- Time the sync loop spent waiting on the API and on SQLite
+- Rows for the sync_run_metrics table, and Prometheus text exposition
+  for the node exporter textfile collector
+
+One SyncMetrics object collects a single sync run of one instance. It is
+shared by the run's worker threads, so all recording methods are
+thread-safe.
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Histogram bucket upper bounds in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Prefix of every exported Prometheus metric
+METRIC_PREFIX = 'openwebui_sync_last_run'
+
+# Label name of counters that have one
+_COUNTER_LABELS = {'http_errors': 'status', 'request_failures': 'error'}
+
+# Request path patterns -> endpoint label
+_ENDPOINTS = (
+    (re.compile(r'^/api/v1/users/all'), 'users'),
+    (re.compile(r'^/api/v1/chats/list/user/'), 'chat_list'),
+    (re.compile(r'^/api/v1/chats/all/'), 'chat'),
+    (re.compile(r'^/api/v1/models'), 'models'),
+    (re.compile(r'^/api/v1/knowledge'), 'knowledge'),
+)
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Map an API path to a low-cardinality endpoint label.
+
+    Args:
+        endpoint: Request path, e.g. /api/v1/chats/all/<id>
+
+    Returns:
+        str: users, chat_list, chat, models, knowledge or other
+    """
+    for pattern, label in _ENDPOINTS:
+        if pattern.match(endpoint):
+            return label
+    return 'other'
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations, in the Prometheus style.
+
+    Each observation lands in the first bucket whose upper bound is at least
+    the value; values above the last bound land in the +Inf bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Initialize histogram.
+
+        Args:
+            buckets: Ascending bucket upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Record one value (caller holds the metrics lock)."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs including +Inf, as Prometheus exposes them."""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets + (None,), self.counts):
+            running += count
+            pairs.append(('+Inf' if bound is None else _format_value(bound), running))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by interpolating within its bucket.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            float or None: Estimated value (the last finite bound if it falls
+                           in +Inf), None if nothing was observed
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        running = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and running + count >= rank:
+                return lower + (bound - lower) * (rank - running) / count
+            running += count
+            lower = bound
+        return self.buckets[-1] if self.buckets else None
+
+    def to_json(self) -> str:
+        """Bucket bounds and per-bucket counts, for the buckets column."""
+        return json.dumps({'le': self.buckets, 'counts': self.counts})
+
+    @classmethod
+    def from_row(cls, count: int, total: float, buckets: str) -> 'Histogram':
+        """Rebuild a histogram from a sync_run_metrics row."""
+        data = json.loads(buckets)
+        histogram = cls(data['le'])
+        histogram.counts = list(data['counts'])
+        histogram.count = count
+        histogram.sum = total
+        return histogram
+
+
+class SyncMetrics:
+    """
+    Measurements of one sync run.
+
+    Provides:
+    - observe_request() and count() for the API side
+    - time_db() for database statements
+    - phase() and waiting() for where the sync loop spent its time
+    - rows() for persisting, to_prometheus() for the textfile collector
+    """
+
+    def __init__(self, instance_name: str, sync_type: str):
+        """
+        Initialize metrics for a run that starts now.
+
+        Args:
+            instance_name: Instance being synced
+            sync_type: 'full' or 'incremental'
+        """
+        self.instance_name = instance_name
+        self.sync_type = sync_type
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = 'in_progress'
+
+        # The thread running the sync loop (time in its own requests is waiting)
+        self.sync_thread = threading.current_thread()
+
+        self._lock = threading.Lock()
+        self.requests: Dict[str, Histogram] = {}
+        self.db: Dict[str, Histogram] = {}
+        self.phases: Dict[str, float] = {}
+        self.waits: Dict[str, float] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    # ------------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------------
+
+    def observe_request(self, endpoint: str, seconds: float):
+        """
+        Record the duration of one API request attempt.
+
+        Args:
+            endpoint: Request path (mapped with endpoint_label())
+            seconds: Time until the response headers arrived
+        """
+        label = endpoint_label(endpoint)
+        with self._lock:
+            histogram = self.requests.get(label)
+            if histogram is None:
+                histogram = self.requests[label] = Histogram(REQUEST_BUCKETS)
+            histogram.observe(seconds)
+
+    def count(self, name: str, label: str = '', amount: float = 1):
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name (retries, rate_limited, http_errors,
+                  request_failures, stream_failures, bytes_received)
+            label: Label value, e.g. the HTTP status for http_errors
+            amount: Amount to add
+        """
+        with self._lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def get_count(self, name: str, label: str = '') -> float:
+        """Current value of a counter (0 if never counted)."""
+        with self._lock:
+            return self.counters.get((name, label), 0)
+
+    def observe_db(self, statement: str, seconds: float):
+        """Record the duration of one database statement type execution."""
+        with self._lock:
+            histogram = self.db.get(statement)
+            if histogram is None:
+                histogram = self.db[statement] = Histogram(DB_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time_db(self, statement: str):
+        """Time the enclosed database work as one execution of a statement type."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_db(statement, time.perf_counter() - started)
+
+    @contextmanager
+    def waiting(self, kind: str):
+        """
+        Count the enclosed block as time the sync loop waited.
+
+        Args:
+            kind: 'api', 'db_read' or 'db_write'
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.waits[kind] = self.waits.get(kind, 0.0) + elapsed
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as a phase of the run."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def finish(self, status: str):
+        """
+        Mark the run finished.
+
+        Args:
+            status: 'success', 'partial' (stopped by a time budget) or 'failed'
+        """
+        self.status = status
+        self.finished_at = time.time()
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to finish (or to now while running)."""
+        return (self.finished_at or time.time()) - self.started_at
+
+    # ------------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------------
+
+    def rows(self) -> List[Tuple[str, str, int, float, Optional[str]]]:
+        """
+        Flatten the metrics into sync_run_metrics rows.
+
+        Returns:
+            list: (metric, label, count, total, buckets) tuples, where
+                  metric is request_seconds, db_seconds, phase_seconds,
+                  wait_seconds or a counter name; buckets is set for histograms
+        """
+        with self._lock:
+            rows = [('request_seconds', label, h.count, h.sum, h.to_json())
+                    for label, h in self.requests.items()]
+            rows += [('db_seconds', label, h.count, h.sum, h.to_json())
+                     for label, h in self.db.items()]
+            rows += [('phase_seconds', name, 1, seconds, None) for name, seconds in self.phases.items()]
+            rows += [('wait_seconds', kind, 1, seconds, None) for kind, seconds in self.waits.items()]
+            rows += [(name, label, 1, value, None) for (name, label), value in self.counters.items()]
+        return rows
+
+    @classmethod
+    def from_rows(cls, instance_name: str, sync_type: str,
+                  rows: Iterable[Dict[str, Any]]) -> 'SyncMetrics':
+        """
+        Rebuild the metrics of a stored run (DatabaseManager.get_sync_metrics()).
+
+        Args:
+            instance_name: Instance of the run
+            sync_type: Type of the run
+            rows: Dicts with metric, label, count, total and buckets
+
+        Returns:
+            SyncMetrics: Metrics with the stored values
+        """
+        metrics = cls(instance_name, sync_type)
+        for row in rows:
+            metric, label = row['metric'], row['label']
+            if metric == 'request_seconds':
+                metrics.requests[label] = Histogram.from_row(row['count'], row['total'], row['buckets'])
+            elif metric == 'db_seconds':
+                metrics.db[label] = Histogram.from_row(row['count'], row['total'], row['buckets'])
+            elif metric == 'phase_seconds':
+                metrics.phases[label] = row['total']
+            elif metric == 'wait_seconds':
+                metrics.waits[label] = row['total']
+            else:
+                metrics.counters[(metric, label)] = row['total']
+        return metrics
+
+    # ------------------------------------------------------------------------
+    # Prometheus
+    # ------------------------------------------------------------------------
+
+    def to_prometheus(self, results: Dict[str, int] = None) -> str:
+        """
+        Render the run in the Prometheus text exposition format.
+
+        Every metric describes the instance's most recent run, so the values
+        are gauges and histograms that reset with each run.
+
+        Args:
+            results: Run totals to export as well (users, chats, messages)
+
+        Returns:
+            str: Exposition text ending in a newline
+        """
+        base = {'instance_name': self.instance_name, 'sync_type': self.sync_type}
+        lines = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        def sample(name: str, value: float, **labels):
+            lines.append(f"{METRIC_PREFIX}_{name}{_format_labels({**base, **labels})} {_format_value(value)}")
+
+        def histograms(name: str, label: str, values: Dict[str, Histogram], help_text: str):
+            if not values:
+                return
+            family(name, 'histogram', help_text)
+            for key, histogram in sorted(values.items()):
+                for le, count in histogram.cumulative():
+                    sample(f"{name}_bucket", count, **{label: key, 'le': le})
+                sample(f"{name}_sum", histogram.sum, **{label: key})
+                sample(f"{name}_count", histogram.count, **{label: key})
+
+        with self._lock:
+            family('timestamp_seconds', 'gauge', 'Unix time the last sync run finished.')
+            sample('timestamp_seconds', self.finished_at or time.time())
+            family('success', 'gauge', 'Whether the last sync run succeeded (1) or failed (0). '
+                   'Runs stopped by their time budget count as succeeded.')
+            sample('success', 1 if self.status in ('success', 'partial') else 0)
+            family('duration_seconds', 'gauge', 'Duration of the last sync run.')
+            sample('duration_seconds', self.duration)
+
+            if self.phases:
+                family('phase_seconds', 'gauge', 'Time spent in each phase of the last sync run.')
+                for name, seconds in self.phases.items():
+                    sample('phase_seconds', seconds, phase=name)
+            if self.waits:
+                family('wait_seconds', 'gauge', 'Time the sync loop waited on the API or the database.')
+                for kind, seconds in sorted(self.waits.items()):
+                    sample('wait_seconds', seconds, kind=kind)
+
+            histograms('request_seconds', 'endpoint', self.requests,
+                       'API request latency (until response headers) per endpoint.')
+            histograms('db_seconds', 'statement', self.db,
+                       'Database time per statement type.')
+
+            counters: Dict[str, List[Tuple[str, float]]] = {}
+            for (name, label), value in sorted(self.counters.items()):
+                counters.setdefault(name, []).append((label, value))
+            for name, values in counters.items():
+                family(name, 'gauge', f"{name.replace('_', ' ').capitalize()} in the last sync run.")
+                label_name = _COUNTER_LABELS.get(name, 'label')
+                for label, value in values:
+                    if label:
+                        sample(name, value, **{label_name: label})
+                    else:
+                        sample(name, value)
+
+        for name, value in (results or {}).items():
+            family(name, 'gauge', f"{name.capitalize()} synced in the last sync run.")
+            sample(name, value)
+
+        return '\n'.join(lines) + '\n'
+
+
+def write_textfile(directory: Path, metrics: SyncMetrics, results: Dict[str, int] = None) -> Path:
+    """
+    Write a run's metrics for the node exporter textfile collector.
+
+    The file is written under a temporary name and renamed, so the collector
+    never reads a partial file. Each instance has its own file, so instances
+    syncing concurrently do not overwrite each other.
+
+    Args:
+        directory: The collector's --collector.textfile.directory
+        metrics: Metrics of the finished run
+        results: Run totals to export as well (users, chats, messages)
+
+    Returns:
+        Path: The .prom file written
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9_-]', '_', metrics.instance_name)
+    path = directory / f"openwebui_sync_{name}.prom"
+    temp_path = directory / f".{path.name}.{os.getpid()}.tmp"
+    temp_path.write_text(metrics.to_prometheus(results))
+    os.replace(temp_path, path)
+    return path
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Render a label set, escaping values as the exposition format requires."""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value or bucket bound without needless decimals."""
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,583 @@
+"""
+Local OpenWebUI stand-in server for offline sync testing and benchmarks
+
+Handles:
+- A seeded synthetic dataset that generates users, chat lists and chat
+  details on request, so 1,000 users with 1M chats and 20M messages need
+  no storage and every run sees the same data
+- Activity between syncs (SyntheticDataset.advance()): edited and new chats
+- An HTTP server for the endpoints SyncEngine calls:
+  /api/v1/users/all, /api/v1/chats/list/user/{id}, /api/v1/chats/all/{id},
+  /api/v1/models/ and /api/v1/knowledge/
+- Fault injection: latency, 429 responses, server errors and connections
+  dropped mid-response
+
+Example:
+    dataset = SyntheticDataset(users=1000, chats=1000000, messages=20000000)
+    with MockOpenWebUIServer(dataset, FaultConfig(latency=0.02)) as server:
+        register_instance('mock', server.url)
+        SyncEngine(DatabaseManager('/tmp/mock.db')).sync_instance('mock')
+"""
+
+import bisect
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import INSTANCES
+
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+MODELS = ('gpt-4o', 'gpt-4o-mini', 'claude-3-5-sonnet', 'llama-3.1-70b', 'mistral-large')
+
+# Short prompts users repeat verbatim (exercises message body deduplication)
+COMMON_PROMPTS = (
+    'continue', 'thanks!', 'can you make it shorter?', 'translate this to Spanish',
+    'explain that in simpler terms', 'give me three more examples', 'summarize the above',
+)
+
+_SYLLABLES = ('ka', 'lo', 'mi', 'ra', 'te', 'su', 'no', 'vi', 'de', 'po', 'an', 'el',
+              'or', 'is', 'ul', 'ex', 'tion', 'ment', 'ing', 'er')
+
+# Message IDs carry the message index in 16 bits
+MAX_MESSAGES_PER_CHAT = 0xFFFF
+
+
+def _user_id(user: int) -> str:
+    return f"{user:08x}-0000-4000-a000-000000000000"
+
+
+def _chat_id(user: int, chat: int) -> str:
+    return f"{user:08x}-0000-4000-8000-{chat:012x}"
+
+
+def _message_id(user: int, chat: int, index: int) -> str:
+    return f"{user:08x}-{index:04x}-4000-9000-{chat:012x}"
+
+
+def _parse_id(value: str, marker: str) -> Optional[Tuple[int, int]]:
+    """Split a generated user or chat ID into (user, chat) indexes."""
+    parts = value.split('-')
+    if len(parts) != 5 or parts[3] != marker:
+        return None
+    try:
+        return int(parts[0], 16), int(parts[4], 16)
+    except ValueError:
+        return None
+
+
+class SyntheticDataset:
+    """
+    Deterministic OpenWebUI data generated from a seed.
+
+    Chats are spread over users with a Zipf-like skew (a few heavy users,
+    a long tail) and over the `days` before end_time. Chat details are
+    generated from (seed, user, chat) when requested, so only per-user chat
+    counts and the history of advance() are kept in memory.
+
+    Each advance() is one "hour" of activity after end_time: a fraction of
+    existing chats gets two new messages and new chats are started, as an
+    incremental sync would find them.
+    """
+
+    # Seconds of simulated time per advance()
+    EPOCH_SECONDS = 3600
+
+    def __init__(self, users: int = 100, chats: int = 5000, messages: int = 50000,
+                 seed: int = 0, days: int = 365, end_time: int = None,
+                 skew: float = 0.8, history: bool = True):
+        """
+        Initialize synthetic dataset.
+
+        Args:
+            users: Number of users
+            chats: Number of chats across all users
+            messages: Approximate number of messages across all chats
+            seed: Random seed; the same arguments always give the same data
+            days: Chats are created over this many days before end_time
+            end_time: Unix time of the newest chat (default: today 00:00 UTC,
+                      pass it explicitly for runs reproducible across days)
+            skew: Zipf exponent of chats per user (0 = even)
+            history: Include the chat.history message tree, as OpenWebUI
+                     does, which roughly doubles the size of chat details
+        """
+        if users < 1 or chats < 0:
+            raise ValueError("users must be at least 1 and chats not negative")
+
+        self.users = users
+        self.chats = chats
+        self.seed = seed
+        self.history = history
+        self.end_time = int(end_time if end_time is not None else time.time() // 86400 * 86400)
+        self.start_time = self.end_time - days * 86400
+        self.messages_per_chat = messages / chats if chats else 0
+
+        rng = random.Random(f"{seed}/users")
+        ranks = list(range(users))
+        rng.shuffle(ranks)
+        self._weights = [(ranks[user] + 1) ** -skew for user in range(users)]
+        total = sum(self._weights)
+        counts = [int(chats * weight / total) for weight in self._weights]
+        by_activity = sorted(range(users), key=lambda user: ranks[user])
+        for user in by_activity[:chats - sum(counts)]:
+            counts[user] += 1
+        self._base_counts = counts
+        self._offsets = [0]
+        for count in counts:
+            self._offsets.append(self._offsets[-1] + count)
+
+        self._vocabulary = [
+            ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4)))
+            for _ in range(2000)
+        ]
+
+        self._lock = threading.Lock()
+        self.epoch = 0
+        self._changed: List[set] = []          # Global chat indexes edited in each epoch
+        self._touched_users: List[set] = []    # Users active in each epoch
+        self._added: Dict[int, List[int]] = {}  # User -> epoch of each chat added after the base set
+
+    # ------------------------------------------------------------------------
+    # Activity
+    # ------------------------------------------------------------------------
+
+    def epoch_time(self, epoch: int) -> int:
+        """Unix time of an epoch (0 = end_time)."""
+        return self.end_time + epoch * self.EPOCH_SECONDS
+
+    def advance(self, changed_fraction: float = 0.01, new_chats: int = None) -> Dict[str, int]:
+        """
+        Simulate one epoch of activity.
+
+        Args:
+            changed_fraction: Fraction of the base chats that get two new messages
+            new_chats: Chats started in this epoch (default: a tenth of the changed ones)
+
+        Returns:
+            dict: epoch, changed_chats and new_chats
+        """
+        with self._lock:
+            epoch = self.epoch + 1
+            rng = random.Random(f"{self.seed}/epoch/{epoch}")
+            changed = set(rng.sample(range(self.chats), round(self.chats * changed_fraction)))
+            if new_chats is None:
+                new_chats = len(changed) // 10
+
+            touched = {bisect.bisect_right(self._offsets, index) - 1 for index in changed}
+            for user in rng.choices(range(self.users), weights=self._weights, k=new_chats):
+                self._added.setdefault(user, []).append(epoch)
+                touched.add(user)
+
+            self._changed.append(changed)
+            self._touched_users.append(touched)
+            self.epoch = epoch
+        return {'epoch': epoch, 'changed_chats': len(changed), 'new_chats': new_chats}
+
+    def _edit_epochs(self, user: int, chat: int) -> List[int]:
+        """Epochs in which a base chat was edited."""
+        if chat >= self._base_counts[user]:
+            return []
+        index = self._offsets[user] + chat
+        return [epoch for epoch, changed in enumerate(self._changed, 1) if index in changed]
+
+    def chat_count(self, user: int) -> int:
+        """Number of chats a user has now (base chats plus chats added since)."""
+        return self._base_counts[user] + len(self._added.get(user, ()))
+
+    # ------------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------------
+
+    def _words(self, rng: random.Random, count: int) -> str:
+        return ' '.join(rng.choices(self._vocabulary, k=count))
+
+    def _chat_times(self, user: int, chat: int) -> Tuple[int, int]:
+        """(created_at, updated_at) of a chat, before any edits."""
+        count = self._base_counts[user]
+        if chat >= count:
+            created = self.epoch_time(self._added[user][chat - count]) - 600
+            return created, created + 300
+        span = self.end_time - self.start_time
+        created = self.start_time + int((chat + 0.5) * span / count)
+        return created, min(created + (user * 7919 + chat * 104729) % 7200, self.end_time)
+
+    def _chat_summary(self, user: int, chat: int) -> Dict[str, Any]:
+        created, updated = self._chat_times(user, chat)
+        edits = self._edit_epochs(user, chat)
+        if edits:
+            updated = self.epoch_time(edits[-1])
+        title_words = [self._vocabulary[(user * 31 + chat * 17 + i * 7) % len(self._vocabulary)] for i in range(4)]
+        return {
+            'id': _chat_id(user, chat),
+            'title': ' '.join(title_words).capitalize(),
+            'created_at': created,
+            'updated_at': updated,
+        }
+
+    def get_users(self) -> List[Dict[str, Any]]:
+        """Users as returned by /api/v1/users/all."""
+        users = []
+        for user in range(self.users):
+            count = self.chat_count(user)
+            last_active = max((self._chat_times(user, chat)[1] for chat in range(max(0, count - 3), count)),
+                              default=self.start_time)
+            for epoch, touched in enumerate(self._touched_users, 1):
+                if user in touched:
+                    last_active = max(last_active, self.epoch_time(epoch))
+            users.append({
+                'id': _user_id(user),
+                'name': f"User {user}",
+                'email': f"user{user}@example.com",
+                'role': 'admin' if user == 0 else 'user',
+                'profile_image_url': '/user.png',
+                'created_at': self.start_time,
+                'updated_at': last_active,
+                'last_active_at': last_active,
+            })
+        return users
+
+    def get_user_chats(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """A user's chats as returned by /api/v1/chats/list/user/{id}, newest first."""
+        parsed = _parse_id(user_id, 'a000')
+        if parsed is None or parsed[0] >= self.users:
+            return None
+        user = parsed[0]
+        chats = [self._chat_summary(user, chat) for chat in range(self.chat_count(user))]
+        chats.sort(key=lambda c: c['updated_at'], reverse=True)
+        return chats
+
+    def get_chat(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """A chat with its messages as returned by /api/v1/chats/all/{id}."""
+        parsed = _parse_id(chat_id, '8000')
+        if parsed is None:
+            return None
+        user, chat = parsed
+        if user >= self.users or chat >= self.chat_count(user):
+            return None
+
+        summary = self._chat_summary(user, chat)
+        rng = random.Random(f"{self.seed}/{user}/{chat}")
+        models = rng.sample(MODELS, 2 if rng.random() < 0.1 else 1)
+        count = max(2, round(self.messages_per_chat * rng.uniform(0.5, 1.5)))
+        times = [summary['created_at'] + index * 60 for index in range(count)]
+        for epoch in self._edit_epochs(user, chat):
+            times += [self.epoch_time(epoch) - 60, self.epoch_time(epoch)]
+        times = times[:MAX_MESSAGES_PER_CHAT]
+
+        messages = []
+        parent_id = None
+        for index, timestamp in enumerate(times):
+            message_id = _message_id(user, chat, index)
+            if index % 2 == 0:
+                message = {
+                    'id': message_id,
+                    'parentId': parent_id,
+                    'childrenIds': [],
+                    'role': 'user',
+                    'content': (rng.choice(COMMON_PROMPTS) if rng.random() < 0.1
+                                else self._words(rng, rng.randint(5, 40))),
+                    'timestamp': timestamp,
+                    'models': models,
+                }
+                if rng.random() < 0.03:
+                    message['files'] = [{
+                        'type': 'file',
+                        'file': {
+                            'id': f"{message_id}-file",
+                            'filename': f"{self._vocabulary[index % len(self._vocabulary)]}.pdf",
+                            'size': rng.randint(10000, 5000000),
+                            'hash': f"{rng.getrandbits(128):032x}",
+                        },
+                    }]
+            else:
+                model = models[(index // 2) % len(models)]
+                message = {
+                    'id': message_id,
+                    'parentId': parent_id,
+                    'childrenIds': [],
+                    'role': 'assistant',
+                    'content': self._words(rng, rng.randint(30, 300)),
+                    'timestamp': timestamp,
+                    'model': model,
+                    'modelName': model,
+                    'done': True,
+                }
+            if messages:
+                messages[-1]['childrenIds'] = [message_id]
+            messages.append(message)
+            parent_id = message_id
+
+        chat_data = {'title': summary['title'], 'models': models, 'messages': messages}
+        if self.history:
+            chat_data['history'] = {
+                'currentId': parent_id,
+                'messages': {message['id']: message for message in messages},
+            }
+        return {
+            'id': summary['id'],
+            'user_id': _user_id(user),
+            'title': summary['title'],
+            'chat': chat_data,
+            'created_at': summary['created_at'],
+            'updated_at': summary['updated_at'],
+            'archived': False,
+            'pinned': False,
+            'folder_id': None,
+            'share_id': None,
+        }
+
+    def get_models(self) -> Dict[str, Any]:
+        """Models as returned by /api/v1/models/."""
+        return {'data': [{'id': model, 'name': model, 'owned_by': 'openai'} for model in MODELS]}
+
+    def get_knowledge_bases(self) -> List[Dict[str, Any]]:
+        """Knowledge bases as returned by /api/v1/knowledge/."""
+        return [
+            {
+                'id': f"00000000-0000-4000-b000-{index:012x}",
+                'name': f"Knowledge base {index}",
+                'description': self._vocabulary[index],
+                'data': {'file_ids': []},
+                'created_at': self.start_time,
+                'updated_at': self.start_time,
+            }
+            for index in range(5)
+        ]
+
+
+# ============================================================================
+# FAULT INJECTION
+# ============================================================================
+
+class FaultConfig:
+    """
+    Faults the mock server injects, each drawn per request from a seeded RNG.
+
+    Attributes:
+        latency: Seconds added to every response
+        jitter: Extra random latency, up to this many seconds
+        rate_429: Fraction of requests answered with 429 Too Many Requests
+        retry_after: Retry-After header on 429 responses (None to omit it)
+        error_rate: Fraction of requests answered with 500
+        disconnect_rate: Fraction of chat details cut off mid-body
+        seed: Seed of the fault RNG
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0,
+                 retry_after: Optional[float] = 1, error_rate: float = 0.0,
+                 disconnect_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.disconnect_rate = disconnect_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> float:
+        """Draw a random number in [0, 1) (thread-safe)."""
+        with self._lock:
+            return self._rng.random()
+
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler serving a MockOpenWebUIServer's dataset."""
+
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    # Headers and body go out in separate writes; without TCP_NODELAY each
+    # response would wait on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        mock = self.server.mock
+        faults = mock.faults
+        path = self.path.split('?', 1)[0].rstrip('/')
+        endpoint = self._endpoint(path)
+        mock.count(endpoint)
+
+        delay = faults.latency + (faults.jitter * faults.draw() if faults.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._send_status(401, endpoint)
+        if faults.rate_429 and faults.draw() < faults.rate_429:
+            headers = {'Retry-After': str(faults.retry_after)} if faults.retry_after is not None else {}
+            return self._send_status(429, endpoint, headers)
+        if faults.error_rate and faults.draw() < faults.error_rate:
+            return self._send_status(500, endpoint)
+
+        dataset = mock.dataset
+        if endpoint == 'users':
+            data = {'users': dataset.get_users()}
+        elif endpoint == 'chat_list':
+            data = dataset.get_user_chats(path.rsplit('/', 1)[1])
+        elif endpoint == 'chat':
+            data = dataset.get_chat(path.rsplit('/', 1)[1])
+        elif endpoint == 'models':
+            data = dataset.get_models()
+        elif endpoint == 'knowledge':
+            data = dataset.get_knowledge_bases()
+        else:
+            data = None
+        if data is None:
+            return self._send_status(404, endpoint)
+
+        body = json.dumps(data).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+
+        disconnect = endpoint == 'chat' and faults.disconnect_rate and faults.draw() < faults.disconnect_rate
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if disconnect:
+            # Promise the whole body, send half, and drop the connection
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            mock.count('disconnects')
+        else:
+            self.wfile.write(body)
+        mock.count('bytes_sent', len(body))
+
+    @staticmethod
+    def _endpoint(path: str) -> str:
+        if path == '/api/v1/users/all':
+            return 'users'
+        if path.startswith('/api/v1/chats/list/user/'):
+            return 'chat_list'
+        if path.startswith('/api/v1/chats/all/'):
+            return 'chat'
+        if path == '/api/v1/models':
+            return 'models'
+        if path == '/api/v1/knowledge':
+            return 'knowledge'
+        return 'other'
+
+    def _send_status(self, status: int, endpoint: str, headers: Dict[str, str] = None):
+        self.server.mock.count(f"status_{status}")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockOpenWebUIServer"
+
+
+class MockOpenWebUIServer:
+    """
+    Threaded HTTP server answering OpenWebUI API calls from a SyntheticDataset.
+
+    Any "Bearer" token is accepted. Responses are gzip-compressed when the
+    client accepts it, as OpenWebUI behind a proxy would.
+
+    Example:
+        with MockOpenWebUIServer(SyntheticDataset(users=50)) as server:
+            print(server.url, server.stats())
+    """
+
+    def __init__(self, dataset: SyntheticDataset, faults: FaultConfig = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize mock server (call start() or use it as a context manager).
+
+        Args:
+            dataset: Data to serve
+            faults: Faults to inject (none if not given)
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+        """
+        self.dataset = dataset
+        self.faults = faults or FaultConfig()
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server (use as the instance url)."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, amount: int = 1):
+        """Add to a request statistic."""
+        with self._stats_lock:
+            self._stats[key] = self._stats.get(key, 0) + amount
+
+    def stats(self) -> Dict[str, int]:
+        """Requests per endpoint, responses per error status, disconnects and bytes_sent."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        """Clear the request statistics."""
+        with self._stats_lock:
+            self._stats.clear()
+
+    def start(self) -> 'MockOpenWebUIServer':
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="openwebui-mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockOpenWebUIServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def register_instance(name: str, url: str, max_workers: int = None):
+    """
+    Add a mock instance to INSTANCES for this process, so SyncEngine can sync it.
+
+    The instance is not active, so sync_all_instances() leaves it out.
+
+    Args:
+        name: Instance name
+        url: Base URL of a running mock server
+        max_workers: Chat-detail workers (SYNC_MAX_WORKERS if None)
+    """
+    INSTANCES[name] = {'url': url, 'api_key': 'mock', 'is_active': False}
+    if max_workers is not None:
+        INSTANCES[name]['max_workers'] = max_workers
@@ -0,0 +1,348 @@
+"""
+Query Plan Checks for the sync database
+
+Handles:
+- Running the status, report, search, sync and export queries as they run in production
+- Capturing every SELECT they execute (with bound values) via a trace callback
+- EXPLAIN QUERY PLAN of each statement, flagging full scans of large tables
+- Timing each workload and statement
+- Building a synthetic database to check against
+
+A schema change that drops or reorders an index these queries rely on shows
+up as a full scan here. Run it with `sync_cli.py db check-plans`, against the
+configured database or a freshly built synthetic one (--synthetic).
+"""
+
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import DB_BATCH_SIZE
+from .database import DatabaseManager
+from .exporter import EXPORT_TABLES, _select_sql
+from .report_generator import ReportGenerator
+
+
+# Tables that grow with usage; a full scan of any of them is a regression
+LARGE_TABLES = frozenset({
+    'chats', 'chat_models', 'messages', 'message_contents',
+    'rollup_user_daily', 'rollup_model_daily',
+})
+
+# The Example Queries section of README_SYNC.md (parameter: instance ID)
+EXAMPLE_QUERIES = {
+    'Total messages per user': """
+        SELECT u.name, COUNT(*) as message_count
+        FROM users u
+        JOIN chats c ON c.user_id = u.id AND c.instance_id = u.instance_id
+        JOIN messages m ON m.chat_id = c.id AND m.instance_id = c.instance_id
+        WHERE u.instance_id = ? AND u.is_deleted = 0
+        GROUP BY u.id
+        ORDER BY message_count DESC
+        LIMIT 10
+    """,
+    'Model usage distribution': """
+        SELECT cm.model_id, COUNT(*) as usage_count
+        FROM chat_models cm
+        JOIN chats c ON c.id = cm.chat_id AND c.instance_id = cm.instance_id
+        WHERE c.instance_id = ? AND c.is_deleted = 0
+        GROUP BY cm.model_id
+        ORDER BY usage_count DESC
+    """,
+    'Daily message volume': """
+        SELECT DATE(created_at) as date, COUNT(*) as messages
+        FROM messages
+        WHERE instance_id = ? AND created_at >= date('now', '-30 days')
+        GROUP BY date
+        ORDER BY date DESC
+    """,
+    'Chats updated this month': """
+        SELECT COUNT(*) as chats
+        FROM chats
+        WHERE instance_id = ? AND is_deleted = 0 AND updated_at >= date('now', 'start of month')
+    """,
+}
+
+_TABLE_REFERENCE = re.compile(
+    r'\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|INNER|CROSS|GROUP|ORDER|LIMIT|USING)\b)(\w+))?',
+    re.IGNORECASE
+)
+_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """Map each table name and alias referenced in a statement to its table."""
+    aliases = {}
+    for table, alias in _TABLE_REFERENCE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(sql: str, plan: List[str]) -> List[str]:
+    """
+    Find full scans of large tables in a query plan.
+
+    A scan of a covering index still reads the whole table's worth of index
+    entries, so it counts too. Full-text (virtual table) scans do not.
+
+    Args:
+        sql: The statement the plan belongs to
+        plan: EXPLAIN QUERY PLAN detail lines
+
+    Returns:
+        list: Plan lines that scan a table in LARGE_TABLES
+    """
+    aliases = _table_aliases(sql)
+    scans = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if match and 'VIRTUAL TABLE' not in detail and aliases.get(match.group(1)) in LARGE_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def explain(conn, sql: str, params: tuple = ()) -> List[str]:
+    """
+    Get a statement's query plan.
+
+    Args:
+        conn: Database connection
+        sql: Statement to explain
+        params: Statement parameters
+
+    Returns:
+        list: EXPLAIN QUERY PLAN detail lines, in plan order
+    """
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def _capture(conn, func: Callable[[], Any]) -> List[str]:
+    """Run func and return the distinct SELECT statements it executed on conn."""
+    statements = []
+
+    def trace(sql: str):
+        if sql.lstrip().upper().startswith(('SELECT', 'WITH')) and sql not in statements:
+            statements.append(sql)
+
+    conn.set_trace_callback(trace)
+    try:
+        func()
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of func over repeat runs, in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# ============================================================================
+# WORKLOADS
+# ============================================================================
+
+def _workloads(db: DatabaseManager, instance_name: str, instance_id: int,
+               search_term: str) -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    Build the workloads checked for one instance.
+
+    Each workload calls the same methods the CLI, reports and sync engine
+    use, so the statements checked are the ones that actually run.
+    """
+    with db.get_connection() as conn:
+        chat = conn.execute("""
+            SELECT id, user_id, updated_at FROM chats
+            WHERE instance_id = ? AND is_deleted = 0
+            ORDER BY updated_at DESC LIMIT 1
+        """, (instance_id,)).fetchone()
+        watermarks = {
+            table: conn.execute(f"SELECT MAX(sync_datetime) FROM {table}").fetchone()[0]
+            for table in EXPORT_TABLES
+        }
+
+    def sync_change_detection():
+        db.get_user_ids_for_instance(instance_id)
+        db.get_chat_states(instance_id)
+        if chat:
+            db.get_chat_states(instance_id, chat['user_id'])
+            db.get_chat(chat['id'], instance_id)
+            db.get_chat_model_ids(chat['id'], instance_id)
+            db.get_message_fingerprints(chat['id'], instance_id)
+
+    def chat_view():
+        if chat:
+            db.get_chat_messages(chat['id'], instance_id)
+
+    def incremental_export():
+        with db.get_connection() as conn:
+            for table, spec in EXPORT_TABLES.items():
+                conn.execute(f"SELECT COUNT(*) FROM {table} WHERE sync_datetime = ?",
+                             (watermarks[table],)).fetchone()
+                sql = _select_sql(table, spec['columns'], spec['month']).format(op='>')
+                conn.execute(sql, (watermarks[table],)).fetchall()
+
+    def example_queries():
+        with db.get_connection() as conn:
+            for sql in EXAMPLE_QUERIES.values():
+                conn.execute(sql, (instance_id,)).fetchall()
+
+    workloads = [
+        ('status', lambda: db.get_instance_summary(instance_name)),
+        ('report data', lambda: ReportGenerator(db, include_azure_costs=False)
+            .get_instance_data(instance_name, instance_id)),
+        ('sync change detection', sync_change_detection),
+        ('chat messages', chat_view),
+        ('incremental export', incremental_export),
+        ('README example queries', example_queries),
+    ]
+
+    if db.search_available:
+        # Chats active in the 30 days before the newest one
+        since = None
+        if chat and chat['updated_at']:
+            since = (datetime.fromisoformat(chat['updated_at']) - timedelta(days=30)).strftime('%Y-%m-%d')
+        workloads.append(('search', lambda: (
+            db.search_messages(search_term, instance_name=instance_name, since=since, role='user'),
+            db.search_chat_titles(search_term, instance_name=instance_name, since=since),
+        )))
+
+    return workloads
+
+
+def check_query_plans(db: DatabaseManager, instance_name: str = None, repeat: int = 3,
+                      search_term: str = 'report') -> List[Dict[str, Any]]:
+    """
+    Check the plans and timings of the report, status, search, sync and export queries.
+
+    Args:
+        db: Database manager
+        instance_name: Only check this instance (default: every instance with chats)
+        repeat: Timed runs per workload and statement (best time is reported)
+        search_term: Word used for the full-text search workload
+
+    Returns:
+        list: One dict per (instance, workload) with instance, workload, seconds
+              and statements (dicts with sql, plan, seconds and full_scans)
+    """
+    with db.get_connection() as conn:
+        instances = conn.execute("""
+            SELECT id, name FROM instances i
+            WHERE (? IS NULL OR name = ?)
+              AND EXISTS (SELECT 1 FROM chats WHERE instance_id = i.id)
+            ORDER BY name
+        """, (instance_name, instance_name)).fetchall()
+
+    results = []
+    for instance_id, name in instances:
+        for workload, func in _workloads(db, name, instance_id, search_term):
+            with db.get_connection() as conn:
+                captured = _capture(conn, func)
+                seconds = _best_time(func, repeat)
+
+                statements = []
+                for sql in captured:
+                    plan = explain(conn, sql)
+                    statements.append({
+                        'sql': sql,
+                        'plan': plan,
+                        'seconds': _best_time(lambda: conn.execute(sql).fetchall(), repeat),
+                        'full_scans': full_scans(sql, plan),
+                    })
+
+            results.append({
+                'instance': name,
+                'workload': workload,
+                'seconds': seconds,
+                'statements': statements,
+            })
+
+    return results
+
+
+# ============================================================================
+# SYNTHETIC DATABASE
+# ============================================================================
+
+_WORDS = (
+    "report budget deposition contract review summary draft policy invoice schedule "
+    "client meeting analysis proposal figures quarterly memo research filing audit "
+    "deadline estimate compliance training onboarding letter table chart email notes"
+).split()
+
+_MODELS = ('gpt-4o', 'gpt-4o-mini', 'claude-sonnet', 'llama-3-70b')
+
+
+def build_synthetic_database(db_path: str, messages: int = 100000, users: int = 200,
+                             messages_per_chat: int = 10, seed: int = 0) -> DatabaseManager:
+    """
+    Fill a new database with synthetic users, chats and messages.
+
+    Data is spread over two instances and the past year, with a few deleted
+    users and chats, one or two models per chat, and repeated message bodies,
+    so every index and trigger has realistic work to do.
+
+    Args:
+        db_path: Path of the database to create (must not exist yet)
+        messages: Total number of messages
+        users: Users per instance
+        messages_per_chat: Messages in each chat
+        seed: Random seed (the same seed builds the same data)
+
+    Returns:
+        DatabaseManager: Manager for the new database
+    """
+    rng = random.Random(seed)
+    db = DatabaseManager(db_path)
+    sync_time = datetime.now()
+    start = sync_time - timedelta(days=365)
+    instance_ids = [db.upsert_instance(name, 'http://localhost', 'synthetic')
+                    for name in ('synthetic_a', 'synthetic_b')]
+    chat_ids = {instance_id: [] for instance_id in instance_ids}
+
+    with db.batch(DB_BATCH_SIZE) as batch:
+        for instance_id in instance_ids:
+            for n in range(users):
+                batch.upsert_user({'id': f'user-{n}', 'name': f'User {n}', 'email': f'user{n}@example.com',
+                                   'role': 'user'}, instance_id, sync_time)
+
+        for n in range(max(1, messages // messages_per_chat)):
+            instance_id = instance_ids[n % len(instance_ids)]
+            chat_id = f'chat-{n}'
+            created = start + timedelta(seconds=rng.randrange(365 * 86400))
+            updated = created + timedelta(minutes=messages_per_chat * 2)
+            chat_ids[instance_id].append(chat_id)
+
+            batch.upsert_chat({'id': chat_id, 'title': ' '.join(rng.choices(_WORDS, k=4)),
+                               'created_at': created.timestamp(), 'updated_at': updated.timestamp()},
+                              instance_id, f'user-{rng.randrange(users)}', sync_time)
+            chat_models = rng.sample(_MODELS, rng.choice((1, 1, 1, 2)))
+            for model_id in chat_models:
+                batch.upsert_chat_model(chat_id, instance_id, model_id, sync_time)
+
+            for i in range(messages_per_chat):
+                role = 'user' if i % 2 == 0 else 'assistant'
+                if rng.random() < 0.1:
+                    content = "Thanks, that helps."
+                else:
+                    content = ' '.join(rng.choices(_WORDS, k=rng.randint(10, 120)))
+                batch.upsert_message({'id': f'{chat_id}-{i}', 'role': role, 'content': content,
+                                      'timestamp': (created + timedelta(minutes=i * 2)).timestamp(),
+                                      'model': chat_models[0] if role == 'assistant' else None},
+                                     chat_id, instance_id, sync_time)
+
+        for instance_id in instance_ids:
+            batch.mark_users_deleted([f'user-{n}' for n in range(0, users, 50)], instance_id)
+
+    for instance_id, ids in chat_ids.items():
+        db.mark_unseen_chats_deleted(instance_id, [chat_id for chat_id in ids if rng.random() >= 0.05])
+
+    return db
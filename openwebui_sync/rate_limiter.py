@@ -0,0 +1,148 @@
+"""
+Adaptive Rate Limiter for OpenWebUI API requests
+
+Handles:
+- Token-bucket pacing shared by all worker threads of an instance
+- Slow-start ramp-up, then additive increase while responses are healthy
+- Multiplicative backoff on 429 responses or rising latency
+- Honoring Retry-After without blocking other instances
+"""
+
+import threading
+import time
+from typing import Optional
+from .config import (
+    RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX,
+    RATE_LIMIT_LATENCY_FACTOR, RATE_LIMIT_DEFAULT_RETRY_AFTER
+)
+
+
+class AdaptiveRateLimiter:
+    """
+    AIMD token-bucket rate limiter for a single instance.
+
+    Provides:
+    - acquire() to wait for a request slot
+    - record_success() to feed back latency of completed requests
+    - record_throttled() to back off after a 429 response
+    """
+
+    # Fraction of the rate kept after a backoff
+    BACKOFF_FACTOR = 0.5
+
+    # Minimum seconds between two backoffs (latency or 429). Requests already
+    # in flight when the server gets overloaded fail together, and should
+    # count as one overload event rather than halve the rate once each.
+    BACKOFF_COOLDOWN = 2.0
+
+    # Smoothing factor for the latency moving average
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, initial_rate: float = RATE_LIMIT_INITIAL,
+                 min_rate: float = RATE_LIMIT_MIN, max_rate: float = RATE_LIMIT_MAX):
+        """
+        Initialize rate limiter.
+
+        Args:
+            initial_rate: Starting request rate (requests/sec)
+            min_rate: Lowest rate backoff can reach
+            max_rate: Highest rate additive increase can reach
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._last_backoff = float('-inf')
+        self._slow_start = True
+        self._latency_avg: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+
+        Tokens are refilled at the current rate and capped at one second of
+        burst, so all workers sharing the limiter share one budget.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                else:
+                    wait = (1.0 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+    def _refill(self, now: float):
+        """Add tokens accrued since the last refill (caller holds the lock)."""
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(max(self.rate, 1.0), self._tokens + elapsed * self.rate)
+
+    def record_success(self, latency: float):
+        """
+        Feed back a successful request.
+
+        Until the first backoff the rate roughly doubles every second (slow
+        start); afterwards it grows by about one request/sec per second.
+        Backs off instead if latency has risen well above the baseline.
+
+        Args:
+            latency: Request duration in seconds
+        """
+        with self._lock:
+            if self._latency_avg is None:
+                self._latency_avg = latency
+            else:
+                self._latency_avg += self.LATENCY_SMOOTHING * (latency - self._latency_avg)
+
+            if self._latency_baseline is None or self._latency_avg < self._latency_baseline:
+                self._latency_baseline = self._latency_avg
+
+            if self._latency_avg > self._latency_baseline * RATE_LIMIT_LATENCY_FACTOR:
+                self._backoff(time.monotonic())
+            elif self._slow_start:
+                self.rate = min(self.max_rate, self.rate + 1.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+
+    def record_throttled(self, retry_after: Optional[float] = None):
+        """
+        Back off after a 429 response.
+
+        Pauses this instance's workers for Retry-After seconds, without
+        blocking other instances. The pause always applies; the rate is
+        halved at most once per BACKOFF_COOLDOWN.
+
+        Args:
+            retry_after: Seconds from the Retry-After header, if present
+        """
+        if retry_after is None:
+            retry_after = RATE_LIMIT_DEFAULT_RETRY_AFTER
+
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self._tokens = 0.0
+            self._backoff(now)
+
+    def _backoff(self, now: float):
+        """Reduce the rate multiplicatively (caller holds the lock)."""
+        if now - self._last_backoff < self.BACKOFF_COOLDOWN:
+            return
+        self._last_backoff = now
+        self._slow_start = False
+        self.rate = max(self.min_rate, self.rate * self.BACKOFF_FACTOR)
+
+        # Let the latency baseline re-settle at the new rate
+        self._latency_baseline = self._latency_avg
@@ -2,52 +2,391 @@
 Report Generator - Database-Backed Analytics Reports
 
 Generates HTML reports by querying the local SQLite database instead of making API calls.
-This provides 100x faster report generation.
 
-Status: Coming Soon
-For now, use the existing ai_usage_analyzer.py after syncing data to the database.
+Handles:
+- Single-instance and global reports with the same content as ai_usage_analyzer.py
+- Chat, message and model totals from the daily usage rollups (see rollups.py)
+- Optional Azure cost data (the only part that needs the network)
+
+The HTML itself is rendered by ai_usage_analyzer.generate_html_report and
+generate_global_html_report, so both tools produce identical pages.
 """
 
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+from .config import (
+    BASE_DIR, INSTANCES, REPORTS_DIR,
+    AZURE_CLIENT_ID, AZURE_CLIENT_SECRET, AZURE_TENANT_ID, AZURE_SUBSCRIPTION_ID
+)
 from .database import DatabaseManager
+from . import rollups
+
+
+# Shape of ai_usage_analyzer.get_azure_costs() when no cost data is available
+EMPTY_AZURE_COSTS = {
+    'total_cost': 0,
+    'by_resource_group': {},
+    'by_service': {},
+    'by_location': {},
+    'by_resource': {},
+    'daily_costs': {},
+    'forecast_30d': 0,
+    'forecast_mtd': 0,
+    'currency': 'USD'
+}
+
+
+def _analyzer():
+    """Import ai_usage_analyzer (repository root) with its output redirected to REPORTS_DIR."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.append(str(BASE_DIR))
+    import ai_usage_analyzer
+    ai_usage_analyzer.OUTPUT_DIR = str(REPORTS_DIR)
+    return ai_usage_analyzer
+
+
+def usage_trends(daily: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+    """
+    Build daily, weekly and monthly chat counts from daily counts.
+
+    Uses the same period keys as ai_usage_analyzer.analyze_usage_trends
+    ('%Y-%m-%d', '%Y-W%U', '%Y-%m').
+
+    Args:
+        daily: Chats per day ('YYYY-MM-DD' -> count)
+
+    Returns:
+        dict: 'daily', 'weekly' and 'monthly' counts, sorted by period
+    """
+    weekly = defaultdict(int)
+    monthly = defaultdict(int)
+
+    for day, count in daily.items():
+        dt = datetime.strptime(day, '%Y-%m-%d')
+        weekly[dt.strftime('%Y-W%U')] += count
+        monthly[dt.strftime('%Y-%m')] += count
+
+    return {
+        'daily': dict(sorted(daily.items())),
+        'weekly': dict(sorted(weekly.items())),
+        'monthly': dict(sorted(monthly.items()))
+    }
 
 
 class ReportGenerator:
     """
     Generate analytics reports from database.
 
-    Future implementation will include:
-    - Instant report generation from SQL queries
-    - Historical trend analysis
-    - Advanced user engagement metrics
-    - Model performance comparisons
+    Provides:
+    - generate_instance_report() for one instance
+    - generate_global_report() for all synced instances combined
+    - get_instance_data() with the figures behind a report
     """
 
-    def __init__(self, db_manager: DatabaseManager = None):
+    def __init__(self, db_manager: DatabaseManager = None, include_azure_costs: bool = True):
         """
         Initialize report generator.
 
         Args:
             db_manager: Database manager instance
+            include_azure_costs: Fetch Azure costs (skipped anyway if no
+                                 Azure credentials are configured)
         """
         self.db = db_manager or DatabaseManager()
+        self.include_azure_costs = include_azure_costs
+        self._azure_costs: Optional[Dict[str, Any]] = None
 
-    def generate_instance_report(self, instance_name: str):
+    # ========================================================================
+    # REPORTS
+    # ========================================================================
+
+    def generate_instance_report(self, instance_name: str) -> Optional[str]:
         """
         Generate report for a single instance.
 
         Args:
             instance_name: Instance to generate report for
 
-        Status: Coming soon
+        Returns:
+            str: Path of the HTML report, or None if the instance was never synced
         """
-        print(f"[INFO] DB-based report generation coming soon for {instance_name}")
-        print(f"[INFO] For now, use: python ai_usage_analyzer.py {instance_name}")
+        started = time.perf_counter()
+
+        instance_id = self.db.get_instance_id(instance_name)
+        if instance_id is None:
+            print(f"[ERROR] {instance_name} has not been synced yet")
+            print(f"[INFO] Run: python sync_cli.py sync {instance_name}")
+            return None
 
-    def generate_global_report(self):
+        data = self.get_instance_data(instance_name, instance_id)
+        print(f"  [INFO] {len(data['users'])} users, {data['total_chats']:,} chats "
+              f"({time.perf_counter() - started:.2f}s)")
+
+        report_data = {
+            'instance_name': instance_name,
+            'users': data['users'],
+            'models': data['models'],
+            'knowledge_bases': data['knowledge_bases'],
+            'total_chats': data['total_chats'],
+            'model_usage': data['model_usage'],
+            'trends': data['trends'],
+            'azure_costs': self.get_azure_costs(),
+            'timestamp': datetime.now()
+        }
+
+        _analyzer().generate_html_report(report_data)
+        print(f"[SUCCESS] {instance_name.upper()} report generated in {time.perf_counter() - started:.2f}s")
+        return os.path.join(str(REPORTS_DIR), f"{instance_name.upper()}_Report.html")
+
+    def generate_global_report(self) -> Optional[str]:
         """
         Generate combined report for all instances.
 
-        Status: Coming soon
+        Instances that have never been synced are left out.
+
+        Returns:
+            str: Path of the HTML report, or None if no instance was synced
+        """
+        started = time.perf_counter()
+
+        instances = {}
+        all_models = []
+        all_knowledge_bases = []
+        all_users = []
+        combined_model_usage = defaultdict(int)
+        combined_daily = defaultdict(int)
+
+        for instance_name in INSTANCES:
+            instance_id = self.db.get_instance_id(instance_name)
+            if instance_id is None:
+                print(f"  [WARN] {instance_name} has not been synced yet, skipping")
+                continue
+
+            data = self.get_instance_data(instance_name, instance_id)
+            print(f"  [INFO] {instance_name}: {len(data['users'])} users, {data['total_chats']:,} chats")
+
+            instances[instance_name] = {
+                'users': data['users'],
+                'total_chats': data['total_chats'],
+                'model_usage': data['model_usage'],
+                'trends': data['trends']
+            }
+            all_users.extend(data['users'])
+            all_models.extend({**m, 'instance': instance_name} for m in data['models'])
+            all_knowledge_bases.extend({**kb, 'instance': instance_name} for kb in data['knowledge_bases'])
+
+            for model, count in data['model_usage'].items():
+                combined_model_usage[model] += count
+            for day, count in data['trends']['daily'].items():
+                combined_daily[day] += count
+
+        if not instances:
+            print("[ERROR] No instances have been synced yet")
+            print("[INFO] Run: python sync_cli.py sync --all")
+            return None
+
+        report_data = {
+            'instance_name': 'GlobalAI',
+            'instances': instances,
+            'all_models': all_models,
+            'all_knowledge_bases': all_knowledge_bases,
+            'combined_model_usage': dict(sorted(combined_model_usage.items(), key=lambda x: x[1], reverse=True)),
+            'combined_total_chats': sum(i['total_chats'] for i in instances.values()),
+            'combined_trends': usage_trends(combined_daily),
+            'all_users': all_users,
+            'azure_costs': self.get_azure_costs(),
+            'timestamp': datetime.now()
+        }
+
+        _analyzer().generate_global_html_report(report_data)
+        print(f"[SUCCESS] Global report generated in {time.perf_counter() - started:.2f}s")
+        return os.path.join(str(REPORTS_DIR), "GlobalAI_Report.html")
+
+    def get_azure_costs(self) -> Dict[str, Any]:
+        """
+        Get Azure cost data (fetched once per generator).
+
+        Returns:
+            dict: Same shape as ai_usage_analyzer.get_azure_costs()
+        """
+        if self._azure_costs is None:
+            configured = all([AZURE_CLIENT_ID, AZURE_CLIENT_SECRET, AZURE_TENANT_ID, AZURE_SUBSCRIPTION_ID])
+            if self.include_azure_costs and configured:
+                self._azure_costs = _analyzer().get_azure_costs()
+            else:
+                if self.include_azure_costs:
+                    print("  [INFO] Azure credentials not configured, skipping cost data")
+                self._azure_costs = dict(EMPTY_AZURE_COSTS)
+        return self._azure_costs
+
+    # ========================================================================
+    # QUERIES
+    # ========================================================================
+
+    def get_instance_data(self, instance_name: str, instance_id: int) -> Dict[str, Any]:
+        """
+        Collect the figures for one instance's report.
+
+        Counts cover current (non-deleted) users and chats, as the API would
+        return them. A chat counts once for each of its models, or once as
+        'unknown' if it has none. Trends count chats on the day they were
+        created (the day they were first synced if the API gave no date).
+
+        Args:
+            instance_name: Instance name (stored on each user entry)
+            instance_id: Instance ID
+
+        Returns:
+            dict: users, models, knowledge_bases, total_chats, model_usage
+                  (model -> chats, most used first) and trends
         """
-        print("[INFO] DB-based global report generation coming soon")
-        print("[INFO] For now, use: python ai_usage_analyzer.py globalAI")
+        with self.db.get_connection() as conn:
+            users = conn.execute("""
+                SELECT id, name, email, role
+                FROM users
+                WHERE instance_id = ? AND is_deleted = 0
+                ORDER BY name
+            """, (instance_id,)).fetchall()
+
+            totals, daily, user_model_usage = self._get_activity(conn, instance_id)
+
+            models = [dict(row) for row in conn.execute("""
+                SELECT id, name FROM models
+                WHERE instance_id = ? AND is_deleted = 0
+                ORDER BY name
+            """, (instance_id,))]
+
+            knowledge_bases = [dict(row) for row in conn.execute("""
+                SELECT id, name, description FROM knowledge_bases
+                WHERE instance_id = ? AND is_deleted = 0
+                ORDER BY name
+            """, (instance_id,))]
+
+        user_data = []
+        model_usage = defaultdict(int)
+
+        for user in users:
+            chat_count, user_messages, assistant_messages, chars = totals.get(user['id'], (0, 0, 0, 0))
+            total_messages = user_messages + assistant_messages
+
+            usage = dict(sorted(user_model_usage.get(user['id'], {}).items(),
+                                key=lambda x: x[1], reverse=True))
+            for model, chats in usage.items():
+                model_usage[model] += chats
+
+            user_data.append({
+                'name': user['name'] or 'Unknown',
+                'email': user['email'] or 'N/A',
+                'role': user['role'] or 'user',
+                'chat_count': chat_count,
+                'model_usage': usage,
+                'message_stats': {
+                    'total_messages': total_messages,
+                    'user_messages': user_messages,
+                    'assistant_messages': assistant_messages,
+                    'total_chars': chars,
+                    'avg_messages_per_chat': round(total_messages / chat_count, 1) if chat_count else 0
+                },
+                'instance': instance_name
+            })
+
+        return {
+            'users': user_data,
+            'models': models,
+            'knowledge_bases': knowledge_bases,
+            'total_chats': sum(u['chat_count'] for u in user_data),
+            'model_usage': dict(sorted(model_usage.items(), key=lambda x: x[1], reverse=True)),
+            'trends': usage_trends(daily)
+        }
+
+    def _get_activity(self, conn, instance_id: int) -> tuple:
+        """
+        Get chat, message and model counts from the daily usage rollups.
+
+        The rollups keep the activity of deleted chats, so those chats (few,
+        and found through idx_chats_instance_active) are subtracted again. Only user
+        and assistant messages are counted; characters include all roles.
+
+        Args:
+            conn: Database connection
+            instance_id: Instance ID
+
+        Returns:
+            tuple: (user_id -> [chats, user_messages, assistant_messages, chars],
+                    day -> chats, user_id -> {model: chats})
+        """
+        totals = {}
+        daily = defaultdict(int)
+        model_usage = defaultdict(lambda: defaultdict(int))
+
+        for row in conn.execute("""
+            SELECT user_id, SUM(chats), SUM(user_messages), SUM(assistant_messages), SUM(chars)
+            FROM rollup_user_daily
+            WHERE instance_id = ?
+            GROUP BY user_id
+        """, (instance_id,)):
+            totals[row[0]] = list(row[1:])
+
+        for day, chats in conn.execute("""
+            SELECT day, SUM(chats)
+            FROM rollup_user_daily
+            WHERE instance_id = ?
+            GROUP BY day
+        """, (instance_id,)):
+            daily[day] += chats
+
+        for user_id, model_id, chats in conn.execute("""
+            SELECT user_id, model_id, SUM(chats)
+            FROM rollup_model_daily
+            WHERE instance_id = ?
+            GROUP BY user_id, model_id
+        """, (instance_id,)):
+            model_usage[user_id][model_id] += chats
+
+        # Take deleted chats back out
+        for user_id, day, chats in conn.execute(f"""
+            SELECT c.user_id, {rollups.CHAT_DAY}, COUNT(*)
+            FROM chats c
+            WHERE c.instance_id = ? AND c.is_deleted = 1
+            GROUP BY 1, 2
+        """, (instance_id,)):
+            daily[day] -= chats
+            if user_id in totals:
+                totals[user_id][0] -= chats
+
+        for user_id, model_id, chats in conn.execute("""
+            SELECT c.user_id, COALESCE(cm.model_id, 'unknown'), COUNT(*)
+            FROM chats c
+            LEFT JOIN chat_models cm ON cm.chat_id = c.id AND cm.instance_id = c.instance_id
+            WHERE c.instance_id = ? AND c.is_deleted = 1
+            GROUP BY 1, 2
+        """, (instance_id,)):
+            model_usage[user_id][model_id] -= chats
+
+        # CROSS JOIN keeps the few deleted chats as the outer loop; otherwise
+        # SQLite walks every message of the instance through idx_messages_instance_created
+        for user_id, user_messages, assistant_messages, chars in conn.execute("""
+            SELECT c.user_id,
+                   SUM(m.role = 'user'),
+                   SUM(m.role = 'assistant'),
+                   SUM(COALESCE(m.content_length, 0))
+            FROM chats c
+            CROSS JOIN messages m ON m.chat_id = c.id AND m.instance_id = c.instance_id
+            WHERE c.instance_id = ? AND c.is_deleted = 1
+            GROUP BY c.user_id
+        """, (instance_id,)):
+            if user_id in totals:
+                totals[user_id][1] -= user_messages
+                totals[user_id][2] -= assistant_messages
+                totals[user_id][3] -= chars
+
+        return (
+            totals,
+            {day: chats for day, chats in daily.items() if chats > 0},
+            {user_id: {model: chats for model, chats in usage.items() if chats > 0}
+             for user_id, usage in model_usage.items()}
+        )
@@ -0,0 +1,496 @@
+"""
+Daily Usage Rollups for the sync database
+
+Handles:
+- Rollup tables of chats, messages, characters and files per user per day
+  (rollup_user_daily) and per user, model and day (rollup_model_daily)
+- Triggers that keep them current in the same transaction as the raw rows
+- Rebuilding them from the raw tables
+
+Rollups record activity: a chat counts on the day it was created and a
+message on the day it was sent (the chat's day if the message has no
+timestamp). Soft-deleting a chat does not remove its past activity.
+
+Messages and chat models reach the rollups through their chat's user. A
+sync may write them before their chat row; the chat's insert trigger then
+adds whatever was written ahead of it.
+
+A chat without models counts under model 'unknown' in rollup_model_daily
+until its first model is written, as in ai_usage_analyzer.py.
+
+Chats moved to the monthly archives (see archive.py) keep their activity;
+rebuild_rollups() callers add it back with add_chat_activity().
+
+instance_stats holds each instance's current totals (active users, active
+chats, messages) for `sync_cli.py status`, maintained the same way.
+"""
+
+import re
+import sqlite3
+from contextlib import contextmanager
+
+
+ROLLUP_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS rollup_user_daily (
+        instance_id INTEGER NOT NULL,
+        user_id VARCHAR(36) NOT NULL,
+        day DATE NOT NULL,
+        chats INTEGER NOT NULL DEFAULT 0,
+        user_messages INTEGER NOT NULL DEFAULT 0,
+        assistant_messages INTEGER NOT NULL DEFAULT 0,
+        chars INTEGER NOT NULL DEFAULT 0,
+        messages_with_files INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (instance_id, user_id, day)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_model_daily (
+        instance_id INTEGER NOT NULL,
+        user_id VARCHAR(36) NOT NULL,
+        model_id VARCHAR(255) NOT NULL,
+        day DATE NOT NULL,
+        chats INTEGER NOT NULL DEFAULT 0,
+        assistant_messages INTEGER NOT NULL DEFAULT 0,
+        assistant_chars INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (instance_id, user_id, model_id, day)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_rollup_user_daily_day ON rollup_user_daily(instance_id, day)",
+    "CREATE INDEX IF NOT EXISTS idx_rollup_model_daily_day ON rollup_model_daily(instance_id, day)",
+)
+
+# Day a chat counts on (c = chats row)
+CHAT_DAY = "COALESCE(date(c.created_at), date(c.sync_datetime))"
+
+# Day a message counts on (m = messages row, c = its chat)
+_MESSAGE_DAY = "COALESCE(date({m}.created_at), date(c.created_at), date({m}.sync_datetime))"
+
+_ADD_USER_DAILY = """
+    ON CONFLICT(instance_id, user_id, day) DO UPDATE SET
+        chats = chats + excluded.chats,
+        user_messages = user_messages + excluded.user_messages,
+        assistant_messages = assistant_messages + excluded.assistant_messages,
+        chars = chars + excluded.chars,
+        messages_with_files = messages_with_files + excluded.messages_with_files
+"""
+
+_ADD_MODEL_DAILY = """
+    ON CONFLICT(instance_id, user_id, model_id, day) DO UPDATE SET
+        chats = chats + excluded.chats,
+        assistant_messages = assistant_messages + excluded.assistant_messages,
+        assistant_chars = assistant_chars + excluded.assistant_chars
+"""
+
+
+def _message_delta_sql(row: str, sign: str) -> str:
+    """
+    Build trigger statements adding (sign '+') or removing (sign '-') one message.
+
+    Args:
+        row: Trigger row alias ('NEW' or 'OLD')
+        sign: '+' or '-'
+
+    Returns:
+        str: Statements for a trigger body
+    """
+    day = _MESSAGE_DAY.format(m=row)
+    return f"""
+        INSERT INTO rollup_user_daily (
+            instance_id, user_id, day, chats, user_messages,
+            assistant_messages, chars, messages_with_files
+        )
+        SELECT c.instance_id, c.user_id, {day}, 0,
+               {sign}({row}.role = 'user'),
+               {sign}({row}.role = 'assistant'),
+               {sign}COALESCE({row}.content_length, 0),
+               {sign}COALESCE({row}.has_files, 0)
+        FROM chats c
+        WHERE c.id = {row}.chat_id AND c.instance_id = {row}.instance_id
+        {_ADD_USER_DAILY};
+
+        INSERT INTO rollup_model_daily (
+            instance_id, user_id, model_id, day, chats, assistant_messages, assistant_chars
+        )
+        SELECT c.instance_id, c.user_id, COALESCE({row}.model, 'unknown'), {day}, 0,
+               {sign}1, {sign}COALESCE({row}.content_length, 0)
+        FROM chats c
+        WHERE c.id = {row}.chat_id AND c.instance_id = {row}.instance_id
+          AND {row}.role = 'assistant'
+        {_ADD_MODEL_DAILY};
+    """
+
+
+def _chat_model_delta_sql(row: str, sign: str, model: str = None) -> str:
+    """
+    Build trigger statements adding or removing one chat for a model.
+
+    Args:
+        row: Trigger row alias ('NEW' or 'OLD')
+        sign: '+' or '-'
+        model: SQL literal for the model (default: the row's model_id)
+
+    Returns:
+        str: Statements for a trigger body
+    """
+    model = model or f"{row}.model_id"
+    return f"""
+        INSERT INTO rollup_model_daily (
+            instance_id, user_id, model_id, day, chats, assistant_messages, assistant_chars
+        )
+        SELECT c.instance_id, c.user_id, {model}, {CHAT_DAY}, {sign}1, 0, 0
+        FROM chats c
+        WHERE c.id = {row}.chat_id AND c.instance_id = {row}.instance_id
+        {_ADD_MODEL_DAILY};
+    """
+
+
+def _chat_activity_sql(chat_filter: str, schema: str = None) -> str:
+    """
+    Build statements adding the chats matching chat_filter, with their
+    messages and model associations, to the rollups.
+
+    Used by the chat insert trigger (one chat) and by add_chat_activity()
+    (all). The unary + on m.role keeps SQLite on idx_messages_chat_created
+    instead of an index that leads with the role.
+
+    Args:
+        chat_filter: WHERE condition on chats alias c
+        schema: Schema to read chats, messages and chat_models from
+                (unqualified if None, as triggers require)
+
+    Returns:
+        str: Statements
+    """
+    message_day = _MESSAGE_DAY.format(m='m')
+    prefix = f"{schema}." if schema else ""
+    return f"""
+        INSERT INTO rollup_user_daily (
+            instance_id, user_id, day, chats, user_messages,
+            assistant_messages, chars, messages_with_files
+        )
+        SELECT c.instance_id, c.user_id, {CHAT_DAY}, COUNT(*), 0, 0, 0, 0
+        FROM {prefix}chats c
+        WHERE {chat_filter}
+        GROUP BY 1, 2, 3
+        {_ADD_USER_DAILY};
+
+        INSERT INTO rollup_user_daily (
+            instance_id, user_id, day, chats, user_messages,
+            assistant_messages, chars, messages_with_files
+        )
+        SELECT c.instance_id, c.user_id, {message_day}, 0,
+               SUM(m.role = 'user'),
+               SUM(m.role = 'assistant'),
+               SUM(COALESCE(m.content_length, 0)),
+               SUM(COALESCE(m.has_files, 0))
+        FROM {prefix}chats c
+        JOIN {prefix}messages m ON m.chat_id = c.id AND m.instance_id = c.instance_id
+        WHERE {chat_filter}
+        GROUP BY 1, 2, 3
+        {_ADD_USER_DAILY};
+
+        INSERT INTO rollup_model_daily (
+            instance_id, user_id, model_id, day, chats, assistant_messages, assistant_chars
+        )
+        SELECT c.instance_id, c.user_id, cm.model_id, {CHAT_DAY}, COUNT(*), 0, 0
+        FROM {prefix}chats c
+        JOIN {prefix}chat_models cm ON cm.chat_id = c.id AND cm.instance_id = c.instance_id
+        WHERE {chat_filter}
+        GROUP BY 1, 2, 3, 4
+        {_ADD_MODEL_DAILY};
+
+        INSERT INTO rollup_model_daily (
+            instance_id, user_id, model_id, day, chats, assistant_messages, assistant_chars
+        )
+        SELECT c.instance_id, c.user_id, 'unknown', {CHAT_DAY}, COUNT(*), 0, 0
+        FROM {prefix}chats c
+        WHERE {chat_filter}
+          AND NOT EXISTS (
+              SELECT 1 FROM {prefix}chat_models cm
+              WHERE cm.chat_id = c.id AND cm.instance_id = c.instance_id
+          )
+        GROUP BY 1, 2, 3, 4
+        {_ADD_MODEL_DAILY};
+
+        INSERT INTO rollup_model_daily (
+            instance_id, user_id, model_id, day, chats, assistant_messages, assistant_chars
+        )
+        SELECT c.instance_id, c.user_id, COALESCE(m.model, 'unknown'), {message_day}, 0,
+               COUNT(*), SUM(COALESCE(m.content_length, 0))
+        FROM {prefix}chats c
+        JOIN {prefix}messages m ON m.chat_id = c.id AND m.instance_id = c.instance_id
+        WHERE {chat_filter} AND +m.role = 'assistant'
+        GROUP BY 1, 2, 3, 4
+        {_ADD_MODEL_DAILY};
+    """
+
+
+ROLLUP_TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_chat_insert
+    AFTER INSERT ON chats
+    BEGIN
+        {_chat_activity_sql("c.id = NEW.id AND c.instance_id = NEW.instance_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_message_insert
+    AFTER INSERT ON messages
+    BEGIN
+        {_message_delta_sql('NEW', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_message_delete
+    AFTER DELETE ON messages
+    BEGIN
+        {_message_delta_sql('OLD', '-')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_message_update
+    AFTER UPDATE OF role, content_length, has_files, created_at, model ON messages
+    WHEN OLD.role IS NOT NEW.role
+      OR OLD.content_length IS NOT NEW.content_length
+      OR OLD.has_files IS NOT NEW.has_files
+      OR OLD.created_at IS NOT NEW.created_at
+      OR OLD.model IS NOT NEW.model
+    BEGIN
+        {_message_delta_sql('OLD', '-')}
+        {_message_delta_sql('NEW', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_chat_model_insert
+    AFTER INSERT ON chat_models
+    BEGIN
+        {_chat_model_delta_sql('NEW', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_chat_model_delete
+    AFTER DELETE ON chat_models
+    BEGIN
+        {_chat_model_delta_sql('OLD', '-')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_chat_model_first
+    AFTER INSERT ON chat_models
+    WHEN NOT EXISTS (
+        SELECT 1 FROM chat_models
+        WHERE chat_id = NEW.chat_id AND instance_id = NEW.instance_id AND model_id != NEW.model_id
+    )
+    BEGIN
+        {_chat_model_delta_sql('NEW', '-', "'unknown'")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_chat_model_last
+    AFTER DELETE ON chat_models
+    WHEN NOT EXISTS (
+        SELECT 1 FROM chat_models
+        WHERE chat_id = OLD.chat_id AND instance_id = OLD.instance_id
+    )
+    BEGIN
+        {_chat_model_delta_sql('OLD', '+', "'unknown'")}
+    END
+    """,
+)
+
+_ROLLUP_TRIGGER_NAMES = re.findall(r'CREATE TRIGGER IF NOT EXISTS (\w+)', ''.join(ROLLUP_TRIGGERS_SQL))
+
+
+def create_rollups(conn: sqlite3.Connection) -> bool:
+    """
+    Create the rollup tables and triggers.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        bool: True if the tables or any trigger were newly created on a
+              database that already has chats (so rebuild_rollups() must
+              fill them)
+    """
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_rollup_%'"
+    )}
+
+    for sql in ROLLUP_TABLES_SQL + ROLLUP_TRIGGERS_SQL:
+        conn.execute(sql)
+
+    missing = set(_ROLLUP_TRIGGER_NAMES) - existing
+    return bool(missing) and conn.execute("SELECT EXISTS (SELECT 1 FROM chats)").fetchone()[0] == 1
+
+
+def rebuild_rollups(conn: sqlite3.Connection):
+    """
+    Recompute both rollup tables from chats, messages and chat_models.
+
+    Args:
+        conn: Connection (the caller commits)
+    """
+    conn.execute("DELETE FROM rollup_user_daily")
+    conn.execute("DELETE FROM rollup_model_daily")
+    add_chat_activity(conn)
+
+
+def add_chat_activity(conn: sqlite3.Connection, schema: str = 'main'):
+    """
+    Add the activity of every chat in a schema to the rollups.
+
+    Used for the main database and for attached archives (see archive.py),
+    whose chats are no longer in the raw tables but keep their history.
+
+    Args:
+        conn: Connection (the caller commits)
+        schema: Schema to read chats, messages and chat_models from
+    """
+    for statement in _chat_activity_sql("1 = 1", schema).split(';'):
+        if statement.strip():
+            conn.execute(statement)
+
+
+@contextmanager
+def triggers_suspended(conn: sqlite3.Connection):
+    """
+    Drop the rollup triggers for the duration of the block.
+
+    For writes whose activity the rollups already hold, such as chats moved
+    back from an archive. Run it inside a transaction so the triggers are
+    never missing outside it; if they are, create_rollups() recreates them
+    and the rollups are rebuilt.
+
+    Args:
+        conn: Connection with an open transaction
+    """
+    for name in _ROLLUP_TRIGGER_NAMES:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    try:
+        yield
+    finally:
+        for sql in ROLLUP_TRIGGERS_SQL:
+            conn.execute(sql)
+
+
+# ============================================================================
+# INSTANCE COUNTERS
+# ============================================================================
+
+INSTANCE_STATS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS instance_stats (
+        instance_id INTEGER PRIMARY KEY,
+        users INTEGER NOT NULL DEFAULT 0,
+        chats INTEGER NOT NULL DEFAULT 0,
+        messages INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def _stats_delta_sql(instance: str, users: str = '0', chats: str = '0', messages: str = '0') -> str:
+    """Build a statement adding the given deltas to an instance's counters."""
+    return f"""
+        INSERT INTO instance_stats (instance_id, users, chats, messages)
+        VALUES ({instance}, {users}, {chats}, {messages})
+        ON CONFLICT(instance_id) DO UPDATE SET
+            users = users + excluded.users,
+            chats = chats + excluded.chats,
+            messages = messages + excluded.messages;
+    """
+
+
+# Users and chats count while is_deleted = 0. Upserts rewrite is_deleted on
+# every sync, hence the WHEN guards on the update triggers.
+INSTANCE_STATS_TRIGGERS_SQL = tuple(
+    [
+        sql
+        for table, column in (('users', 'users'), ('chats', 'chats'))
+        for sql in (
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_insert
+            AFTER INSERT ON {table}
+            WHEN NEW.is_deleted = 0
+            BEGIN
+                {_stats_delta_sql('NEW.instance_id', **{column: '1'})}
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_delete
+            AFTER DELETE ON {table}
+            WHEN OLD.is_deleted = 0
+            BEGIN
+                {_stats_delta_sql('OLD.instance_id', **{column: '-1'})}
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_update
+            AFTER UPDATE OF is_deleted ON {table}
+            WHEN (OLD.is_deleted = 0) IS NOT (NEW.is_deleted = 0)
+            BEGIN
+                {_stats_delta_sql('NEW.instance_id', **{column: "CASE WHEN NEW.is_deleted = 0 THEN 1 ELSE -1 END"})}
+            END
+            """,
+        )
+    ] + [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_messages_insert
+        AFTER INSERT ON messages
+        BEGIN
+            {_stats_delta_sql('NEW.instance_id', messages='1')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_stats_messages_delete
+        AFTER DELETE ON messages
+        BEGIN
+            {_stats_delta_sql('OLD.instance_id', messages='-1')}
+        END
+        """,
+    ]
+)
+
+_STATS_TRIGGER_NAMES = re.findall(r'CREATE TRIGGER IF NOT EXISTS (\w+)', ''.join(INSTANCE_STATS_TRIGGERS_SQL))
+
+
+def create_instance_stats(conn: sqlite3.Connection) -> bool:
+    """
+    Create the instance_stats table and its triggers.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        bool: True if any trigger was newly created on a database that
+              already has users (so rebuild_instance_stats() must fill it)
+    """
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_stats_%'"
+    )}
+
+    conn.execute(INSTANCE_STATS_TABLE_SQL)
+    for sql in INSTANCE_STATS_TRIGGERS_SQL:
+        conn.execute(sql)
+
+    missing = set(_STATS_TRIGGER_NAMES) - existing
+    return bool(missing) and conn.execute("SELECT EXISTS (SELECT 1 FROM users)").fetchone()[0] == 1
+
+
+def rebuild_instance_stats(conn: sqlite3.Connection):
+    """
+    Recount instance_stats from users, chats and messages.
+
+    Args:
+        conn: Connection (the caller commits)
+    """
+    conn.execute("DELETE FROM instance_stats")
+    conn.execute("""
+        INSERT INTO instance_stats (instance_id, users, chats, messages)
+        SELECT
+            i.id,
+            (SELECT COUNT(*) FROM users WHERE instance_id = i.id AND is_deleted = 0),
+            (SELECT COUNT(*) FROM chats WHERE instance_id = i.id AND is_deleted = 0),
+            (SELECT COUNT(*) FROM messages WHERE instance_id = i.id)
+        FROM instances i
+    """)
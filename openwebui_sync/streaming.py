@@ -0,0 +1,128 @@
+"""
+Chat detail parsing for the sync engine
+
+Handles:
+- Wrapping fully loaded /api/v1/chats/all/{id} responses
+- Incremental parsing of streamed responses, one message at a time
+- Bounded memory per chat regardless of chat size
+
+Streaming requires the optional ijson package. Without it the sync engine
+falls back to loading each response with response.json().
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from .database import message_fingerprint, messages_hash
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+
+class ChatStreamError(Exception):
+    """Raised when a streamed chat detail response cannot be read to the end."""
+
+
+def streaming_available() -> bool:
+    """Check whether streamed chat parsing is supported (ijson installed)."""
+    return ijson is not None
+
+
+class ChatDetail:
+    """
+    Chat detail from a fully loaded API response.
+
+    Provides the same interface as StreamedChatDetail:
+    - iter_messages() yields each message dict
+    - models lists the chat's model IDs (complete after iter_messages())
+    - messages_hash() returns the hash of the message list, if known upfront
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        """
+        Initialize chat detail.
+
+        Args:
+            data: Response from SyncEngine.fetch_chat_detail (must contain 'chat')
+        """
+        chat = data['chat']
+        self.models: List[str] = chat.get('models', [])
+        self._messages: List[Dict] = chat.get('messages', [])
+
+    def iter_messages(self) -> Iterator[Dict]:
+        """Yield the chat's messages in order."""
+        return iter(self._messages)
+
+    def messages_hash(self) -> Optional[str]:
+        """Hash of the message list (see database.messages_hash)."""
+        return messages_hash((m['id'], message_fingerprint(m)) for m in self._messages)
+
+
+class StreamedChatDetail:
+    """
+    Chat detail parsed incrementally from an open streamed response.
+
+    Only the message being yielded is held in memory; the rest of the body
+    (including the duplicate chat.history tree) is skipped as it is read.
+    The response can be consumed once and is closed afterwards.
+    """
+
+    def __init__(self, response, on_close: Callable[[], None] = None):
+        """
+        Initialize streamed chat detail.
+
+        Args:
+            response: requests.Response opened with stream=True
+            on_close: Called once the response has been consumed and closed
+        """
+        self.models: List[str] = []
+        self._response = response
+        self._on_close = on_close
+
+    def iter_messages(self) -> Iterator[Dict]:
+        """
+        Yield the chat's messages one at a time as they are parsed.
+
+        Raises:
+            ChatStreamError: If the response cannot be read or parsed, or has
+                             no chat.messages list (like the json() path, a
+                             body without one is not taken as an empty chat)
+        """
+        self._response.raw.decode_content = True
+        builder = None
+        has_messages = False
+
+        try:
+            for prefix, event, value in ijson.parse(self._response.raw, use_float=True):
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == 'chat.messages.item' and event == 'end_map':
+                        yield builder.value
+                        builder = None
+                elif prefix == 'chat.messages.item' and event == 'start_map':
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                elif prefix == 'chat.messages' and event == 'start_array':
+                    has_messages = True
+                elif prefix == 'chat.models.item' and event == 'string':
+                    self.models.append(value)
+        except Exception as e:
+            raise ChatStreamError(str(e)) from e
+        finally:
+            self.close()
+
+        if not has_messages:
+            raise ChatStreamError("response has no chat.messages list")
+
+    def messages_hash(self) -> Optional[str]:
+        """Not known until the stream has been consumed."""
+        return None
+
+    def close(self):
+        """Close the underlying response (idempotent)."""
+        if self._response is None:
+            return
+        self._response.close()
+        self._response = None
+        if self._on_close:
+            self._on_close()
@@ -6,15 +6,31 @@ Handles:
 - Incremental sync (detect and sync changes only)
 - API communication with OpenWebUI instances
 - Progress tracking and error handling
+- Per-run metrics: request latency, retries, DB time and phase timings
+  (see metrics.py)
+- Time-budgeted incremental syncs that check the most active users first
+- Skipping users whose activity has not moved since their last check
 """
 
 import requests
+import threading
 import time
-from datetime import datetime
-from typing import Dict, Any, List, Optional
-from .database import DatabaseManager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+from requests.adapters import HTTPAdapter
+from .database import (
+    DatabaseManager, BatchWriter, message_fingerprint, messages_hash, user_activity_at
+)
+from .streaming import ChatDetail, ChatStreamError, StreamedChatDetail, streaming_available
+from .rate_limiter import AdaptiveRateLimiter
+from .metrics import SyncMetrics, write_textfile
 from .config import (
-    INSTANCES, API_TIMEOUT, API_DELAY, MAX_RETRIES
+    INSTANCES, API_TIMEOUT, MAX_RETRIES, SYNC_MAX_WORKERS, STREAM_CHAT_DETAILS,
+    METRICS_TEXTFILE_DIR, SYNC_PRIORITY, SYNC_TIME_BUDGET, SYNC_SKIP_INACTIVE_USERS,
+    SYNC_RECONCILE_HOURS
 )
 
 
@@ -27,6 +43,12 @@ class SyncEngine:
     - Incremental sync for updates
     - Change detection using timestamps
     - Efficient API usage with retry logic
+    - Concurrent chat-detail fetching with a bounded worker pool
+    - Pooled keep-alive HTTP sessions with gzip compression
+    - Adaptive per-instance rate limiting
+    - Streaming parse of large chat details (with ijson)
+    - Metrics of every run, stored in sync_run_metrics and optionally
+      written as a Prometheus textfile
     """
 
     def __init__(self, db_manager: DatabaseManager = None):
@@ -38,6 +60,21 @@ class SyncEngine:
         """
         self.db = db_manager or DatabaseManager()
 
+        # One pooled HTTP session and rate limiter per instance, plus the
+        # metrics of its current (or last) run. Limiters persist across runs
+        # so later syncs start at the rate the instance last sustained.
+        self._session_lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._rate_limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._metrics: Dict[str, SyncMetrics] = {}
+
+    def close(self):
+        """Close all pooled HTTP sessions."""
+        with self._session_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
     # ========================================================================
     # API COMMUNICATION
     # ========================================================================
@@ -52,18 +89,91 @@ class SyncEngine:
         Returns:
             dict: Headers with authorization
         """
-        return {"Authorization": f"Bearer {api_key}"}
+        return {
+            "Authorization": f"Bearer {api_key}",
+            "Accept-Encoding": "gzip",
+        }
+
+    def _get_session(self, instance_name: str) -> requests.Session:
+        """
+        Get the long-lived HTTP session for an instance.
+
+        The connection pool is sized to the chat-detail window (two requests
+        per worker) so every concurrent fetch can reuse a keep-alive connection.
+
+        Args:
+            instance_name: Instance name (e.g., 'fasgpt')
+
+        Returns:
+            requests.Session: Session with auth and compression headers set
+        """
+        with self._session_lock:
+            session = self._sessions.get(instance_name)
+            if session is None:
+                # Room for every in-flight or buffered chat-detail response
+                pool_size = self._get_max_workers(instance_name) * 2
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(self._get_headers(INSTANCES[instance_name]['api_key']))
+                self._sessions[instance_name] = session
+            return session
+
+    def _get_rate_limiter(self, instance_name: str) -> AdaptiveRateLimiter:
+        """Get the rate limiter shared by all workers of an instance."""
+        with self._session_lock:
+            limiter = self._rate_limiters.get(instance_name)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter()
+                self._rate_limiters[instance_name] = limiter
+            return limiter
+
+    def _record_bytes(self, instance_name: str, response: requests.Response):
+        """Add the compressed body size of a response to the run's total."""
+        try:
+            received = response.raw.tell()
+        except Exception:
+            received = len(response.content)
+        self._get_metrics(instance_name).count('bytes_received', amount=received)
+
+    def _start_metrics(self, instance_name: str, sync_type: str) -> SyncMetrics:
+        """Start collecting metrics for a new sync run of an instance."""
+        metrics = SyncMetrics(instance_name, sync_type)
+        with self._session_lock:
+            self._metrics[instance_name] = metrics
+        return metrics
+
+    def _get_metrics(self, instance_name: str) -> SyncMetrics:
+        """Metrics of the instance's current run (a detached one outside runs)."""
+        with self._session_lock:
+            metrics = self._metrics.get(instance_name)
+        return metrics if metrics is not None else SyncMetrics(instance_name, 'none')
+
+    def get_metrics(self, instance_name: str) -> Optional[SyncMetrics]:
+        """
+        Get the metrics of an instance's current or most recent sync run.
+
+        Args:
+            instance_name: Instance name
+
+        Returns:
+            SyncMetrics or None if the instance has not been synced
+        """
+        with self._session_lock:
+            return self._metrics.get(instance_name)
 
-    def _fetch_api(self, instance_name: str, endpoint: str) -> Optional[Any]:
+    def _fetch_api(self, instance_name: str, endpoint: str, stream: bool = False) -> Optional[Any]:
         """
         Fetch data from OpenWebUI API with retry logic.
 
         Args:
             instance_name: Instance name (e.g., 'fasgpt')
             endpoint: API endpoint path
+            stream: Return the open response instead of parsed JSON
 
         Returns:
-            JSON response data or None if failed
+            JSON response data (or requests.Response if stream=True) or None if failed
         """
         instance_config = INSTANCES.get(instance_name)
         if not instance_config:
@@ -71,29 +181,139 @@ class SyncEngine:
             return None
 
         url = f"{instance_config['url']}{endpoint}"
-        headers = self._get_headers(instance_config['api_key'])
-
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = requests.get(url, headers=headers, timeout=API_TIMEOUT)
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 429:
-                    # Rate limited
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    print(f"  [WARN] Rate limited, waiting {retry_after}s...")
-                    time.sleep(retry_after)
-                else:
-                    print(f"  [WARN] HTTP {response.status_code} for {endpoint}")
-                    return None
-            except Exception as e:
-                print(f"  [WARN] Attempt {attempt + 1}/{MAX_RETRIES} failed: {e}")
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
+        session = self._get_session(instance_name)
+        limiter = self._get_rate_limiter(instance_name)
+        metrics = self._get_metrics(instance_name)
+
+        # Requests made by the sync loop itself (not by workers) hold it up
+        in_sync_loop = threading.current_thread() is metrics.sync_thread
+        with metrics.waiting('api') if in_sync_loop else nullcontext():
+            for attempt in range(MAX_RETRIES):
+                if attempt:
+                    metrics.count('retries')
+                limiter.acquire()
+                try:
+                    started = time.monotonic()
+                    response = session.get(url, timeout=API_TIMEOUT, stream=stream)
+                    latency = time.monotonic() - started
+                    metrics.observe_request(endpoint, latency)
+                    if response.status_code == 200:
+                        limiter.record_success(latency)
+                        if stream:
+                            return response
+                        self._record_bytes(instance_name, response)
+                        return response.json()
+
+                    # Release the connection (streamed bodies are not read
+                    # otherwise); status and headers stay available
+                    self._record_bytes(instance_name, response)
+                    response.close()
+                    if response.status_code == 429:
+                        # Rate limited - pause this instance's workers only
+                        metrics.count('rate_limited')
+                        retry_after = self._parse_retry_after(response)
+                        limiter.record_throttled(retry_after)
+                        print(f"  [WARN] Rate limited, backing off to {limiter.rate:.1f} req/s...")
+                    else:
+                        metrics.count('http_errors', str(response.status_code))
+                        print(f"  [WARN] HTTP {response.status_code} for {endpoint}")
+                        return None
+                except Exception as e:
+                    metrics.count('request_failures', type(e).__name__)
+                    print(f"  [WARN] Attempt {attempt + 1}/{MAX_RETRIES} failed: {e}")
+                    if attempt < MAX_RETRIES - 1:
+                        time.sleep(2 ** attempt)  # Exponential backoff
 
         print(f"  [ERROR] Failed to fetch {endpoint} after {MAX_RETRIES} attempts")
         return None
 
+    @staticmethod
+    def _parse_retry_after(response: requests.Response) -> Optional[float]:
+        """Get the Retry-After delay in seconds, if the header is numeric."""
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return None
+
+    def _get_max_workers(self, instance_name: str) -> int:
+        """Get the chat-detail worker pool size for an instance."""
+        instance_config = INSTANCES.get(instance_name, {})
+        return max(1, int(instance_config.get('max_workers', SYNC_MAX_WORKERS)))
+
+    def _fetch_chat_detail_for_sync(self, instance_name: str, chat_id: str):
+        """
+        Fetch a chat detail in the form the sync loops consume.
+
+        Streams and parses the response incrementally when ijson is available
+        and STREAM_CHAT_DETAILS is enabled; otherwise loads it with json().
+
+        Args:
+            instance_name: Instance to fetch from
+            chat_id: Chat ID
+
+        Returns:
+            ChatDetail, StreamedChatDetail or None if the fetch failed
+        """
+        if STREAM_CHAT_DETAILS and streaming_available():
+            response = self._fetch_api(instance_name, f"/api/v1/chats/all/{chat_id}", stream=True)
+            if response is None:
+                return None
+            return StreamedChatDetail(response, on_close=lambda: self._record_bytes(instance_name, response))
+
+        data = self.fetch_chat_detail(instance_name, chat_id)
+        chat = data.get('chat') if isinstance(data, dict) else None
+        if not isinstance(chat, dict) or not isinstance(chat.get('messages'), list):
+            return None
+        return ChatDetail(data)
+
+    def _iter_chat_details(self, executor: ThreadPoolExecutor, max_workers: int, instance_name: str,
+                           chats: Iterable[Dict]) -> Iterator[Tuple[Dict, Optional[ChatDetail]]]:
+        """
+        Fetch chat details concurrently, yielding results in input order.
+
+        At most two requests per worker are in flight or buffered at any time,
+        so memory stays bounded regardless of how many chats a user has. If
+        the caller stops early, requests not yet sent are cancelled and
+        responses already fetched are released.
+
+        Args:
+            executor: Worker pool for this sync run
+            max_workers: Size of the worker pool
+            instance_name: Instance to fetch from
+            chats: Chat metadata dicts (must contain 'id')
+
+        Yields:
+            tuple: (chat, detail) where detail is a ChatDetail or
+                   StreamedChatDetail, or None if the fetch failed
+        """
+        window = max_workers * 2
+        pending = deque()
+        metrics = self._get_metrics(instance_name)
+
+        def next_result():
+            chat, future = pending.popleft()
+            with metrics.waiting('api'):
+                return chat, future.result()
+
+        def discard(future):
+            if not future.cancelled() and future.exception() is None:
+                close = getattr(future.result(), 'close', None)
+                if close:
+                    close()
+
+        try:
+            for chat in chats:
+                pending.append((chat, executor.submit(self._fetch_chat_detail_for_sync, instance_name, chat['id'])))
+                if len(pending) >= window:
+                    yield next_result()
+
+            while pending:
+                yield next_result()
+        finally:
+            for _, future in pending:
+                if not future.cancel():
+                    future.add_done_callback(discard)
+
     def fetch_users(self, instance_name: str) -> List[Dict]:
         """Fetch all users from instance."""
         data = self._fetch_api(instance_name, "/api/v1/users/all")
@@ -140,14 +360,240 @@ class SyncEngine:
     # SYNC OPERATIONS
     # ========================================================================
 
-    def sync_instance(self, instance_name: str, force_full: bool = False):
+    @staticmethod
+    def _timed_read(metrics: SyncMetrics, statement: str, func, *args):
+        """Call a DatabaseManager read, timing it as a statement and as DB wait."""
+        with metrics.waiting('db_read'), metrics.time_db(statement):
+            return func(*args)
+
+    def _store_chat_detail(self, batch: BatchWriter, chat_id: str, detail: ChatDetail,
+                           instance_id: int, sync_time: datetime,
+                           diff: bool = False) -> Tuple[int, str]:
+        """
+        Store the models, messages and files of a fetched chat.
+
+        Messages are handed to the batch writer one at a time as they are
+        read, so streamed chats are never held in memory as a whole.
+
+        With diff=True the chat is compared with what is already stored:
+        only new or edited messages (by message ID and content hash) are
+        written, and messages or models no longer in the chat are deleted.
+
+        Args:
+            batch: Batch writer for the current sync run
+            chat_id: Chat ID
+            detail: Fetched chat detail
+            instance_id: Instance database ID
+            sync_time: Current sync timestamp
+            diff: Write only what changed since the stored version
+
+        Returns:
+            tuple: (number of messages written, messages_hash of the chat)
+
+        Raises:
+            ChatStreamError: If a streamed response breaks off mid-chat
+        """
+        # Batches opened outside a sync run record into a detached SyncMetrics
+        metrics = batch.metrics or SyncMetrics('', 'none')
+        stored_messages = (
+            self._timed_read(metrics, 'message_fingerprints', self.db.get_message_fingerprints,
+                             chat_id, instance_id)
+            if diff else {}
+        )
+
+        # Store messages
+        written = 0
+        fingerprints = []
+        for message in detail.iter_messages():
+            fingerprint = message_fingerprint(message)
+            fingerprints.append((message['id'], fingerprint))
+            if stored_messages.get(message['id']) == fingerprint:
+                continue
+
+            batch.upsert_message(message, chat_id, instance_id, sync_time)
+            written += 1
+
+            # Store file attachments
+            for file_data in message.get('files', []):
+                if 'file' in file_data and file_data['file'].get('id'):
+                    batch.upsert_file(file_data, message['id'], instance_id, sync_time)
+
+        current_ids = {message_id for message_id, _ in fingerprints}
+        removed_ids = [message_id for message_id in stored_messages if message_id not in current_ids]
+        if removed_ids:
+            batch.delete_messages(removed_ids, instance_id)
+
+        # Store models (complete only once a streamed chat has been read)
+        stored_models = (
+            self._timed_read(metrics, 'chat_model_ids', self.db.get_chat_model_ids, chat_id, instance_id)
+            if diff else set()
+        )
+        for model_id in stored_models - set(detail.models):
+            batch.delete_chat_model(chat_id, instance_id, model_id)
+        for model_id in detail.models:
+            if model_id not in stored_models:
+                batch.upsert_chat_model(chat_id, instance_id, model_id, sync_time)
+
+        return written, messages_hash(fingerprints)
+
+    @staticmethod
+    def _is_unchanged(chat: Dict, state: Optional[tuple]) -> bool:
+        """
+        Check a chat from the API against its stored change-detection state.
+
+        Args:
+            chat: Chat summary from the API
+            state: (updated_at, messages_hash) from get_chat_states() or
+                   get_archived_chat_states(), None if not stored
+
+        Returns:
+            bool: True if the chat is stored with its messages (it has a
+                  messages_hash) and its updated_at is unchanged. Chats whose
+                  detail fetch failed are stored without a hash and are
+                  fetched again.
+        """
+        return (state is not None and state[1] is not None
+                and datetime.fromtimestamp(chat['updated_at']) == state[0])
+
+    @staticmethod
+    def _order_users(users: List[Dict], states: Dict[str, Dict], priority: bool) -> List[Dict]:
+        """
+        Order users for an incremental sync.
+
+        Without priority, users a time-budgeted run left unchecked (the
+        cursor) come first, oldest deferral first, then the rest in API
+        order. With priority:
+
+        1. Users who were active since their last check, or were never
+           checked, most recently active first
+        2. Deferred users, oldest deferral first
+        3. Everyone else, most frequently changing chats first
+
+        Args:
+            users: Users from the API
+            states: Stored user sync state (get_user_sync_states())
+            priority: Order by activity rather than API order
+
+        Returns:
+            list: The users in the order to check them
+        """
+        def is_deferred(user):
+            return bool(states.get(user['id'], {}).get('deferred_at'))
+
+        def is_active(user):
+            last_activity = states.get(user['id'], {}).get('activity_at')
+            return last_activity is None or (user_activity_at(user) or 0) > last_activity
+
+        deferred = sorted((u for u in users if is_deferred(u)), key=lambda u: states[u['id']]['deferred_at'])
+        if not priority:
+            return deferred + [u for u in users if not is_deferred(u)]
+
+        active = [u for u in users if is_active(u)]
+        active.sort(key=lambda u: user_activity_at(u) or 0, reverse=True)
+        deferred = [u for u in deferred if not is_active(u)]
+        rest = [u for u in users if not is_active(u) and not is_deferred(u)]
+        rest.sort(key=lambda u: (states[u['id']]['change_rate'] or 0, user_activity_at(u) or 0),
+                  reverse=True)
+        return active + deferred + rest
+
+    @staticmethod
+    def _activity_unchanged(user: Dict, state: Optional[Dict], checked_since: datetime) -> bool:
+        """
+        Check whether an incremental sync can skip a user's chat list.
+
+        Args:
+            user: User from the API
+            state: The user's stored sync state (get_user_sync_states()),
+                   None if never checked
+            checked_since: Only users checked at or after this time are skipped
+
+        Returns:
+            bool: True if the user's activity timestamp is the one seen at a
+                  recent check and no time-budgeted run left the user deferred
+        """
+        if not state or state['deferred_at'] or not state['checked_at']:
+            return False
+        activity = user_activity_at(user)
+        return (activity is not None and activity == state['activity_at']
+                and datetime.fromisoformat(state['checked_at']) >= checked_since)
+
+    def _restore_archived(self, instance_id: int, chats: List[Dict],
+                          archived_states: Dict[str, tuple], metrics: SyncMetrics) -> int:
+        """
+        Move the archived ones among chats about to be written back from
+        their archive, so their messages are diffed against the stored ones.
+
+        Args:
+            instance_id: Instance database ID
+            chats: Chats that will be fetched and written
+            archived_states: Archived chats of the user (get_archived_chat_states())
+            metrics: Metrics of the current run
+
+        Returns:
+            int: Number of chats restored
+        """
+        chat_ids = [chat['id'] for chat in chats if chat['id'] in archived_states]
+        if not chat_ids:
+            return 0
+        with metrics.waiting('db_write'), metrics.time_db('restore_archived'):
+            return self.db.restore_archived_chats(instance_id, chat_ids)
+
+    def _finish_metrics(self, metrics: SyncMetrics, sync_run_id: int, status: str,
+                        results: Dict[str, int] = None):
+        """
+        Store a finished run's metrics and write the Prometheus textfile.
+
+        Failures here are reported but never fail the sync itself.
+
+        Args:
+            metrics: Metrics of the run
+            sync_run_id: Sync run ID
+            status: 'success', 'partial' or 'failed'
+            results: Run totals for the textfile (users, chats, messages)
+        """
+        metrics.finish(status)
+        try:
+            self.db.save_sync_metrics(sync_run_id, metrics.rows())
+        except Exception as e:
+            print(f"  [WARN] Could not store sync metrics: {e}")
+
+        if METRICS_TEXTFILE_DIR:
+            try:
+                write_textfile(METRICS_TEXTFILE_DIR, metrics, results)
+            except OSError as e:
+                print(f"  [WARN] Could not write metrics textfile: {e}")
+
+    @staticmethod
+    def _print_timings(metrics: SyncMetrics):
+        """Print where a finished run spent its time (part of the summary)."""
+        phases = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in metrics.phases.items())
+        waits = metrics.waits
+        print(f"  Phases: {phases}")
+        print(f"  Waiting on: API {waits.get('api', 0):.1f}s, DB writes {waits.get('db_write', 0):.1f}s, "
+              f"DB reads {waits.get('db_read', 0):.1f}s")
+
+    def sync_instance(self, instance_name: str, force_full: bool = False, resume: bool = False,
+                      priority: bool = None, time_budget: float = None, reconcile: bool = False):
         """
         Sync an instance (auto-detect full vs incremental).
 
         Args:
             instance_name: Instance to sync
             force_full: Force full sync even if incremental is possible
+            resume: Continue an interrupted full sync if there is one
+            priority: Check the most active users first in incremental syncs
+                      (SYNC_PRIORITY if None)
+            time_budget: Seconds after which an incremental sync stops and
+                         leaves the remaining users for the next run
+                         (SYNC_TIME_BUDGET if None, 0 for no limit)
+            reconcile: List every user's chats in an incremental sync, even
+                       users whose activity has not moved
         """
+        if priority is None:
+            priority = SYNC_PRIORITY
+        if time_budget is None:
+            time_budget = SYNC_TIME_BUDGET
+
         # Ensure instance exists in database
         instance_config = INSTANCES.get(instance_name)
         if not instance_config:
@@ -161,119 +607,192 @@ class SyncEngine:
             instance_config['is_active']
         )
 
+        # Resume an interrupted full sync if requested
+        if resume:
+            resume_run_id = self.db.get_resumable_sync_run(instance_name)
+            if resume_run_id is not None:
+                self.full_sync(instance_name, instance_id, resume_run_id=resume_run_id)
+                return
+            print(f"[INFO] No interrupted full sync to resume for {instance_name}")
+
         # Determine sync type
         last_sync = self.db.get_last_sync_time(instance_id)
 
         if force_full or last_sync is None:
+            if time_budget:
+                print("[INFO] Time budget applies to incremental syncs only")
             self.full_sync(instance_name, instance_id)
         else:
-            self.incremental_sync(instance_name, instance_id)
+            self.incremental_sync(instance_name, instance_id, priority=priority,
+                                  time_budget=time_budget, reconcile=reconcile)
 
-    def full_sync(self, instance_name: str, instance_id: int):
+    def full_sync(self, instance_name: str, instance_id: int, resume_run_id: int = None):
         """
         Perform full synchronization of all data.
 
+        Progress is checkpointed per chat and per user in the same batches as
+        the synced rows, so an interrupted run can be continued with
+        resume_run_id without re-fetching chats it already stored.
+
         Args:
             instance_name: Instance to sync
             instance_id: Instance database ID
+            resume_run_id: Interrupted full sync run to continue
         """
         print(f"\n{'='*70}")
-        print(f"FULL SYNC: {instance_name.upper()}")
+        print(f"FULL SYNC: {instance_name.upper()}{' (RESUMED)' if resume_run_id else ''}")
         print(f"{'='*70}\n")
 
-        sync_run_id = self.db.start_sync_run(instance_name, 'full')
+        if resume_run_id:
+            sync_run_id = resume_run_id
+            self.db.resume_sync_run(sync_run_id)
+            checkpoint = self.db.get_sync_checkpoint(sync_run_id)
+            print(f"Resuming run #{sync_run_id}: {len(checkpoint['completed_users'])} users, "
+                  f"{checkpoint['chats_synced']} chats already synced\n")
+        else:
+            sync_run_id = self.db.start_sync_run(instance_name, 'full')
+            checkpoint = {'completed_users': set(), 'completed_chats': set(),
+                          'chats_synced': 0, 'messages_synced': 0}
         sync_time = datetime.now()
+        metrics = self._start_metrics(instance_name, 'full')
 
         try:
-            # 1. Sync models
-            print("Fetching models...")
-            models = self.fetch_models(instance_name)
-            for model in models:
-                self.db.upsert_model(model, instance_id, sync_time)
-            print(f"  [SUCCESS] Synced {len(models)} models")
-
-            # 2. Sync knowledge bases
-            print("Fetching knowledge bases...")
-            kbs = self.fetch_knowledge_bases(instance_name)
-            for kb in kbs:
-                self.db.upsert_knowledge_base(kb, instance_id, sync_time)
-            print(f"  [SUCCESS] Synced {len(kbs)} knowledge bases")
-
-            # 3. Sync users
-            print("Fetching users...")
-            users = self.fetch_users(instance_name)
-            for user in users:
-                self.db.upsert_user(user, instance_id, sync_time)
-            print(f"  [SUCCESS] Synced {len(users)} users")
-
-            # 4. Sync chats and messages
-            total_chats = 0
-            total_messages = 0
-
-            print(f"\nSyncing chats and messages for {len(users)} users...")
-            for i, user in enumerate(users, 1):
-                user_name = user.get('name', 'Unknown')
-                print(f"  [{i:3}/{len(users)}] {user_name}...", end="", flush=True)
-
-                chats = self.fetch_user_chats(instance_name, user['id'])
-                print(f" {len(chats)} chats", end="", flush=True)
-
-                for chat in chats:
-                    # Store chat metadata
-                    self.db.upsert_chat(chat, instance_id, user['id'], sync_time)
-                    total_chats += 1
-
-                    # Fetch full chat details
-                    chat_detail = self.fetch_chat_detail(instance_name, chat['id'])
-                    if not chat_detail or 'chat' not in chat_detail:
-                        continue
-
-                    chat_data = chat_detail['chat']
-
-                    # Store models
-                    models_list = chat_data.get('models', [])
-                    for model_id in models_list:
-                        self.db.upsert_chat_model(chat['id'], instance_id, model_id, sync_time)
-
-                    # Store messages
-                    messages = chat_data.get('messages', [])
-                    for message in messages:
-                        self.db.upsert_message(message, chat['id'], instance_id, sync_time)
-
-                        # Store file attachments
-                        for file_data in message.get('files', []):
-                            if 'file' in file_data and file_data['file'].get('id'):
-                                self.db.upsert_file(file_data, message['id'], instance_id, sync_time)
-
-                    total_messages += len(messages)
-
-                    time.sleep(API_DELAY)  # Rate limiting
-
-                print(f" ({total_messages} msgs)")
+            with self.db.batch(metrics=metrics) as batch:
+                # 1. Sync models
+                with metrics.phase('models'):
+                    print("Fetching models...")
+                    models = self.fetch_models(instance_name)
+                    for model in models:
+                        batch.upsert_model(model, instance_id, sync_time)
+                    print(f"  [SUCCESS] Synced {len(models)} models")
+
+                # 2. Sync knowledge bases
+                with metrics.phase('knowledge_bases'):
+                    print("Fetching knowledge bases...")
+                    kbs = self.fetch_knowledge_bases(instance_name)
+                    for kb in kbs:
+                        batch.upsert_knowledge_base(kb, instance_id, sync_time)
+                    print(f"  [SUCCESS] Synced {len(kbs)} knowledge bases")
+
+                # 3. Sync users
+                with metrics.phase('users'):
+                    print("Fetching users...")
+                    users = self.fetch_users(instance_name)
+                    for user in users:
+                        batch.upsert_user(user, instance_id, sync_time)
+                    print(f"  [SUCCESS] Synced {len(users)} users")
+
+                # 4. Sync chats and messages
+                total_chats = checkpoint['chats_synced']
+                total_messages = checkpoint['messages_synced']
+                chats_this_run = 0
+                max_workers = self._get_max_workers(instance_name)
+                chats_started = time.monotonic()
+
+                print(f"\nSyncing chats and messages for {len(users)} users ({max_workers} workers)...")
+                with metrics.phase('chats'), ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    for i, user in enumerate(users, 1):
+                        user_name = user.get('name', 'Unknown')
+                        if user['id'] in checkpoint['completed_users']:
+                            print(f"  [{i:3}/{len(users)}] {user_name}... already synced")
+                            continue
+
+                        chats = self.fetch_user_chats(instance_name, user['id'])
+
+                        # Archived chats are only refetched if they changed
+                        archived_states = self._timed_read(metrics, 'archived_chat_states',
+                                                           self.db.get_archived_chat_states,
+                                                           instance_id, user['id'])
+                        pending_chats = [
+                            c for c in chats
+                            if c['id'] not in checkpoint['completed_chats']
+                            and not self._is_unchanged(c, archived_states.get(c['id']))
+                        ]
+                        self._restore_archived(instance_id, pending_chats, archived_states, metrics)
+                        for chat, detail in self._iter_chat_details(executor, max_workers, instance_name, pending_chats):
+                            total_chats += 1
+                            chats_this_run += 1
+
+                            if detail is None:
+                                # Keep chat metadata even if details are unavailable
+                                batch.upsert_chat(chat, instance_id, user['id'], sync_time)
+                                continue
+
+                            try:
+                                message_count, chat_hash = self._store_chat_detail(
+                                    batch, chat['id'], detail, instance_id, sync_time
+                                )
+                            except ChatStreamError as e:
+                                metrics.count('stream_failures')
+                                print(f"\n  [WARN] Chat {chat['id']} stream failed: {e}")
+                                batch.upsert_chat(chat, instance_id, user['id'], sync_time)
+                                continue
+
+                            # Store chat metadata
+                            batch.upsert_chat(chat, instance_id, user['id'], sync_time, chat_hash)
+                            batch.checkpoint_chat(sync_run_id, chat['id'], message_count)
+                            total_messages += message_count
+
+                        batch.checkpoint_user(sync_run_id, user['id'])
+                        batch.update_user_sync_state(user, instance_id, sync_time)
+                        print(f"  [{i:3}/{len(users)}] {user_name}... {len(chats)} chats ({total_messages} msgs)")
+
+                    batch.flush()
+
+            chats_per_sec = chats_this_run / max(time.monotonic() - chats_started, 1e-6)
 
             # Mark sync as successful
-            self.db.complete_sync_run(sync_run_id, len(users), total_chats, total_messages)
-            self.db.update_instance_last_sync(instance_id, sync_time)
+            with metrics.phase('finalize'):
+                bytes_received = int(metrics.get_count('bytes_received'))
+                self.db.complete_sync_run(sync_run_id, len(users), total_chats, total_messages,
+                                          bytes_received)
+                self.db.update_instance_last_sync(instance_id, sync_time)
+                self.db.clear_sync_checkpoints(instance_name)
+            self._finish_metrics(metrics, sync_run_id, 'success',
+                                 {'users': len(users), 'chats': total_chats, 'messages': total_messages})
 
             print(f"\n{'='*70}")
             print(f"SYNC COMPLETE")
             print(f"  Users: {len(users)}")
             print(f"  Chats: {total_chats}")
             print(f"  Messages: {total_messages}")
+            print(f"  Throughput: {chats_per_sec:.1f} chats/sec")
+            print(f"  Received: {bytes_received / 1024:,.0f} KB")
+            self._print_timings(metrics)
             print(f"{'='*70}\n")
 
+        except KeyboardInterrupt:
+            self.db.fail_sync_run(sync_run_id, "Interrupted")
+            self._finish_metrics(metrics, sync_run_id, 'failed')
+            print(f"\n[WARN] Sync interrupted - continue with: sync {instance_name} --resume")
+            raise
         except Exception as e:
             self.db.fail_sync_run(sync_run_id, str(e))
+            self._finish_metrics(metrics, sync_run_id, 'failed')
             print(f"\n[ERROR] Sync failed: {e}")
+            print(f"[INFO] Continue with: sync {instance_name} --resume")
             raise
 
-    def incremental_sync(self, instance_name: str, instance_id: int):
+    def incremental_sync(self, instance_name: str, instance_id: int, priority: bool = False,
+                         time_budget: float = None, reconcile: bool = False):
         """
         Perform incremental synchronization (only changed data).
 
+        Users whose activity timestamp has not moved since a check within
+        SYNC_RECONCILE_HOURS are skipped without listing their chats (unless
+        SYNC_SKIP_INACTIVE_USERS is off or reconcile is set).
+
+        With a time budget the run stops between chats once the budget is
+        spent: everything fetched so far is stored, the users not checked yet
+        are recorded as deferred and the next run checks them first. Deleted
+        chats are then only detected among the users that were checked.
+
         Args:
             instance_name: Instance to sync
             instance_id: Instance database ID
+            priority: Check users with new activity first (see _order_users())
+            time_budget: Seconds before the run stops (None for no limit)
+            reconcile: List every user's chats, skipping no one
         """
         print(f"\n{'='*70}")
         print(f"INCREMENTAL SYNC: {instance_name.upper()}")
@@ -281,144 +800,260 @@ class SyncEngine:
 
         sync_run_id = self.db.start_sync_run(instance_name, 'incremental')
         sync_time = datetime.now()
+        metrics = self._start_metrics(instance_name, 'incremental')
+        deadline = time.monotonic() + time_budget if time_budget else None
+        checked_since = None
+        if SYNC_SKIP_INACTIVE_USERS and not reconcile:
+            checked_since = sync_time - timedelta(hours=SYNC_RECONCILE_HOURS)
         last_sync = self.db.get_last_sync_time(instance_id)
 
         print(f"Last sync: {last_sync.strftime('%Y-%m-%d %H:%M:%S') if last_sync else 'Never'}")
-        print(f"Sync time: {sync_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        print(f"Sync time: {sync_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        if time_budget:
+            print(f"Time budget: {time_budget:g}s")
+        print()
 
         try:
-            # 1. Quick sync models and KBs (small datasets)
-            print("Syncing models...")
-            models = self.fetch_models(instance_name)
-            for model in models:
-                self.db.upsert_model(model, instance_id, sync_time)
-            print(f"  [SUCCESS] {len(models)} models")
-
-            print("Syncing knowledge bases...")
-            kbs = self.fetch_knowledge_bases(instance_name)
-            for kb in kbs:
-                self.db.upsert_knowledge_base(kb, instance_id, sync_time)
-            print(f"  [SUCCESS] {len(kbs)} knowledge bases")
-
-            # 2. Check for new/changed users
-            print("\nChecking users...")
-            current_users = self.fetch_users(instance_name)
-            current_user_ids = {u['id'] for u in current_users}
-            db_user_ids = self.db.get_user_ids_for_instance(instance_id)
-
-            new_user_ids = current_user_ids - db_user_ids
-            deleted_user_ids = db_user_ids - current_user_ids
-
-            # Update all current users (in case name/email changed)
-            for user in current_users:
-                self.db.upsert_user(user, instance_id, sync_time)
-
-            # Mark deleted users
-            if deleted_user_ids:
-                self.db.mark_users_deleted(list(deleted_user_ids), instance_id)
-                print(f"  [WARN] {len(deleted_user_ids)} users marked as deleted")
-
-            print(f"  [SUCCESS] {len(current_users)} users checked")
-            if new_user_ids:
-                print(f"  + {len(new_user_ids)} new users")
-
-            # 3. Sync chats (check for updates using updated_at timestamp)
-            total_chats_updated = 0
-            total_messages_updated = 0
-            total_chats_checked = 0
-
-            print(f"\nChecking chats for {len(current_users)} users...")
-            for i, user in enumerate(current_users, 1):
-                user_name = user.get('name', 'Unknown')
-                user_id = user['id']
-
-                # For new users, do full chat sync
-                is_new_user = user_id in new_user_ids
-
-                chats = self.fetch_user_chats(instance_name, user_id)
-                chats_updated_count = 0
-
-                for chat in chats:
-                    total_chats_checked += 1
-                    chat_updated_at = datetime.fromtimestamp(chat['updated_at'])
-
-                    # Get existing chat from DB
-                    db_chat = self.db.get_chat(chat['id'], instance_id)
-
-                    # Check if chat is new or updated
-                    needs_update = (
-                        is_new_user or
-                        not db_chat or
-                        chat_updated_at > datetime.fromisoformat(db_chat['sync_datetime'])
+            with self.db.batch(metrics=metrics) as batch:
+                # 1. Quick sync models and KBs (small datasets)
+                with metrics.phase('models'):
+                    print("Syncing models...")
+                    models = self.fetch_models(instance_name)
+                    for model in models:
+                        batch.upsert_model(model, instance_id, sync_time)
+                    print(f"  [SUCCESS] {len(models)} models")
+
+                with metrics.phase('knowledge_bases'):
+                    print("Syncing knowledge bases...")
+                    kbs = self.fetch_knowledge_bases(instance_name)
+                    for kb in kbs:
+                        batch.upsert_knowledge_base(kb, instance_id, sync_time)
+                    print(f"  [SUCCESS] {len(kbs)} knowledge bases")
+
+                # 2. Check for new/changed users
+                with metrics.phase('users'):
+                    print("\nChecking users...")
+                    current_users = self.fetch_users(instance_name)
+                    current_user_ids = {u['id'] for u in current_users}
+                    db_user_ids = self._timed_read(metrics, 'user_ids', self.db.get_user_ids_for_instance,
+                                                   instance_id)
+
+                    new_user_ids = current_user_ids - db_user_ids
+                    deleted_user_ids = db_user_ids - current_user_ids
+
+                    # Update all current users (in case name/email changed)
+                    for user in current_users:
+                        batch.upsert_user(user, instance_id, sync_time)
+
+                    # Mark deleted users
+                    if deleted_user_ids:
+                        batch.mark_users_deleted(list(deleted_user_ids), instance_id)
+                        print(f"  [WARN] {len(deleted_user_ids)} users marked as deleted")
+
+                    print(f"  [SUCCESS] {len(current_users)} users checked")
+                    if new_user_ids:
+                        print(f"  + {len(new_user_ids)} new users")
+
+                    user_states = self._timed_read(metrics, 'user_sync_states', self.db.get_user_sync_states,
+                                                   instance_id)
+                    ordered_users = self._order_users(current_users, user_states, priority)
+
+                # 3. Sync chats (check for updates using updated_at timestamp)
+                total_chats_updated = 0
+                total_messages_updated = 0
+                total_chats_checked = 0
+                seen_chat_ids = set()
+                checked_user_ids = set()
+                checked_archived_ids = set()
+                deferred_users = []
+                skipped_users = 0
+
+                def can_skip(user):
+                    return checked_since is not None and self._activity_unchanged(
+                        user, user_states.get(user['id']), checked_since
                     )
 
-                    if needs_update:
-                        # Fetch full chat details
-                        chat_detail = self.fetch_chat_detail(instance_name, chat['id'])
-
-                        if chat_detail and 'chat' in chat_detail:
-                            # Update chat
-                            self.db.upsert_chat(chat, instance_id, user_id, sync_time)
-
-                            # Update models
-                            self.db.delete_chat_models(chat['id'], instance_id)
-                            for model_id in chat_detail['chat'].get('models', []):
-                                self.db.upsert_chat_model(chat['id'], instance_id, model_id, sync_time)
-
-                            # Update messages
-                            self.db.delete_messages_for_chat(chat['id'], instance_id)
-                            messages = chat_detail['chat'].get('messages', [])
-                            for message in messages:
-                                self.db.upsert_message(message, chat['id'], instance_id, sync_time)
-
-                                # Update files
-                                for file_data in message.get('files', []):
-                                    if 'file' in file_data and file_data['file'].get('id'):
-                                        self.db.upsert_file(file_data, message['id'], instance_id, sync_time)
-
-                            total_messages_updated += len(messages)
+                max_workers = self._get_max_workers(instance_name)
+                chats_started = time.monotonic()
+
+                print(f"\nChecking chats for {len(current_users)} users ({max_workers} workers)...")
+                with metrics.phase('chats'), ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    for i, user in enumerate(ordered_users, 1):
+                        user_name = user.get('name', 'Unknown')
+                        user_id = user['id']
+
+                        if deadline is not None and time.monotonic() >= deadline:
+                            # Users left unlisted are skipped or deferred, never
+                            # treated as listed when marking deleted chats
+                            remaining = ordered_users[i - 1:]
+                            deferred_users = [u for u in remaining if not can_skip(u)]
+                            skipped_users += len(remaining) - len(deferred_users)
+                            break
+
+                        # No activity since a recent check: nothing to list
+                        if can_skip(user):
+                            skipped_users += 1
+                            continue
+
+                        # For new users, do full chat sync
+                        is_new_user = user_id in new_user_ids
+
+                        chats = self.fetch_user_chats(instance_name, user_id)
+                        chats_updated_count = 0
+                        changed_chats = []
+
+                        # Load stored state for all of the user's chats in one query
+                        chat_states = self._timed_read(metrics, 'chat_states', self.db.get_chat_states,
+                                                       instance_id, user_id)
+                        archived_states = self._timed_read(metrics, 'archived_chat_states',
+                                                           self.db.get_archived_chat_states,
+                                                           instance_id, user_id)
+
+                        for chat in chats:
+                            total_chats_checked += 1
+                            seen_chat_ids.add(chat['id'])
+                            state = chat_states.get(chat['id']) or archived_states.get(chat['id'])
+
+                            # Check if chat is new or updated
+                            needs_update = is_new_user or not self._is_unchanged(chat, state)
+
+                            if needs_update:
+                                changed_chats.append(chat)
+
+                        if self._restore_archived(instance_id, changed_chats, archived_states, metrics):
+                            chat_states.update(archived_states)
+
+                        # Fetch full details for changed chats concurrently. The chat
+                        # row is queued after its messages so a crash mid-chat leaves
+                        # the old updated_at in place and the chat is refetched.
+                        details = self._iter_chat_details(executor, max_workers, instance_name, changed_chats)
+                        for chat, detail in details:
+                            if deadline is not None and time.monotonic() >= deadline:
+                                # Chats not stored yet keep their old updated_at, so
+                                # the next run refetches them
+                                if detail is not None and hasattr(detail, 'close'):
+                                    detail.close()
+                                details.close()
+                                remaining = ordered_users[i:]
+                                deferred_users = [user] + [u for u in remaining if not can_skip(u)]
+                                skipped_users += len(remaining) - (len(deferred_users) - 1)
+                                break
+
+                            if detail is None:
+                                continue
+
+                            # Skip message diffing if only chat metadata changed
+                            stored_hash = chat_states.get(chat['id'], (None, None))[1]
+                            new_hash = detail.messages_hash()
+                            if new_hash is None or new_hash != stored_hash:
+                                try:
+                                    written, new_hash = self._store_chat_detail(
+                                        batch, chat['id'], detail, instance_id, sync_time, diff=True
+                                    )
+                                except ChatStreamError as e:
+                                    metrics.count('stream_failures')
+                                    print(f"  [WARN] Chat {chat['id']} stream failed: {e}")
+                                    continue
+                                total_messages_updated += written
+
+                            batch.upsert_chat(chat, instance_id, user_id, sync_time, new_hash)
                             chats_updated_count += 1
 
-                        time.sleep(API_DELAY)
-                    else:
-                        # Chat hasn't changed, just touch it
-                        self.db.touch_chat(chat['id'], instance_id, sync_time)
+                        if chats_updated_count > 0:
+                            print(f"  [{i:3}/{len(current_users)}] {user_name}: {chats_updated_count}/{len(chats)} chats updated")
 
-                if chats_updated_count > 0:
-                    print(f"  [{i:3}/{len(current_users)}] {user_name}: {chats_updated_count}/{len(chats)} chats updated")
+                        total_chats_updated += chats_updated_count
+                        if deferred_users:
+                            break
 
-                total_chats_updated += chats_updated_count
+                        batch.update_user_sync_state(user, instance_id, sync_time, chats_updated_count)
+                        checked_user_ids.add(user_id)
+                        checked_archived_ids.update(archived_states)
 
-            # Mark stale chats as deleted (chats that weren't touched in this sync)
-            self.db.mark_stale_chats_deleted(instance_id, last_sync)
+                    batch.flush()
 
-            # Mark sync as successful
-            self.db.complete_sync_run(
-                sync_run_id,
-                len(current_users),
-                total_chats_updated,
-                total_messages_updated
-            )
-            self.db.update_instance_last_sync(instance_id, sync_time)
+            chats_per_sec = total_chats_updated / max(time.monotonic() - chats_started, 1e-6)
+            status = 'partial' if deferred_users else 'success'
+            users_checked = len(checked_user_ids)
+            all_listed = not deferred_users and not skipped_users
+
+            with metrics.phase('finalize'):
+                # Mark chats the API no longer returns as deleted. Archived ones are
+                # restored first so reports can take their activity out again. A
+                # run that skipped or deferred users only knows the chats of the
+                # users it checked (and that deleted users have none left).
+                if all_listed:
+                    unseen_archived = set(self.db.get_archived_chat_states(instance_id)) - seen_chat_ids
+                else:
+                    unseen_archived = checked_archived_ids - seen_chat_ids
+                    checked_user_ids |= deleted_user_ids
+                if unseen_archived:
+                    self.db.restore_archived_chats(instance_id, unseen_archived)
+                deleted_chats = self.db.mark_unseen_chats_deleted(
+                    instance_id, seen_chat_ids, None if all_listed else checked_user_ids
+                )
+                if deleted_chats:
+                    print(f"  [WARN] {deleted_chats} chats marked as deleted")
+
+                if skipped_users:
+                    metrics.count('skipped_users', amount=skipped_users)
+                if deferred_users:
+                    self.db.defer_users(instance_id, [u['id'] for u in deferred_users], sync_time)
+                    metrics.count('deferred_users', amount=len(deferred_users))
+
+                # Mark sync as successful
+                bytes_received = int(metrics.get_count('bytes_received'))
+                self.db.complete_sync_run(
+                    sync_run_id,
+                    users_checked,
+                    total_chats_updated,
+                    total_messages_updated,
+                    bytes_received,
+                    status
+                )
+                self.db.update_instance_last_sync(instance_id, sync_time)
+            self._finish_metrics(metrics, sync_run_id, status,
+                                 {'users': users_checked, 'chats': total_chats_updated,
+                                  'messages': total_messages_updated})
 
             print(f"\n{'='*70}")
-            print(f"SYNC COMPLETE")
+            if deferred_users:
+                print(f"SYNC STOPPED: time budget of {time_budget:g}s used")
+            else:
+                print(f"SYNC COMPLETE")
+            print(f"  Users checked: {users_checked}/{len(current_users)}")
+            if skipped_users:
+                print(f"  Users skipped (no activity since last check): {skipped_users}")
+            if deferred_users:
+                print(f"  Users deferred to the next run: {len(deferred_users)}")
             print(f"  Chats checked: {total_chats_checked}")
             print(f"  Chats updated: {total_chats_updated}")
             print(f"  Messages updated: {total_messages_updated}")
+            print(f"  Throughput: {chats_per_sec:.1f} chats/sec")
+            print(f"  Received: {bytes_received / 1024:,.0f} KB")
+            self._print_timings(metrics)
             print(f"{'='*70}\n")
 
         except Exception as e:
             self.db.fail_sync_run(sync_run_id, str(e))
+            self._finish_metrics(metrics, sync_run_id, 'failed')
             print(f"\n[ERROR] Sync failed: {e}")
             raise
 
-    def sync_all_instances(self, force_full: bool = False):
+    def sync_all_instances(self, force_full: bool = False, resume: bool = False,
+                           parallel: bool = True, priority: bool = None,
+                           time_budget: float = None, reconcile: bool = False):
         """
         Sync all active instances.
 
         Args:
             force_full: Force full sync for all instances
+            resume: Continue interrupted full syncs where there are any
+            parallel: Sync instances concurrently (writes go through one writer)
+            priority: Check the most active users first (see sync_instance())
+            time_budget: Per-instance incremental time budget in seconds
+                         (see sync_instance())
+            reconcile: List every user's chats (see sync_instance())
         """
         active_instances = [name for name, config in INSTANCES.items() if config.get('is_active', True)]
 
@@ -426,6 +1061,32 @@ class SyncEngine:
         print(f"SYNCING {len(active_instances)} INSTANCES")
         print(f"{'='*70}\n")
 
-        for instance_name in active_instances:
-            self.sync_instance(instance_name, force_full=force_full)
-            print()  # Blank line between instances
+        if not parallel or len(active_instances) < 2:
+            for instance_name in active_instances:
+                self.sync_instance(instance_name, force_full=force_full, resume=resume,
+                                   priority=priority, time_budget=time_budget, reconcile=reconcile)
+                print()  # Blank line between instances
+            return
+
+        # Instances are independent servers, so sync them concurrently and
+        # funnel every write through one writer thread.
+        errors = {}
+        with self.db.single_writer():
+            with ThreadPoolExecutor(max_workers=len(active_instances)) as executor:
+                futures = {
+                    executor.submit(self.sync_instance, instance_name,
+                                    force_full=force_full, resume=resume,
+                                    priority=priority, time_budget=time_budget,
+                                    reconcile=reconcile): instance_name
+                    for instance_name in active_instances
+                }
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors[futures[future]] = e
+
+        if errors:
+            failed = ', '.join(sorted(errors))
+            print(f"[ERROR] Sync failed for: {failed}")
+            raise next(iter(errors.values()))
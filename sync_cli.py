@@ -5,23 +5,68 @@ Provides commands for:
 - Syncing instances (full or incremental)
 - Generating reports from database
 - Checking sync status
+- Showing the timings and counters of a sync run
+- Searching synced messages and chat titles
 - Managing the sync schedule
+- Database maintenance (message compression, rollups, query plan checks)
+- Exporting tables to Parquet/Arrow for analysis
+- Archiving old chats to monthly databases and querying across them
+- Serving synthetic data from a local OpenWebUI stand-in
+- Benchmarking full and incremental syncs against it
 
 Usage:
     python sync_cli.py sync <instance>          # Sync specific instance
     python sync_cli.py sync --all               # Sync all instances
     python sync_cli.py sync --all --full        # Force full sync
+    python sync_cli.py sync <instance> --resume # Continue an interrupted full sync
+    python sync_cli.py sync --all --priority --time-budget 50m  # Most active users first, stop after 50 min
+    python sync_cli.py sync --all --reconcile   # Also list chats of users with no new activity
     python sync_cli.py report <instance>        # Generate report
+    python sync_cli.py report globalAI          # Generate combined report
     python sync_cli.py report --all             # Generate all reports
     python sync_cli.py status                   # Show sync status
+    python sync_cli.py metrics fasgpt           # Where the last fasgpt sync spent its time
+    python sync_cli.py metrics --run 42 --prometheus  # A run in Prometheus text format
+    python sync_cli.py search "depositions"     # Full-text search of messages
+    python sync_cli.py search "budget" --titles --instance fasgpt --since 2026-09-01
     python sync_cli.py schedule start           # Start sync scheduler
+    python sync_cli.py db stats                 # Show message storage and deduplication
+    python sync_cli.py db compress              # Compress existing messages
+    python sync_cli.py db benchmark-compression # Compare codecs on a sample
+    python sync_cli.py db rebuild-rollups       # Recompute daily usage rollups and counters
+    python sync_cli.py db check-plans           # Check query plans for full scans
+    python sync_cli.py export --format parquet  # Export changed rows to Parquet
+    python sync_cli.py export --full            # Re-export everything
+    python sync_cli.py archive run --dry-run    # Show chats older than ARCHIVE_AFTER_DAYS
+    python sync_cli.py archive run              # Move them to monthly archive databases
+    python sync_cli.py archive list             # List archives
+    python sync_cli.py archive query "SELECT COUNT(*) FROM all_messages" --since 2025-01
+    python sync_cli.py mock-server --users 1000 --chats 1000000 --messages 20000000
+    python sync_cli.py benchmark run            # Benchmark syncs at 10k, 100k and 1M messages
+    python sync_cli.py benchmark compare        # Compare the last two benchmark runs
 """
 
 import sys
+import time
+import sqlite3
 import argparse
 from datetime import datetime
-from openwebui_sync import DatabaseManager, SyncEngine
-from openwebui_sync.config import INSTANCES
+from openwebui_sync import DatabaseManager, SyncEngine, ReportGenerator
+from openwebui_sync.benchmark import BENCHMARK_SIZES, DEFAULT_SIZES
+from openwebui_sync.config import INSTANCES, ARCHIVE_AFTER_DAYS, MOCK_SERVER_PORT, SYNC_MAX_WORKERS
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration in seconds, optionally with an s/m/h suffix (argparse type)."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    number, unit = (value[:-1], value[-1].lower()) if value[-1:].lower() in units else (value, 's')
+    try:
+        seconds = float(number) * units[unit]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value!r}")
+    if seconds < 0:
+        raise argparse.ArgumentTypeError(f"duration must not be negative: {value!r}")
+    return seconds
 
 
 def sync_command(args):
@@ -32,24 +77,50 @@ def sync_command(args):
         print("\n" + "="*70)
         print(f"{'SYNCING ALL INSTANCES':^70}")
         print("="*70 + "\n")
-        engine.sync_all_instances(force_full=args.full)
+        engine.sync_all_instances(force_full=args.full, resume=args.resume,
+                                  priority=args.priority, time_budget=args.time_budget,
+                                  reconcile=args.reconcile)
     else:
         if args.instance not in INSTANCES:
             print(f"[ERROR] Unknown instance: {args.instance}")
             print(f"Available instances: {', '.join(INSTANCES.keys())}")
             return 1
 
-        engine.sync_instance(args.instance, force_full=args.full)
+        engine.sync_instance(args.instance, force_full=args.full, resume=args.resume,
+                             priority=args.priority, time_budget=args.time_budget,
+                             reconcile=args.reconcile)
 
     return 0
 
 
 def report_command(args):
     """Execute report command."""
-    print("[INFO] DB-based report generation coming soon!")
-    print("[INFO] For now, use the existing ai_usage_analyzer.py")
-    print("[INFO] Once synced, reports will be generated instantly from the database.")
-    return 0
+    generator = ReportGenerator(include_azure_costs=not args.skip_azure)
+
+    if args.all:
+        print("\n" + "="*70)
+        print(f"{'GENERATING ALL REPORTS':^70}")
+        print("="*70 + "\n")
+        started = time.perf_counter()
+        failed = [name for name in INSTANCES if not generator.generate_instance_report(name)]
+        if not generator.generate_global_report():
+            failed.append('globalAI')
+        print(f"\n[INFO] All reports finished in {time.perf_counter() - started:.2f}s")
+        return 1 if failed else 0
+
+    if not args.instance:
+        print("[ERROR] Specify an instance or --all")
+        return 1
+
+    if args.instance.lower() == 'globalai':
+        return 0 if generator.generate_global_report() else 1
+
+    if args.instance not in INSTANCES:
+        print(f"[ERROR] Unknown instance: {args.instance}")
+        print(f"Available instances: {', '.join(INSTANCES.keys())}, globalAI")
+        return 1
+
+    return 0 if generator.generate_instance_report(args.instance) else 1
 
 
 def status_command(args):
@@ -63,17 +134,7 @@ def status_command(args):
     with db.get_connection() as conn:
         # Get last sync for each instance
         for instance_name in INSTANCES.keys():
-            cursor = conn.execute("""
-                SELECT
-                    last_sync_at,
-                    (SELECT COUNT(*) FROM users WHERE instance_id = i.id AND is_deleted = 0) as user_count,
-                    (SELECT COUNT(*) FROM chats WHERE instance_id = i.id AND is_deleted = 0) as chat_count,
-                    (SELECT COUNT(*) FROM messages WHERE instance_id = i.id) as message_count
-                FROM instances i
-                WHERE name = ?
-            """, (instance_name,))
-
-            row = cursor.fetchone()
+            row = db.get_instance_summary(instance_name)
 
             if row and row['last_sync_at']:
                 last_sync = datetime.fromisoformat(row['last_sync_at'])
@@ -82,6 +143,9 @@ def status_command(args):
                 print(f"  Users: {row['user_count']:,}")
                 print(f"  Chats: {row['chat_count']:,}")
                 print(f"  Messages: {row['message_count']:,}")
+                if row['archived_chat_count']:
+                    print(f"  Archived: {row['archived_chat_count']:,} chats, "
+                          f"{row['archived_message_count']:,} messages")
             else:
                 print(f"{instance_name.upper()}: Never synced")
             print()
@@ -91,7 +155,7 @@ def status_command(args):
         print("-" * 70)
 
         cursor = conn.execute("""
-            SELECT instance_name, sync_type, started_at, completed_at, status,
+            SELECT id, instance_name, sync_type, started_at, completed_at, status,
                    users_synced, chats_synced, messages_synced
             FROM sync_runs
             ORDER BY started_at DESC
@@ -99,7 +163,7 @@ def status_command(args):
         """)
 
         for row in cursor.fetchall():
-            status_icon = "[OK]" if row['status'] == 'success' else "[FAIL]"
+            status_icon = {'success': "[OK]", 'partial': "[PART]"}.get(row['status'], "[FAIL]")
             started = datetime.fromisoformat(row['started_at'])
             completed = datetime.fromisoformat(row['completed_at']) if row['completed_at'] else None
 
@@ -108,7 +172,7 @@ def status_command(args):
                 delta = completed - started
                 duration = f"({delta.total_seconds():.1f}s)"
 
-            print(f"{status_icon} {row['instance_name']:<15} {row['sync_type']:<12} "
+            print(f"{status_icon} #{row['id']:<5} {row['instance_name']:<15} {row['sync_type']:<12} "
                   f"{started.strftime('%Y-%m-%d %H:%M')} {duration:<10} "
                   f"U:{row['users_synced']} C:{row['chats_synced']} M:{row['messages_synced']}")
 
@@ -116,6 +180,99 @@ def status_command(args):
     return 0
 
 
+def metrics_command(args):
+    """Show the phase timings, request latencies, DB time and counters of a sync run."""
+    from openwebui_sync.metrics import SyncMetrics
+
+    db = DatabaseManager()
+    run = db.get_sync_run(args.run, args.instance)
+    if run is None:
+        print("[ERROR] No matching sync run")
+        return 1
+
+    metrics = SyncMetrics.from_rows(run['instance_name'], run['sync_type'], db.get_sync_metrics(run['id']))
+    if not metrics.phases and not metrics.requests:
+        print(f"[ERROR] Sync run #{run['id']} has no metrics (it predates them)")
+        return 1
+
+    started = datetime.fromisoformat(run['started_at'])
+    completed = datetime.fromisoformat(run['completed_at']) if run['completed_at'] else None
+    metrics.started_at = started.timestamp()
+    metrics.finished_at = completed.timestamp() if completed else None
+    metrics.status = run['status']
+
+    if args.prometheus:
+        print(metrics.to_prometheus({'users': run['users_synced'], 'chats': run['chats_synced'],
+                                     'messages': run['messages_synced']}), end='')
+        return 0
+
+    print("\n" + "="*70)
+    print(f"SYNC RUN #{run['id']}: {run['instance_name'].upper()} ({run['sync_type']}, {run['status']})")
+    print("="*70)
+    print(f"  Started:  {started.strftime('%Y-%m-%d %H:%M:%S')}   Duration: {metrics.duration:.1f}s")
+    print(f"  Synced:   {run['users_synced']:,} users, {run['chats_synced']:,} chats, "
+          f"{run['messages_synced']:,} messages, {(run['bytes_received'] or 0) / 1024**2:,.1f} MB")
+
+    print("\nPhases:")
+    for name, seconds in metrics.phases.items():
+        print(f"  {name:<18} {seconds:>9.2f}s")
+    print("\nSync loop waiting on:")
+    for kind, label in (('api', 'API'), ('db_write', 'DB writes'), ('db_read', 'DB reads')):
+        print(f"  {label:<18} {metrics.waits.get(kind, 0):>9.2f}s")
+
+    def show_histograms(title, histograms):
+        print(f"\n{title:<24} {'Count':>9} {'Total':>10} {'Avg':>9} {'p50':>9} {'p95':>9}")
+        for name, h in sorted(histograms.items(), key=lambda item: -item[1].sum):
+            print(f"  {name:<22} {h.count:>9,} {h.sum:>9.2f}s {h.sum / h.count * 1000:>7.1f}ms "
+                  f"{h.quantile(0.5) * 1000:>7.1f}ms {h.quantile(0.95) * 1000:>7.1f}ms")
+
+    show_histograms("API requests", metrics.requests)
+    show_histograms("DB statements", metrics.db)
+
+    if metrics.counters:
+        print("\nCounters:")
+        for (name, label), value in sorted(metrics.counters.items()):
+            name = f"{name}[{label}]" if label else name
+            print(f"  {name:<30} {value:>12,.0f}")
+    print()
+    return 0
+
+
+def search_command(args):
+    """Full-text search over synced messages or chat titles."""
+    db = DatabaseManager()
+
+    if not db.search_available:
+        print("[ERROR] Full-text search requires SQLite with FTS5")
+        return 1
+
+    if args.instance and args.instance not in INSTANCES:
+        print(f"[ERROR] Unknown instance: {args.instance}")
+        print(f"Available instances: {', '.join(INSTANCES.keys())}")
+        return 1
+
+    started = time.perf_counter()
+    if args.titles:
+        results = db.search_chat_titles(args.query, args.instance, args.since, args.limit)
+    else:
+        results = db.search_messages(args.query, args.instance, args.since, args.role, args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"\n{len(results)} results for '{args.query}' ({elapsed_ms:.0f} ms)")
+    print("-" * 70)
+
+    for rank, result in enumerate(results, 1):
+        updated = result['chat_updated_at'][:10] if result['chat_updated_at'] else '?'
+        user = result['user_name'] or result['user_email'] or 'Unknown'
+        print(f"{rank:3}. [{result['instance']}] {updated}  {user}  -  {result['chat_title'] or '(untitled)'}")
+        if not args.titles:
+            print(f"     {result['role']}: {result['snippet']}")
+        print(f"     chat {result['chat_id']}")
+
+    print()
+    return 0
+
+
 def schedule_command(args):
     """Manage sync scheduler."""
     if args.action == 'start':
@@ -130,6 +287,376 @@ def schedule_command(args):
     return 0
 
 
+def export_command(args):
+    """Export tables to partitioned Parquet or Arrow files."""
+    from openwebui_sync.exporter import DataExporter, EXPORT_TABLES, export_available
+
+    if not export_available():
+        print("[ERROR] Export requires the pyarrow package: pip install pyarrow")
+        return 1
+
+    unknown = [t for t in args.tables or [] if t not in EXPORT_TABLES]
+    if unknown:
+        print(f"[ERROR] Unknown table: {', '.join(unknown)}")
+        print(f"Available tables: {', '.join(EXPORT_TABLES)}")
+        return 1
+
+    exporter = DataExporter(output_dir=args.output, file_format=args.format,
+                            include_content=not args.no_content)
+
+    print("\n" + "="*70)
+    print(f"{'EXPORT TO ' + args.format.upper():^70}")
+    print("="*70)
+    print(f"Output: {exporter.output_dir}\n")
+
+    started = time.perf_counter()
+    for result in exporter.export(tables=args.tables, full=args.full):
+        print(f"  {result['table']:<16} {result['mode']:<12} {result['rows']:>10,} rows "
+              f"{result['files']:>5} files {result['seconds']:>7.1f}s")
+
+    print(f"\n[SUCCESS] Export finished in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def check_plans_command(args):
+    """Check report/status query plans for full table scans and time them."""
+    import shutil
+    import tempfile
+    from openwebui_sync.query_plans import build_synthetic_database, check_query_plans
+
+    temp_dir = None
+    if args.synthetic:
+        temp_dir = tempfile.mkdtemp(prefix='openwebui_sync_plans_')
+        print(f"[INFO] Building synthetic database ({args.synthetic:,} messages)...")
+        started = time.perf_counter()
+        db = build_synthetic_database(f"{temp_dir}/synthetic.db", messages=args.synthetic)
+        print(f"[INFO] Built in {time.perf_counter() - started:.1f}s")
+    else:
+        db = DatabaseManager()
+
+    try:
+        results = check_query_plans(db, instance_name=args.instance)
+    finally:
+        db.close()
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if not results:
+        print("[ERROR] No synced chats to check - sync first or use --synthetic")
+        return 1
+
+    print(f"\nQuery plans ({db.db_path if not temp_dir else 'synthetic database'})")
+    print("-" * 70)
+    failures = []
+    for result in results:
+        statements = result['statements']
+        slowest = max((s['seconds'] for s in statements), default=0)
+        scans = [s for s in statements if s['full_scans']]
+        status = "[FAIL]" if scans else "[OK]"
+        print(f"{status:<7}{result['instance']:<14} {result['workload']:<24} "
+              f"{result['seconds'] * 1000:>9.1f}ms {len(statements):>4} queries "
+              f"(slowest {slowest * 1000:.1f}ms)")
+        failures += [(result, s) for s in scans]
+
+    for result, statement in failures:
+        print(f"\n[ERROR] Full table scan in {result['workload']} ({result['instance']}):")
+        for detail in statement['full_scans']:
+            print(f"  {detail}")
+        print("  " + " ".join(statement['sql'].split())[:300])
+
+    if failures:
+        print(f"\n[ERROR] {len(failures)} queries scan a large table - check the indexes in database.py")
+        return 1
+
+    print("\n[SUCCESS] No full scans of large tables")
+    return 0
+
+
+def archive_command(args):
+    """Move old chats to monthly archive databases, list them or query across them."""
+    db = DatabaseManager()
+
+    if args.action == 'run':
+        instance_id = None
+        if args.instance:
+            instance_id = db.get_instance_id(args.instance)
+            if instance_id is None:
+                print(f"[ERROR] Unknown instance: {args.instance}")
+                return 1
+
+        days = args.older_than if args.older_than is not None else ARCHIVE_AFTER_DAYS
+        print(f"[INFO] {'Finding' if args.dry_run else 'Archiving'} chats with no activity "
+              f"in the last {days} days...")
+        results = db.archive_chats(days, instance_id, dry_run=args.dry_run)
+        if not results:
+            print("[INFO] Nothing to archive")
+            return 0
+
+        print(f"\n{'Month':<10} {'Chats':>10} {'Messages':>12}")
+        print("-" * 34)
+        for result in results:
+            print(f"{result['month']:<10} {result['chats']:>10,} {result['messages']:>12,}")
+
+        total = sum(r['chats'] for r in results)
+        if args.dry_run:
+            print(f"\n[INFO] {total:,} chats would be archived - run without --dry-run to move them")
+        else:
+            print(f"\n[SUCCESS] Archived {total:,} chats to {db.archive_dir}")
+            if args.vacuum:
+                print("[INFO] Vacuuming database...")
+                db.vacuum()
+            else:
+                print("[INFO] Run with --vacuum to shrink the main database file")
+        return 0
+
+    if args.action == 'list':
+        archives = db.list_archives()
+        if not archives:
+            print(f"[INFO] No archives in {db.archive_dir}")
+            return 0
+
+        print(f"\nArchives in {db.archive_dir}")
+        print("-" * 70)
+        for entry in archives:
+            print(f"  {entry['month']:<10} {entry['chats']:>10,} chats {entry['messages']:>12,} messages "
+                  f"{entry['size_bytes'] / 1024**2:>10.1f} MB")
+        print()
+        return 0
+
+    if args.action == 'query':
+        if not args.sql:
+            print("[ERROR] query needs an SQL statement")
+            return 1
+
+        try:
+            with db.attach_archives(args.since, args.until) as conn:
+                cursor = conn.execute(args.sql)
+                columns = [c[0] for c in cursor.description or []]
+                rows = cursor.fetchmany(args.limit)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"[ERROR] {e}")
+            return 1
+
+        print("	".join(columns))
+        for row in rows:
+            print("	".join("" if value is None else str(value) for value in row))
+        return 0
+
+    return 0
+
+
+def mock_server_command(args):
+    """Serve a synthetic dataset through a local OpenWebUI stand-in."""
+    from openwebui_sync.mock_server import FaultConfig, MockOpenWebUIServer, SyntheticDataset
+
+    dataset = SyntheticDataset(users=args.users, chats=args.chats, messages=args.messages,
+                               seed=args.seed, end_time=args.end_time)
+    faults = FaultConfig(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                         error_rate=args.error_rate, disconnect_rate=args.disconnect_rate,
+                         seed=args.seed)
+    server = MockOpenWebUIServer(dataset, faults, host=args.host, port=args.port)
+
+    print("\n" + "="*70)
+    print(f"{'MOCK OPENWEBUI SERVER':^70}")
+    print("="*70)
+    print(f"  URL:      {server.url}")
+    print(f"  Data:     {args.users:,} users, {args.chats:,} chats, ~{args.messages:,} messages "
+          f"(seed {args.seed}, end time {dataset.end_time})")
+    print(f"  Faults:   latency {args.latency * 1000:.0f}ms (+{args.jitter * 1000:.0f}ms jitter), "
+          f"429s {args.rate_429:.1%}, errors {args.error_rate:.1%}, "
+          f"disconnects {args.disconnect_rate:.1%}")
+    print("\nTo sync it, add to INSTANCES in openwebui_sync/config.py:")
+    print(f'    "mock": {{"url": "{server.url}", "api_key": "mock", "is_active": False}}')
+    print("then run: python sync_cli.py sync mock --full")
+    print("\nPress Ctrl+C to stop\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+    stats = server.stats()
+    requests_served = sum(stats.get(k, 0) for k in ('users', 'chat_list', 'chat', 'models', 'knowledge'))
+    print(f"\n[INFO] Served {requests_served:,} requests, {stats.get('bytes_sent', 0) / 1024**2:,.1f} MB")
+    return 0
+
+
+def benchmark_command(args):
+    """Benchmark syncs against the local mock server, or compare saved runs."""
+    from openwebui_sync.benchmark import (
+        compare_results, list_results, load_results, run_benchmarks, save_results
+    )
+
+    if args.action == 'run':
+        print(f"[INFO] Benchmarking {', '.join(args.sizes)} ({args.workers} workers, rate limiter "
+              f"{'on' if args.throttled else 'off'}, latency {args.latency * 1000:.0f}ms)")
+        print(f"\n{'Size':<6} {'Phase':<12} {'Time':>8} {'Chats/s':>9} {'Msgs/s':>9} "
+              f"{'DB write':>9} {'API wait':>9} {'Peak RSS':>9}")
+        print("-" * 78)
+
+        def show(result):
+            rss = f"{result['peak_rss_mb']:.0f}MB" if result['peak_rss_mb'] is not None else "n/a"
+            print(f"{result['size']:<6} {result['phase']:<12} {result['seconds']:>7.1f}s "
+                  f"{result['chats_per_sec']:>9,.0f} {result['messages_per_sec']:>9,.0f} "
+                  f"{result['db_write_seconds']:>8.1f}s {result['api_wait_seconds']:>8.1f}s {rss:>9}")
+
+        try:
+            run = run_benchmarks(args.sizes, workers=args.workers, throttled=args.throttled,
+                                 latency=args.latency, changed_fraction=args.changed,
+                                 seed=args.seed, verbose=args.verbose, on_result=show)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return 1
+
+        path = save_results(run, args.output)
+        print(f"\n[SUCCESS] Results saved to {path}")
+        return 0
+
+    if args.action == 'compare':
+        if args.files:
+            if len(args.files) != 2:
+                print("[ERROR] compare needs two result files (or none for the last two runs)")
+                return 1
+            paths = args.files
+        else:
+            # The latest run against the latest earlier one with a size in common
+            saved = list_results(args.output)
+            if len(saved) < 2:
+                print("[ERROR] Need two saved runs to compare - run: benchmark run")
+                return 1
+            latest = load_results(saved[-1])
+            sizes = {r['size'] for r in latest['results']}
+            paths = [saved[-2], saved[-1]]
+            for path in reversed(saved[:-1]):
+                if sizes & {r['size'] for r in load_results(path)['results']}:
+                    paths = [path, saved[-1]]
+                    break
+
+        baseline, current = load_results(paths[0]), load_results(paths[1])
+        print(f"\nBaseline: {paths[0]} ({baseline.get('git_commit') or 'unknown commit'})")
+        print(f"Current:  {paths[1]} ({current.get('git_commit') or 'unknown commit'})")
+        if baseline['settings'] != current['settings']:
+            print("[WARN] The runs used different settings - differences may not be due to code changes")
+
+        comparison = compare_results(baseline, current)
+        if not comparison:
+            print("[ERROR] The runs have no size and phase in common")
+            return 1
+
+        print(f"\n{'Size':<6} {'Phase':<12} {'Metric':<18} {'Before':>10} {'After':>10} {'Change':>8}")
+        print("-" * 78)
+        for row in comparison:
+            change = f"{row['change']:+.1%}" if row['change'] is not None else "n/a"
+            print(f"{row['size']:<6} {row['phase']:<12} {row['metric']:<18} "
+                  f"{row['before']:>10,.2f} {row['after']:>10,.2f} {change:>8} {row['verdict']}")
+
+        worse = [row for row in comparison if row['verdict'] == 'worse']
+        if worse:
+            print(f"\n[WARN] {len(worse)} metrics got worse")
+        return 0
+
+    return 0
+
+
+def db_command(args):
+    """Database maintenance: message compression, usage rollups and query plans."""
+    from openwebui_sync.compression import (
+        ContentCodec, benchmark_compression, train_dictionary, zstd_available, CODEC_ZSTD
+    )
+
+    if args.action == 'check-plans':
+        return check_plans_command(args)
+
+    db = DatabaseManager()
+
+    if args.action == 'stats':
+        dedup = db.get_dedup_stats()
+        print("\nMessage bodies:")
+        print("-" * 70)
+        print(f"  Messages:        {dedup['messages']:>10,} ({dedup['message_chars'] / 1024**2:,.1f} MB text)")
+        print(f"  Distinct bodies: {dedup['bodies']:>10,} ({dedup['body_chars'] / 1024**2:,.1f} MB text)")
+        if dedup['body_chars']:
+            print(f"  Deduplication:   {dedup['message_chars'] / dedup['body_chars']:>10.2f}x")
+
+        print("\nBody storage by codec:")
+        print("-" * 70)
+        for row in db.get_content_storage_stats():
+            print(f"  {row['codec']:<12} {row['bodies']:>10,} bodies "
+                  f"{row['content_chars'] / 1024**2:>10.1f} MB text "
+                  f"{row['stored_bytes'] / 1024**2:>10.1f} MB stored")
+        print()
+        return 0
+
+    if args.action == 'rebuild-rollups':
+        db.rebuild_rollups()
+        db.rebuild_instance_stats()
+        print("[SUCCESS] Daily usage rollups and instance counters rebuilt")
+        return 0
+
+    if args.codec == CODEC_ZSTD and not zstd_available():
+        print("[ERROR] zstd requires the zstandard package (pip install zstandard)")
+        return 1
+
+    if args.action == 'compress':
+        if args.train_dict:
+            if args.codec != CODEC_ZSTD:
+                print("[ERROR] --train-dict requires --codec zstd")
+                return 1
+            samples = db.sample_message_contents(args.sample, min_length=64)
+            dict_id = db.save_compression_dictionary(train_dictionary(samples))
+            print(f"[INFO] Trained dictionary {dict_id} on {len(samples):,} messages")
+
+        codec = db.load_codec(None if args.codec == 'none' else args.codec)
+        print(f"[INFO] Converting message content to {codec.name or 'plain text'}...")
+        stats = db.recompress_messages(codec)
+        print(f"[SUCCESS] Converted {stats['bodies_converted']:,} message bodies: "
+              f"{stats['bytes_before'] / 1024**2:.1f} MB -> {stats['bytes_after'] / 1024**2:.1f} MB")
+
+        if args.vacuum:
+            print("[INFO] Vacuuming database...")
+            db.vacuum()
+        else:
+            print("[INFO] Run with --vacuum to shrink the database file")
+
+        if (codec.codec or 'none') != (db.codec.codec or 'none'):
+            print(f"[INFO] New messages still use MESSAGE_COMPRESSION = {db.codec.codec!r} (config.py)")
+        return 0
+
+    if args.action == 'benchmark-compression':
+        samples = db.sample_message_contents(args.sample)
+        if not samples:
+            print("[ERROR] No messages in database - sync first")
+            return 1
+
+        codecs = [ContentCodec(None), ContentCodec('zlib')]
+        if zstd_available():
+            codecs.append(ContentCodec(CODEC_ZSTD))
+            dictionary = train_dictionary(samples)
+            codecs.append(ContentCodec(CODEC_ZSTD, dictionaries={0: dictionary}, dict_id=0))
+
+        print(f"\nCompression benchmark ({len(samples):,} messages)")
+        print("-" * 70)
+        print(f"  {'Codec':<10} {'Content':>12} {'DB size':>12} {'Ratio':>7} {'Encode':>10} {'Read':>10}")
+        results = benchmark_compression(samples, codecs)
+        baseline = results[0]
+        for result in results:
+            ratio = baseline['db_bytes'] / result['db_bytes']
+            print(f"  {result['codec']:<10} "
+                  f"{result['content_bytes'] / 1024:>10,.0f}KB "
+                  f"{result['db_bytes'] / 1024:>10,.0f}KB "
+                  f"{ratio:>6.2f}x "
+                  f"{result['encode_seconds'] * 1000:>8.1f}ms "
+                  f"{result['read_seconds'] * 1000:>8.1f}ms")
+        if not zstd_available():
+            print("  (install zstandard to include zstd and trained-dictionary results)")
+        print()
+        return 0
+
+    return 0
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -144,19 +671,130 @@ def main():
     sync_parser.add_argument('instance', nargs='?', help='Instance name (fasgpt, resgpt, berkshiregpt)')
     sync_parser.add_argument('--all', action='store_true', help='Sync all instances')
     sync_parser.add_argument('--full', action='store_true', help='Force full sync')
+    sync_parser.add_argument('--resume', action='store_true',
+                             help='Continue an interrupted full sync from its last checkpoint')
+    sync_parser.add_argument('--priority', action='store_true', default=None,
+                             help='Check users with recent activity first (incremental syncs)')
+    sync_parser.add_argument('--time-budget', type=parse_duration, metavar='DURATION',
+                             help='Stop an incremental sync after this long (e.g. 900, 15m, 1h) '
+                                  'and continue with the remaining users next run; 0 for no limit')
+    sync_parser.add_argument('--reconcile', action='store_true',
+                             help="List every user's chats, including users with no activity "
+                                  "since their last check")
 
     # Report command
     report_parser = subparsers.add_parser('report', help='Generate analytics report')
-    report_parser.add_argument('instance', nargs='?', help='Instance name or --all')
+    report_parser.add_argument('instance', nargs='?', help='Instance name, globalAI, or --all')
     report_parser.add_argument('--all', action='store_true', help='Generate all reports')
+    report_parser.add_argument('--skip-azure', action='store_true', help='Skip Azure cost data (offline mode)')
 
     # Status command
     status_parser = subparsers.add_parser('status', help='Show sync status')
 
+    # Metrics command
+    metrics_parser = subparsers.add_parser('metrics', help='Show where a sync run spent its time')
+    metrics_parser.add_argument('instance', nargs='?', help='Latest run of this instance (default: latest run)')
+    metrics_parser.add_argument('--run', type=int, help='Sync run ID (see status)')
+    metrics_parser.add_argument('--prometheus', action='store_true',
+                                help='Print the run in Prometheus text format')
+
+    # Search command
+    search_parser = subparsers.add_parser('search', help='Full-text search of synced conversations')
+    search_parser.add_argument('query', help='Words to search for (all must match; word* for prefixes)')
+    search_parser.add_argument('--instance', help='Only search this instance')
+    search_parser.add_argument('--since', help='Only chats updated on or after this date (YYYY-MM-DD)')
+    search_parser.add_argument('--role', choices=['user', 'assistant'], help='Only messages with this role')
+    search_parser.add_argument('--titles', action='store_true', help='Search chat titles instead of messages')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20)')
+
     # Schedule command
     schedule_parser = subparsers.add_parser('schedule', help='Manage sync scheduler')
     schedule_parser.add_argument('action', choices=['start', 'stop', 'status'], help='Scheduler action')
 
+    # Export command
+    export_parser = subparsers.add_parser('export', help='Export tables to Parquet/Arrow files')
+    export_parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet',
+                               help='File format (default: parquet)')
+    export_parser.add_argument('--full', action='store_true',
+                               help='Re-export all rows instead of rows changed since the last export')
+    export_parser.add_argument('--tables', nargs='+', help='Only export these tables')
+    export_parser.add_argument('--output', help='Export directory (default: output/export)')
+    export_parser.add_argument('--no-content', action='store_true',
+                               help='Leave message bodies out of the messages export')
+
+    # Database maintenance command
+    db_parser = subparsers.add_parser('db', help='Database maintenance')
+    db_parser.add_argument('action', choices=['stats', 'compress', 'benchmark-compression', 'rebuild-rollups',
+                                              'check-plans'],
+                           help='Maintenance action')
+    db_parser.add_argument('--codec', choices=['zlib', 'zstd', 'none'], default='zlib',
+                           help='Target codec for compress (default: zlib)')
+    db_parser.add_argument('--train-dict', action='store_true',
+                           help='Train a zstd dictionary on stored messages before compressing')
+    db_parser.add_argument('--sample', type=int, default=5000,
+                           help='Messages sampled for dictionary training and benchmarks')
+    db_parser.add_argument('--vacuum', action='store_true',
+                           help='Shrink the database file after compressing')
+    db_parser.add_argument('--synthetic', type=int, nargs='?', const=100000, metavar='MESSAGES',
+                           help='check-plans: use a temporary synthetic database (default: 100,000 messages)')
+    db_parser.add_argument('--instance', help='check-plans: only check this instance')
+
+    # Archive command
+    archive_parser = subparsers.add_parser('archive', help='Move old chats to monthly archive databases')
+    archive_parser.add_argument('action', choices=['run', 'list', 'query'], help='Archive action')
+    archive_parser.add_argument('sql', nargs='?',
+                                help='query: SQL to run (all_chats, all_messages, ... include archived rows)')
+    archive_parser.add_argument('--older-than', type=int, metavar='DAYS',
+                                help=f'run: archive chats with no activity for DAYS days '
+                                     f'(default: {ARCHIVE_AFTER_DAYS})')
+    archive_parser.add_argument('--instance', help='run: only archive this instance')
+    archive_parser.add_argument('--dry-run', action='store_true', help='run: only show what would be archived')
+    archive_parser.add_argument('--vacuum', action='store_true', help='run: shrink the database file afterwards')
+    archive_parser.add_argument('--since', metavar='YYYY-MM', help='query: first archive month to attach')
+    archive_parser.add_argument('--until', metavar='YYYY-MM', help='query: last archive month to attach')
+    archive_parser.add_argument('--limit', type=int, default=100, help='query: maximum rows shown (default: 100)')
+
+    # Mock server command
+    mock_parser = subparsers.add_parser('mock-server', help='Serve synthetic data as a local OpenWebUI stand-in')
+    mock_parser.add_argument('--users', type=int, default=100, help='Number of users (default: 100)')
+    mock_parser.add_argument('--chats', type=int, default=5000, help='Number of chats (default: 5,000)')
+    mock_parser.add_argument('--messages', type=int, default=50000,
+                             help='Approximate number of messages (default: 50,000)')
+    mock_parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    mock_parser.add_argument('--end-time', type=int,
+                             help='Unix time of the newest chat (default: today 00:00 UTC)')
+    mock_parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    mock_parser.add_argument('--port', type=int, default=MOCK_SERVER_PORT,
+                             help=f'Port to listen on (default: {MOCK_SERVER_PORT})')
+    mock_parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    mock_parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency, up to this many seconds')
+    mock_parser.add_argument('--rate-429', type=float, default=0.0,
+                             help='Fraction of requests answered with 429 (e.g. 0.01)')
+    mock_parser.add_argument('--error-rate', type=float, default=0.0,
+                             help='Fraction of requests answered with 500')
+    mock_parser.add_argument('--disconnect-rate', type=float, default=0.0,
+                             help='Fraction of chat details cut off mid-response')
+
+    # Benchmark command
+    benchmark_parser = subparsers.add_parser('benchmark', help='Benchmark syncs against the local mock server')
+    benchmark_parser.add_argument('action', choices=['run', 'compare'], help='Benchmark action')
+    benchmark_parser.add_argument('files', nargs='*',
+                                  help='compare: baseline and current result files (default: last two runs)')
+    benchmark_parser.add_argument('--sizes', nargs='+', choices=list(BENCHMARK_SIZES),
+                                  default=list(DEFAULT_SIZES),
+                                  help=f'run: dataset sizes in messages (default: {" ".join(DEFAULT_SIZES)})')
+    benchmark_parser.add_argument('--workers', type=int, default=SYNC_MAX_WORKERS,
+                                  help=f'run: chat-detail workers (default: {SYNC_MAX_WORKERS})')
+    benchmark_parser.add_argument('--throttled', action='store_true',
+                                  help='run: keep the adaptive rate limiter (off by default)')
+    benchmark_parser.add_argument('--latency', type=float, default=0.0,
+                                  help='run: seconds the mock server adds to every response')
+    benchmark_parser.add_argument('--changed', type=float, default=0.01,
+                                  help='run: fraction of chats changed before the incremental sync (default: 0.01)')
+    benchmark_parser.add_argument('--seed', type=int, default=0, help='run: dataset seed (default: 0)')
+    benchmark_parser.add_argument('--verbose', action='store_true', help='run: show sync output')
+    benchmark_parser.add_argument('--output', help='Results directory (default: output/benchmarks)')
+
     args = parser.parse_args()
 
     if not args.command:
@@ -170,8 +808,22 @@ def main():
         return report_command(args)
     elif args.command == 'status':
         return status_command(args)
+    elif args.command == 'metrics':
+        return metrics_command(args)
+    elif args.command == 'search':
+        return search_command(args)
     elif args.command == 'schedule':
         return schedule_command(args)
+    elif args.command == 'db':
+        return db_command(args)
+    elif args.command == 'export':
+        return export_command(args)
+    elif args.command == 'archive':
+        return archive_command(args)
+    elif args.command == 'mock-server':
+        return mock_server_command(args)
+    elif args.command == 'benchmark':
+        return benchmark_command(args)
 
     return 0
 